@@ -0,0 +1,119 @@
+"""
+Command line entry points.
+
+Usage:
+    python -m app.cli bootstrap --wait 30
+    python -m app.cli import books feed.ndjson
+    python -m app.cli import authors authors.csv --chunk-size 5000
+    python -m app.cli warm --max-paths 500 --time-budget 30
+    python -m app.cli reconcile-book-counts
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import EXPORT_BATCH_SIZE, IMPORT_CHUNK_SIZE, WARMUP_CONCURRENCY, WARMUP_MAX_PATHS, WARMUP_TIME_BUDGET
+from app.core.database import Base, SessionLocal, init_database
+from app.repositories.author_repository import AuthorRepository
+from app.repositories.book_repository import BookRepository
+from app.utils.importer import iter_text_lines, parse_rows
+
+IMPORTERS = {
+    "books": lambda db: BookRepository(db).import_books,
+    "authors": lambda db: AuthorRepository(db).import_authors,
+}
+
+
+def bootstrap_command(args: argparse.Namespace) -> int:
+    engine = init_database()
+    deadline = time.monotonic() + args.wait
+    while True:
+        try:
+            with engine.connect():
+                break
+        except OperationalError as exc:
+            if time.monotonic() >= deadline:
+                print(f"Database unreachable: {exc}", file=sys.stderr)
+                return 1
+            time.sleep(1)
+    # Only missing tables (and their indexes) are created, existing ones are left as they are
+    Base.metadata.create_all(bind=engine)
+    print(json.dumps({"tables": sorted(Base.metadata.tables)}, indent=2))
+    return 0
+
+
+def import_command(args: argparse.Namespace) -> int:
+    init_database()
+    import_format = args.format or ("csv" if os.path.splitext(args.path)[1].lower() == ".csv" else "ndjson")
+    db = SessionLocal()
+    try:
+        if args.path == "-":
+            rows = parse_rows(iter_text_lines(sys.stdin.buffer), import_format)
+            result = IMPORTERS[args.resource](db)(rows, args.chunk_size)
+        else:
+            with open(args.path, "rb") as body:
+                rows = parse_rows(iter_text_lines(body), import_format)
+                result = IMPORTERS[args.resource](db)(rows, args.chunk_size)
+    finally:
+        db.close()
+    print(json.dumps(result.model_dump(), indent=2))
+    return 1 if result.failed else 0
+
+
+def warm_command(args: argparse.Namespace) -> int:
+    # Imported here so the import command does not load the whole application
+    from app.core.warmup import warm_up
+    from app.main import app
+
+    result = asyncio.run(warm_up(app, args.max_paths, args.time_budget, args.concurrency))
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+def reconcile_command(args: argparse.Namespace) -> int:
+    init_database()
+    db = SessionLocal()
+    try:
+        corrected = BookRepository(db).reconcile_book_counts(batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(json.dumps({"corrected": corrected}, indent=2))
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bootstrap_parser = commands.add_parser("bootstrap", help="Create the missing tables; run once per deploy, before the workers")
+    bootstrap_parser.add_argument("--wait", type=float, default=0, help="Seconds to wait for the database to accept connections")
+    bootstrap_parser.set_defaults(handler=bootstrap_command)
+
+    import_parser = commands.add_parser("import", help="Import books or authors from an NDJSON or CSV file")
+    import_parser.add_argument("resource", choices=sorted(IMPORTERS))
+    import_parser.add_argument("path", help="File to import, or - for stdin")
+    import_parser.add_argument("--format", choices=["ndjson", "csv"], help="Defaults to csv for .csv files, ndjson otherwise")
+    import_parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="Rows inserted per transaction")
+    import_parser.set_defaults(handler=import_command)
+
+    warm_parser = commands.add_parser("warm", help="Load the most requested GET paths into Redis, e.g. after a flush")
+    warm_parser.add_argument("--max-paths", type=int, default=WARMUP_MAX_PATHS)
+    warm_parser.add_argument("--time-budget", type=float, default=WARMUP_TIME_BUDGET, help="Seconds to spend at most")
+    warm_parser.add_argument("--concurrency", type=int, default=WARMUP_CONCURRENCY)
+    warm_parser.set_defaults(handler=warm_command)
+
+    reconcile_parser = commands.add_parser("reconcile-book-counts", help="Recount authors.book_count from the books table, e.g. from a nightly cron")
+    reconcile_parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE, help="Authors checked per transaction")
+    reconcile_parser.set_defaults(handler=reconcile_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import asyncio
+from typing import Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_SHED
+from app.core.responses import APIJSONResponse
+
+# Never queued nor shed, so the worker can still be observed under load
+EXEMPT_PATHS = frozenset({"/metrics"})
+
+# Scope flag of the in-process requests of the cache warm-up and refresh-ahead (app.core.warmup).
+# Clients cannot set scope entries, so it cannot be forged from outside.
+INTERNAL_SCOPE_KEY = "app.internal"
+
+
+def is_exempt(scope: Scope) -> bool:
+    """Whether a request bypasses admission control and rate limiting."""
+    return scope["path"] in EXEMPT_PATHS or bool(scope.get(INTERNAL_SCOPE_KEY))
+
+
+def busy_response(retry_after: int) -> APIJSONResponse:
+    return APIJSONResponse(
+        status_code=503,
+        content={"success": False, "message": "Server busy, retry later"},
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+class AdmissionControlMiddleware:
+    """
+    Pure ASGI middleware capping the requests a worker serves at once.
+
+    Up to ``max_in_flight`` requests run; the next ``max_queue`` wait for a
+    slot in arrival order, for at most ``queue_timeout`` seconds. Anything
+    beyond is answered right away with a 503 and ``Retry-After``, before it
+    takes a database connection or a threadpool thread. Under a spike the
+    worker keeps serving what it admitted at normal latency, instead of
+    every request timing out in the threadpool queue behind ``get_db``.
+
+    A slot is held until the response body is sent, streamed exports
+    included. Internal requests (see :func:`is_exempt`) run their own bounded
+    concurrency and are not counted. ``max_in_flight=0`` disables the middleware.
+    """
+
+    def __init__(self, app: ASGIApp, max_in_flight: int, max_queue: int, queue_timeout: float, retry_after: int):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._waiting = 0
+        # Created on first use, inside the worker's event loop
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.max_in_flight <= 0 or is_exempt(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        if self._slots.locked():
+            if self._waiting >= self.max_queue:
+                ADMISSION_SHED.labels("queue_full").inc()
+                await busy_response(self.retry_after)(scope, receive, send)
+                return
+            self._waiting += 1
+            ADMISSION_QUEUE_DEPTH.inc()
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                ADMISSION_SHED.labels("timeout").inc()
+                await busy_response(self.retry_after)(scope, receive, send)
+                return
+            finally:
+                self._waiting -= 1
+                ADMISSION_QUEUE_DEPTH.dec()
+        else:
+            await self._slots.acquire()
+
+        ADMISSION_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ADMISSION_IN_FLIGHT.dec()
+            self._slots.release()
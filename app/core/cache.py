@@ -0,0 +1,513 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from app.core.config import (
+    CACHE_INVALIDATION_CHANNEL,
+    CACHE_STALE_WHILE_REVALIDATE,
+    COUNT_RECONCILE_INTERVAL,
+    LIST_CACHE_TTL,
+    LIST_STALE_TTL,
+    LOCAL_CACHE_SIZE,
+    LOCAL_CACHE_TTL,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL,
+)
+from app.core.metrics import record_cache_lookup, record_redis_duration
+from app.core.redis import async_redis_bytes_client, async_redis_client, redis_bytes_client, redis_client
+from app.core.singleflight import async_load_once, load_once
+
+logger = logging.getLogger(__name__)
+
+# Values of LocalCache/TieredCache: text, or bytes for caches on the binary Redis clients
+CacheValue = Union[str, bytes]
+
+# Namespace of the list caches, matching the table names of the models
+BOOKS_NAMESPACE = "books"
+AUTHORS_NAMESPACE = "authors"
+
+# Record versions outlive every response cached under them, so when one expires and reads
+# as 0 again, no entry stored under an earlier 0 is left to be served
+RECORD_VERSION_TTL = RESPONSE_CACHE_TTL + 60
+
+# Namespaces of single records, formatted with the id; versioned by the writes to that record only
+BOOK_RECORD = "book:{book_id}"
+AUTHOR_RECORD = "author:{author_id}"
+
+
+def generation_key(namespace: str) -> str:
+    return f"gen:{namespace}"
+
+
+def get_generation(namespace: str) -> int:
+    """
+    Return the current generation of a namespace.
+
+    List cache keys embed this number, so bumping it makes every cached page of
+    the namespace unreachable at once; the old keys simply expire by TTL.
+    """
+    return int(redis_client.get(generation_key(namespace)) or 0)
+
+
+def get_generations(*namespaces: str) -> List[int]:
+    """Current generations of several namespaces in one MGET."""
+    return [int(value or 0) for value in redis_client.mget([generation_key(namespace) for namespace in namespaces])]
+
+
+def count_key(namespace: str) -> str:
+    return f"count:{namespace}"
+
+
+def count_checked_key(namespace: str) -> str:
+    return f"count:{namespace}:checked"
+
+
+def bump_generation(
+    *namespaces: str, count_deltas: Optional[Dict[str, int]] = None, records: Sequence[str] = ()
+) -> None:
+    """
+    Invalidate all list caches of the given namespaces with one INCR each,
+    adjusting their row counters in the same round trip.
+
+    ``records`` (see :data:`BOOK_RECORD`) get a new version, which only
+    invalidates the cached responses of those records. A version is a
+    timestamp rather than a counter, so it never repeats after it expires.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    for namespace in namespaces:
+        pipe.incr(generation_key(namespace))
+    for record in records:
+        pipe.set(generation_key(record), time.time_ns(), ex=RECORD_VERSION_TTL)
+    for namespace, delta in (count_deltas or {}).items():
+        pipe.incrby(count_key(namespace), delta)
+    pipe.execute()
+
+
+def get_count(namespace: str, count: Callable[[], int]) -> int:
+    """
+    Return the row counter of a namespace.
+
+    The counter is adjusted on every write, so reading it replaces a
+    ``COUNT(*)`` per request. It is recounted with ``count`` when it is missing
+    or its ``COUNT_RECONCILE_INTERVAL`` has passed, which corrects any drift.
+    """
+    cached, checked = redis_client.mget(count_key(namespace), count_checked_key(namespace))
+    if cached is not None and checked is not None:
+        return int(cached)
+    value = load_once(
+        count_key(namespace),
+        load=lambda: str(count()),
+        read=lambda: redis_client.get(count_checked_key(namespace)) and redis_client.get(count_key(namespace)),
+        write=lambda value: _set_count(namespace, value),
+        # Other workers keep serving the old counter while one of them recounts
+        stale=(lambda: cached) if cached is not None else None,
+    )
+    return int(value)
+
+
+def _set_count(namespace: str, value: str) -> None:
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.set(count_key(namespace), value)
+    pipe.set(count_checked_key(namespace), 1, ex=COUNT_RECONCILE_INTERVAL)
+    pipe.execute()
+
+
+def list_cache_keys(namespace: str, generation: int, suffix: str) -> Tuple[str, str]:
+    """
+    Return the key of a list page and the generation-less key its last copy is
+    kept under for stale-while-revalidate.
+    """
+    return f"{namespace}:{generation}:{suffix}", f"{namespace}:stale:{suffix}"
+
+
+def get_list_page(key: str) -> Optional[str]:
+    """Read a cached list page, recording the lookup in the cache metrics."""
+    started = time.perf_counter()
+    value = redis_client.get(key)
+    record_redis_duration(key, started)
+    record_cache_lookup(key, "redis", value is not None)
+    return value
+
+
+def set_list_page(key: str, stale_key: str, value: str) -> None:
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.set(key, value, ex=LIST_CACHE_TTL)
+    if CACHE_STALE_WHILE_REVALIDATE:
+        pipe.set(stale_key, value, ex=LIST_STALE_TTL)
+    pipe.execute()
+
+
+def stale_list_page(stale_key: str) -> Optional[Callable[[], Optional[str]]]:
+    """Reader for the stale copy of a page, or None when stale-while-revalidate is off."""
+    if not CACHE_STALE_WHILE_REVALIDATE:
+        return None
+    return lambda: redis_client.get(stale_key)
+
+
+async def async_get_generation(namespace: str) -> int:
+    return int(await async_redis_client.get(generation_key(namespace)) or 0)
+
+
+async def async_get_generations(*namespaces: str) -> List[int]:
+    values = await async_redis_client.mget([generation_key(namespace) for namespace in namespaces])
+    return [int(value or 0) for value in values]
+
+
+async def async_bump_generation(
+    *namespaces: str, count_deltas: Optional[Dict[str, int]] = None, records: Sequence[str] = ()
+) -> None:
+    pipe = async_redis_client.pipeline(transaction=False)
+    for namespace in namespaces:
+        pipe.incr(generation_key(namespace))
+    for record in records:
+        pipe.set(generation_key(record), time.time_ns(), ex=RECORD_VERSION_TTL)
+    for namespace, delta in (count_deltas or {}).items():
+        pipe.incrby(count_key(namespace), delta)
+    await pipe.execute()
+
+
+async def async_get_count(namespace: str, count: Callable[[], Awaitable[int]]) -> int:
+    cached, checked = await async_redis_client.mget(count_key(namespace), count_checked_key(namespace))
+    if cached is not None and checked is not None:
+        return int(cached)
+
+    async def load() -> str:
+        return str(await count())
+
+    async def read() -> Optional[str]:
+        return await async_redis_client.get(count_checked_key(namespace)) and await async_redis_client.get(count_key(namespace))
+
+    async def write(value: str) -> None:
+        pipe = async_redis_client.pipeline(transaction=False)
+        pipe.set(count_key(namespace), value)
+        pipe.set(count_checked_key(namespace), 1, ex=COUNT_RECONCILE_INTERVAL)
+        await pipe.execute()
+
+    async def stale() -> Optional[str]:
+        return cached
+
+    value = await async_load_once(
+        count_key(namespace), load=load, read=read, write=write, stale=stale if cached is not None else None
+    )
+    return int(value)
+
+
+async def async_get_list_page(key: str) -> Optional[str]:
+    started = time.perf_counter()
+    value = await async_redis_client.get(key)
+    record_redis_duration(key, started)
+    record_cache_lookup(key, "redis", value is not None)
+    return value
+
+
+async def async_set_list_page(key: str, stale_key: str, value: str) -> None:
+    pipe = async_redis_client.pipeline(transaction=False)
+    pipe.set(key, value, ex=LIST_CACHE_TTL)
+    if CACHE_STALE_WHILE_REVALIDATE:
+        pipe.set(stale_key, value, ex=LIST_STALE_TTL)
+    await pipe.execute()
+
+
+def async_stale_list_page(stale_key: str):
+    if not CACHE_STALE_WHILE_REVALIDATE:
+        return None
+    return lambda: async_redis_client.get(stale_key)
+
+
+class LocalCache:
+    """
+    Bounded, thread-safe in-process cache with LRU eviction and a per-entry TTL.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheValue]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: CacheValue) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TieredCache:
+    """
+    Two-tier cache for single-record keys: a per-worker :class:`LocalCache` in
+    front of Redis.
+
+    Writes go to both tiers and publish the changed keys on a pub/sub channel;
+    every other worker listening on that channel drops its local copy, so the
+    local tier is never staler than the time it takes to deliver a message
+    (and at most ``LOCAL_CACHE_TTL`` if the listener is not running).
+    """
+
+    def __init__(self, client, async_client, local: LocalCache, channel: str):
+        self.client = client
+        self.async_client = async_client
+        self.local = local
+        self.channel = channel
+        # Identifies this worker so it can ignore its own invalidation messages
+        self.origin = uuid.uuid4().hex
+        self.hits: Dict[str, int] = {"local": 0, "redis": 0}
+        self.misses: Dict[str, int] = {"local": 0, "redis": 0}
+        self._listener = None
+
+    def _local_get(self, key: str) -> Optional[CacheValue]:
+        value = self.local.get(key)
+        if value is None:
+            self.misses["local"] += 1
+        else:
+            self.hits["local"] += 1
+        if self.local.maxsize > 0:
+            record_cache_lookup(key, "local", value is not None)
+        return value
+
+    def _count_redis(self, key: str, value: Optional[CacheValue]) -> None:
+        record_cache_lookup(key, "redis", value is not None)
+        if value is None:
+            self.misses["redis"] += 1
+        else:
+            self.hits["redis"] += 1
+            self.local.set(key, value)
+
+    def _message(self, keys) -> str:
+        return json.dumps({"origin": self.origin, "keys": list(keys)})
+
+    def get(self, key: str) -> Optional[CacheValue]:
+        value = self._local_get(key)
+        if value is None:
+            started = time.perf_counter()
+            value = self.client.get(key)
+            record_redis_duration(key, started)
+            self._count_redis(key, value)
+        return value
+
+    def get_with_ttl(self, key: str) -> Tuple[Optional[CacheValue], Optional[int]]:
+        """
+        Like :meth:`get`, also returning the milliseconds left before the Redis
+        copy expires (read in the same round trip). The TTL is None for local
+        hits and keys without expiry.
+        """
+        value = self._local_get(key)
+        if value is not None:
+            return value, None
+        started = time.perf_counter()
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.pttl(key)
+        value, ttl = pipe.execute()
+        record_redis_duration(key, started)
+        self._count_redis(key, value)
+        return value, ttl if ttl is not None and ttl >= 0 else None
+
+    def set(self, key: str, value: CacheValue, publish: bool = True, ex: Optional[int] = None) -> None:
+        """
+        Store ``value`` in both tiers. Read-through fills pass ``publish=False``
+        since no other worker can hold a newer copy of a key that was missing.
+        ``ex`` sets a TTL on the Redis copy.
+        """
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(key, value, ex=ex)
+        if publish:
+            pipe.publish(self.channel, self._message([key]))
+        pipe.execute()
+        self.local.set(key, value)
+
+    def delete(self, *keys: str) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.delete(*keys)
+        pipe.publish(self.channel, self._message(keys))
+        pipe.execute()
+        self.local.delete(*keys)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Optional[CacheValue]]:
+        """Read several keys, fetching the local misses with a single MGET."""
+        values = {}
+        missing = []
+        for key in keys:
+            value = self._local_get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                values[key] = value
+        if missing:
+            # One MGET, timed under the namespace of its first key
+            started = time.perf_counter()
+            fetched = self.client.mget(missing)
+            record_redis_duration(missing[0], started)
+            for key, value in zip(missing, fetched):
+                self._count_redis(key, value)
+                values[key] = value
+        return values
+
+    def set_many(self, mapping: Dict[str, CacheValue], publish: bool = True) -> None:
+        """Store several keys in one pipeline."""
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.set(key, value)
+        if publish:
+            pipe.publish(self.channel, self._message(mapping))
+        pipe.execute()
+        for key, value in mapping.items():
+            self.local.set(key, value)
+
+    async def async_get(self, key: str) -> Optional[CacheValue]:
+        value = self._local_get(key)
+        if value is None:
+            started = time.perf_counter()
+            value = await self.async_client.get(key)
+            record_redis_duration(key, started)
+            self._count_redis(key, value)
+        return value
+
+    async def async_get_with_ttl(self, key: str) -> Tuple[Optional[CacheValue], Optional[int]]:
+        value = self._local_get(key)
+        if value is not None:
+            return value, None
+        started = time.perf_counter()
+        pipe = self.async_client.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.pttl(key)
+        value, ttl = await pipe.execute()
+        record_redis_duration(key, started)
+        self._count_redis(key, value)
+        return value, ttl if ttl is not None and ttl >= 0 else None
+
+    async def async_set(self, key: str, value: CacheValue, publish: bool = True, ex: Optional[int] = None) -> None:
+        pipe = self.async_client.pipeline(transaction=False)
+        pipe.set(key, value, ex=ex)
+        if publish:
+            pipe.publish(self.channel, self._message([key]))
+        await pipe.execute()
+        self.local.set(key, value)
+
+    async def async_get_many(self, keys: List[str]) -> Dict[str, Optional[CacheValue]]:
+        values = {}
+        missing = []
+        for key in keys:
+            value = self._local_get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                values[key] = value
+        if missing:
+            started = time.perf_counter()
+            fetched = await self.async_client.mget(missing)
+            record_redis_duration(missing[0], started)
+            for key, value in zip(missing, fetched):
+                self._count_redis(key, value)
+                values[key] = value
+        return values
+
+    async def async_set_many(self, mapping: Dict[str, CacheValue], publish: bool = True) -> None:
+        pipe = self.async_client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.set(key, value)
+        if publish:
+            pipe.publish(self.channel, self._message(mapping))
+        await pipe.execute()
+        for key, value in mapping.items():
+            self.local.set(key, value)
+
+    async def async_delete(self, *keys: str) -> None:
+        pipe = self.async_client.pipeline(transaction=False)
+        pipe.delete(*keys)
+        pipe.publish(self.channel, self._message(keys))
+        await pipe.execute()
+        self.local.delete(*keys)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {tier: {"hits": self.hits[tier], "misses": self.misses[tier]} for tier in ("local", "redis")}
+
+    def _handle_message(self, message) -> None:
+        try:
+            payload = json.loads(message["data"])
+        except (TypeError, ValueError):
+            return
+        if payload.get("origin") != self.origin:
+            self.local.delete(*payload.get("keys", []))
+
+    def _handle_listener_error(self, exc, pubsub, thread) -> None:
+        # Messages may have been missed while disconnected, so nothing local can be trusted
+        logger.warning("Cache invalidation listener error: %s", exc)
+        self.local.clear()
+        time.sleep(1)
+
+    def start_listener(self) -> None:
+        """Subscribe to the invalidation channel in a background thread."""
+        if self._listener is not None or self.local.maxsize <= 0:
+            return
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.channel: self._handle_message})
+        self._listener = pubsub.run_in_thread(
+            sleep_time=1, daemon=True, exception_handler=self._handle_listener_error
+        )
+
+    def stop_listener(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+
+# Cache for book:{id} and author:{id}, shared by the sync and async repositories;
+# values are encoded with the RecordCodec of each model
+record_cache = TieredCache(
+    redis_bytes_client, async_redis_bytes_client, LocalCache(LOCAL_CACHE_SIZE, LOCAL_CACHE_TTL), CACHE_INVALIDATION_CHANNEL
+)
+
+# Serialized response bodies of the GET routes (see app.core.response_cache). Keys embed
+# the namespace generation and are never overwritten, so no invalidation listener is needed
+response_cache = TieredCache(
+    redis_bytes_client, async_redis_bytes_client, LocalCache(RESPONSE_CACHE_SIZE, LOCAL_CACHE_TTL), CACHE_INVALIDATION_CHANNEL
+)
+
+
+def clear_caches() -> None:
+    """
+    Drop every cached record, row counter and response and make all list
+    pages unreachable. For tests and benchmarks that recreate the tables,
+    where ids start over and old entries would be served for new rows.
+    """
+    keys = [key for pattern in ("book:*", "author:*", "count:*") for key in redis_client.scan_iter(pattern)]
+    if keys:
+        record_cache.delete(*keys)
+    # Single-record responses are keyed on record versions, which a new table does not bump
+    responses = list(redis_client.scan_iter("resp:*"))
+    if responses:
+        response_cache.delete(*responses)
+    record_cache.local.clear()
+    response_cache.local.clear()
+    bump_generation(BOOKS_NAMESPACE, AUTHORS_NAMESPACE)
@@ -0,0 +1,344 @@
+import functools
+import logging
+import threading
+import time
+from typing import AsyncIterator, Callable, Iterator, Optional, Set
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+from app.core.metrics import REDIS_BYPASSES, REDIS_CIRCUIT_OPEN
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean Redis is unreachable or too slow; anything else is a bug and is raised
+UNAVAILABLE_ERRORS = (RedisConnectionError, RedisTimeoutError)
+
+# Commands whose skipped writes must be undone once Redis is back: the key is deleted,
+# except INCR (generation counters), which is replayed so old list pages stay unreachable
+DELETE_ON_RECOVERY = frozenset({"set", "setex", "mset", "delete", "incrby"})
+REPLAY_ON_RECOVERY = frozenset({"incr"})
+
+# Record versions (``gen:book:1``) are SET to a timestamp; deleting one would bring back
+# version 0 and the responses cached under it, so a skipped SET is replayed as an INCR
+GENERATION_PREFIX = "gen:"
+
+
+def _fallback(command: str, args: tuple):
+    """What a skipped command returns: a cache miss for reads, nothing for writes."""
+    if command == "mget":
+        keys = args[0] if len(args) == 1 and not isinstance(args[0], (str, bytes)) else args
+        return [None] * len(keys)
+    if command == "exists":
+        return 0
+    if command == "scan_iter":
+        return iter(())
+    return None
+
+
+def _written_keys(command: str, args: tuple) -> list:
+    if command == "delete":
+        return list(args)
+    if command == "mset":
+        return list(args[0])
+    return [args[0]] if args else []
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker shared by every Redis client of the process.
+
+    After ``failure_threshold`` consecutive connection errors or timeouts the
+    circuit opens: cache calls are skipped without touching the network and the
+    requests are served from the database. A background thread pings Redis every
+    ``probe_interval`` seconds and closes the circuit when it answers.
+
+    Writes skipped while Redis was unreachable may have left stale entries
+    behind, so their keys are remembered and invalidated on recovery. When more
+    than ``max_pending`` keys pile up, every key of the affected prefixes
+    (``book:*``...) is deleted instead.
+    """
+
+    def __init__(self, probe_client, failure_threshold: int, probe_interval: float, max_pending: int):
+        self.probe_client = probe_client
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.max_pending = max_pending
+        self.is_open = False
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._probe: Optional[threading.Thread] = None
+        self._pending_deletes: Set[str] = set()
+        self._pending_incrs: Set[str] = set()
+        self._overflow_prefixes: Set[str] = set()
+
+    def record_success(self) -> None:
+        if self._failures:
+            with self._lock:
+                self._failures = 0
+
+    def record_failure(self, exc: BaseException) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.is_open or self._failures < self.failure_threshold:
+                return
+            self.is_open = True
+            REDIS_CIRCUIT_OPEN.set(1)
+            logger.warning("Redis unavailable (%s), bypassing the cache until it answers again", exc)
+            self._start_probe()
+
+    def bypass(self, command: str, args: tuple):
+        """Account for a skipped command and return its fallback value."""
+        REDIS_BYPASSES.labels(command).inc()
+        if command in DELETE_ON_RECOVERY or command in REPLAY_ON_RECOVERY:
+            keys = [key.decode() if isinstance(key, bytes) else key for key in _written_keys(command, args)]
+            with self._lock:
+                if command in REPLAY_ON_RECOVERY or (command == "set" and keys[0].startswith(GENERATION_PREFIX)):
+                    self._pending_incrs.update(keys)
+                elif len(self._pending_deletes) + len(keys) <= self.max_pending:
+                    self._pending_deletes.update(keys)
+                else:
+                    self._overflow_prefixes.update(key.split(":", 1)[0] for key in keys)
+                # Also when the circuit is still closed: a single failed write must be undone too
+                self._start_probe()
+        return _fallback(command, args)
+
+    def _has_pending(self) -> bool:
+        return bool(self._pending_deletes or self._pending_incrs or self._overflow_prefixes)
+
+    def _start_probe(self) -> None:
+        # Called with self._lock held
+        if self._probe is None:
+            self._probe = threading.Thread(target=self._run_probe, name="redis-circuit-probe", daemon=True)
+            self._probe.start()
+
+    def after_fork(self) -> None:
+        """Reset the lock and probe thread in a forked worker, neither survives the fork."""
+        self._lock = threading.Lock()
+        self._probe = None
+        if self.is_open or self._has_pending():
+            self._start_probe()
+
+    def _run_probe(self) -> None:
+        while True:
+            time.sleep(self.probe_interval)
+            try:
+                self.probe_client.ping()
+                self._recover()
+            except UNAVAILABLE_ERRORS:
+                continue
+            with self._lock:
+                # Writes skipped while recovering are invalidated on the next round
+                if self._has_pending():
+                    continue
+                was_open, self.is_open = self.is_open, False
+                self._failures = 0
+                self._probe = None
+            if was_open:
+                REDIS_CIRCUIT_OPEN.set(0)
+                logger.warning("Redis is back, cache enabled again")
+            return
+
+    def _recover(self) -> None:
+        """Invalidate what was written to the database while Redis was skipped."""
+        with self._lock:
+            deletes, incrs, prefixes = self._pending_deletes, self._pending_incrs, self._overflow_prefixes
+            self._pending_deletes, self._pending_incrs, self._overflow_prefixes = set(), set(), set()
+        try:
+            pipe = self.probe_client.pipeline(transaction=False)
+            for key in incrs:
+                pipe.incr(key)
+            if deletes:
+                pipe.delete(*deletes)
+            pipe.execute()
+            for prefix in prefixes:
+                keys = list(self.probe_client.scan_iter(f"{prefix}:*"))
+                if keys:
+                    self.probe_client.delete(*keys)
+        except UNAVAILABLE_ERRORS:
+            # Keep them for the next probe
+            with self._lock:
+                self._pending_deletes |= deletes
+                self._pending_incrs |= incrs
+                self._overflow_prefixes |= prefixes
+            raise
+
+
+class _GuardedLock:
+    """A Redis lock that never blocks a load: when Redis is unavailable it is simply acquired."""
+
+    def __init__(self, lock, breaker: CircuitBreaker):
+        self._lock = lock
+        self._breaker = breaker
+        self.name = lock.name
+
+    def acquire(self, *args, **kwargs) -> bool:
+        if self._breaker.is_open:
+            self._breaker.bypass("lock", ())
+            return True
+        try:
+            acquired = self._lock.acquire(*args, **kwargs)
+        except UNAVAILABLE_ERRORS as exc:
+            self._breaker.record_failure(exc)
+            self._breaker.bypass("lock", ())
+            return True
+        self._breaker.record_success()
+        return acquired
+
+    def release(self) -> None:
+        # A lock "acquired" while bypassing has no token and raises LockError without a round trip
+        try:
+            self._lock.release()
+        except UNAVAILABLE_ERRORS as exc:
+            self._breaker.record_failure(exc)
+
+
+class _AsyncGuardedLock(_GuardedLock):
+    async def acquire(self, *args, **kwargs) -> bool:
+        if self._breaker.is_open:
+            self._breaker.bypass("lock", ())
+            return True
+        try:
+            acquired = await self._lock.acquire(*args, **kwargs)
+        except UNAVAILABLE_ERRORS as exc:
+            self._breaker.record_failure(exc)
+            self._breaker.bypass("lock", ())
+            return True
+        self._breaker.record_success()
+        return acquired
+
+    async def release(self) -> None:
+        try:
+            await self._lock.release()
+        except UNAVAILABLE_ERRORS as exc:
+            self._breaker.record_failure(exc)
+
+
+class _GuardedPipeline:
+    """Queues commands on a real pipeline and remembers them, so a skipped execute can be accounted for."""
+
+    def __init__(self, pipeline, breaker: CircuitBreaker):
+        self._pipeline = pipeline
+        self._breaker = breaker
+        self._commands = []
+
+    def __getattr__(self, name):
+        method = getattr(self._pipeline, name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((name, args))
+            method(*args, **kwargs)
+            return self
+
+        return queue
+
+    def _skip(self) -> list:
+        return [self._breaker.bypass(name, args) for name, args in self._commands]
+
+    def execute(self):
+        if self._breaker.is_open:
+            return self._skip()
+        try:
+            result = self._pipeline.execute()
+        except UNAVAILABLE_ERRORS as exc:
+            self._breaker.record_failure(exc)
+            return self._skip()
+        self._breaker.record_success()
+        return result
+
+
+class _AsyncGuardedPipeline(_GuardedPipeline):
+    async def execute(self):
+        if self._breaker.is_open:
+            return self._skip()
+        try:
+            result = await self._pipeline.execute()
+        except UNAVAILABLE_ERRORS as exc:
+            self._breaker.record_failure(exc)
+            return self._skip()
+        self._breaker.record_success()
+        return result
+
+
+class GuardedRedis:
+    """
+    Proxy of a Redis client that routes every command through a :class:`CircuitBreaker`.
+
+    Reads return a miss and writes are dropped while Redis is unavailable, so
+    callers fall through to the database instead of failing. ``pubsub`` is
+    passed through, the invalidation listener handles its own errors.
+    """
+
+    def __init__(self, client, breaker: CircuitBreaker):
+        self._client = client
+        self._breaker = breaker
+
+    def pipeline(self, *args, **kwargs):
+        return _GuardedPipeline(self._client.pipeline(*args, **kwargs), self._breaker)
+
+    def lock(self, *args, **kwargs):
+        return _GuardedLock(self._client.lock(*args, **kwargs), self._breaker)
+
+    def pubsub(self, *args, **kwargs):
+        return self._client.pubsub(*args, **kwargs)
+
+    def _guarded(self, command: str, method: Callable, /, *args, **kwargs):
+        if self._breaker.is_open:
+            return self._breaker.bypass(command, args)
+        try:
+            result = method(*args, **kwargs)
+        except UNAVAILABLE_ERRORS as exc:
+            self._breaker.record_failure(exc)
+            return self._breaker.bypass(command, args)
+        self._breaker.record_success()
+        return result
+
+    def scan_iter(self, *args, **kwargs) -> Iterator:
+        """
+        The matching keys, all read before the first one is returned.
+
+        The client's ``scan_iter`` is a generator that issues its SCAN round
+        trips while the caller iterates, after a guarded call would have
+        returned, so it is drained inside the call instead.
+        """
+
+        def scan(*args, **kwargs) -> list:
+            return list(self._client.scan_iter(*args, **kwargs))
+
+        return iter(self._guarded("scan_iter", scan, *args, **kwargs))
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+        return functools.partial(self._guarded, name, attr)
+
+
+class AsyncGuardedRedis(GuardedRedis):
+    """:class:`GuardedRedis` for the ``redis.asyncio`` clients."""
+
+    def pipeline(self, *args, **kwargs):
+        return _AsyncGuardedPipeline(self._client.pipeline(*args, **kwargs), self._breaker)
+
+    def lock(self, *args, **kwargs):
+        return _AsyncGuardedLock(self._client.lock(*args, **kwargs), self._breaker)
+
+    async def _guarded(self, command: str, method: Callable, /, *args, **kwargs):
+        if self._breaker.is_open:
+            return self._breaker.bypass(command, args)
+        try:
+            result = await method(*args, **kwargs)
+        except UNAVAILABLE_ERRORS as exc:
+            self._breaker.record_failure(exc)
+            return self._breaker.bypass(command, args)
+        self._breaker.record_success()
+        return result
+
+    async def scan_iter(self, *args, **kwargs) -> AsyncIterator:
+        """Async variant of :meth:`GuardedRedis.scan_iter`, used with ``async for``."""
+
+        async def scan(*args, **kwargs) -> list:
+            return [key async for key in self._client.scan_iter(*args, **kwargs)]
+
+        for key in await self._guarded("scan_iter", scan, *args, **kwargs):
+            yield key
@@ -0,0 +1,204 @@
+import zlib
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional, gzip is always available
+    brotli = None
+
+# Media types worth compressing; images and archives are already compressed
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+# Codings this middleware applies, as they appear in Content-Encoding and in ETag suffixes
+ENCODINGS = ("br", "gzip")
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    ETag of the ``encoding`` representation of a response tagged ``etag``.
+
+    RFC 9110 forbids one strong validator for two representations, so a
+    strong ``"tag"`` becomes ``"tag-gzip"``; weak tags are left as they are.
+    """
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def identity_etag(etag: str) -> str:
+    """Undo :func:`encoded_etag`: the ETag of the uncompressed representation."""
+    for encoding in ENCODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Parse ``Accept-Encoding`` into a mapping of coding to q-value."""
+    codings = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    """
+    Pick the best coding the client accepts: brotli when available, then gzip.
+
+    A coding is acceptable when listed (or matched by ``*``) with a q-value
+    above zero; ties go to brotli, which compresses JSON noticeably better.
+    """
+    codings = parse_accept_encoding(header)
+    wildcard = codings.get("*", 0.0)
+    candidates = [("br", 1)] if brotli is not None else []
+    candidates.append(("gzip", 0))
+    best = max(candidates, key=lambda item: (codings.get(item[0], wildcard), item[1]))
+    return best[0] if codings.get(best[0], wildcard) > 0 else None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            # wbits=31 writes a gzip header and trailer
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it, so streamed chunks reach the client right away."""
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli or gzip, negotiated from ``Accept-Encoding``.
+
+    Like Starlette's ``GZipMiddleware``, bodies smaller than ``minimum_size``
+    are sent as is, since compressing them costs more CPU than it saves on
+    the wire. Streaming responses (exports) are compressed chunk by chunk.
+    Responses that already have a ``Content-Encoding``, or whose media type
+    is not text or JSON, are left alone.
+
+    A strong ``ETag`` gets an encoding suffix on compressed bodies (see
+    :func:`encoded_etag`). A 304 keeps the suffix the client's
+    ``If-None-Match`` was sent with, so its cached copy stays tagged.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressedResponder(self, encoding, send, request_headers.get("if-none-match", ""))
+        await responder.run(self.app, scope, receive)
+
+
+class _CompressedResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send, if_none_match: str = ""):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.if_none_match = if_none_match
+        self.start: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        # None until the first body message decides whether to compress
+        self.active: Optional[bool] = None
+
+    async def run(self, app: ASGIApp, scope: Scope, receive: Receive) -> None:
+        await app(scope, receive, self.handle)
+
+    def _compressible(self) -> bool:
+        headers = Headers(raw=self.start["headers"])
+        if "content-encoding" in headers or self.start["status"] in (204, 304):
+            return False
+        return headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+    def _begin(self) -> MutableHeaders:
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        del headers["Content-Length"]
+        if "etag" in headers:
+            headers["ETag"] = encoded_etag(headers["etag"], self.encoding)
+        self.compressor = _Compressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+        return headers
+
+    def _tag_not_modified(self) -> None:
+        # The client revalidated the compressed copy: confirm it under the tag it holds
+        headers = MutableHeaders(raw=self.start["headers"])
+        if "etag" not in headers:
+            return
+        etag = encoded_etag(headers["etag"], self.encoding)
+        if any(tag.strip().removeprefix("W/") == etag for tag in self.if_none_match.split(",")):
+            headers["ETag"] = etag
+
+    async def handle(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Headers are held back until the first body chunk shows how large the body is
+            self.start = message
+            if message["status"] == 304:
+                self._tag_not_modified()
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.active is None:
+            self.active = self._compressible() and (more_body or len(body) >= self.middleware.minimum_size)
+            if not self.active:
+                if self._compressible():
+                    MutableHeaders(raw=self.start["headers"]).add_vary_header("Accept-Encoding")
+                await self.send(self.start)
+                await self.send(message)
+                return
+            headers = self._begin()
+            if not more_body:
+                compressed = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(compressed))
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+            await self.send(self.start)
+
+        if not self.active:
+            await self.send(message)
+            return
+        chunk = self.compressor.compress(body)
+        if not more_body:
+            chunk += self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -1,5 +1,121 @@
+import json
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "mysql://root:@localhost:3306/bookstore")
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+# Bound every Redis call so a slow Redis costs at most this long before the database answers instead
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.5"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.25"))
+# Consecutive connection errors/timeouts that open the circuit; a background ping closes it again
+REDIS_CIRCUIT_FAILURES = int(os.getenv("REDIS_CIRCUIT_FAILURES", "3"))
+REDIS_PROBE_INTERVAL = float(os.getenv("REDIS_PROBE_INTERVAL", "1"))
+# Keys written while Redis was down that are deleted on recovery; beyond this whole prefixes are dropped
+REDIS_MAX_PENDING_INVALIDATIONS = int(os.getenv("REDIS_MAX_PENDING_INVALIDATIONS", "10000"))
+# Optional read replicas (comma-separated); GET/HEAD requests are routed to them round-robin
+DATABASE_READ_URLS = [url.strip() for url in os.getenv("DATABASE_READ_URLS", "").split(",") if url.strip()]
+# A replica is probed with SELECT 1 at checkout at most this often, and skipped for as long after a failed probe
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "10"))
 PAGINATION_LIMIT = 10
+
+# Serve the hot CRUD routes with AsyncSession and redis.asyncio instead of the threadpool
+ASYNC_MODE = os.getenv("ASYNC_MODE", "false").lower() in ("1", "true", "yes")
+# Defaults to DATABASE_URL with its driver swapped for an async one (aiomysql / aiosqlite)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Connection pool of every engine (primary and replicas, per worker); sizing is ignored for SQLite
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Connections older than this are replaced, keeping them below MySQL's wait_timeout and proxy idle limits
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+# Test each connection with a round trip at checkout; costs latency, survives database restarts
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+
+# List pages are keyed by a per-namespace generation; stale generations expire after this many seconds
+LIST_CACHE_TTL = int(os.getenv("LIST_CACHE_TTL", "300"))
+
+# In-process tier in front of Redis for single-record keys (book:{id}, author:{id}); size 0 disables it
+LOCAL_CACHE_SIZE = int(os.getenv("LOCAL_CACHE_SIZE", "1024"))
+LOCAL_CACHE_TTL = float(os.getenv("LOCAL_CACHE_TTL", "30"))
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
+
+# Cache stampede protection: only the holder of a short Redis lock rebuilds a missing key
+CACHE_LOCK_TIMEOUT = float(os.getenv("CACHE_LOCK_TIMEOUT", "5"))
+# How long other workers wait for the lock holder to fill the key before loading it themselves
+CACHE_LOCK_WAIT = float(os.getenv("CACHE_LOCK_WAIT", "0.5"))
+# Serve the previous copy of a list page while another worker rebuilds it (may lag one write behind)
+CACHE_STALE_WHILE_REVALIDATE = os.getenv("CACHE_STALE_WHILE_REVALIDATE", "false").lower() in ("1", "true", "yes")
+LIST_STALE_TTL = int(os.getenv("LIST_STALE_TTL", "3600"))
+
+# Row counters kept in Redis are recounted against the table at most this often (seconds)
+COUNT_RECONCILE_INTERVAL = int(os.getenv("COUNT_RECONCILE_INTERVAL", "300"))
+
+# Upper bound on ids per batch read (GET /books?ids=...) and items per bulk write
+MAX_BATCH_IDS = int(os.getenv("MAX_BATCH_IDS", "100"))
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+# Upper bound on sub-requests per POST /batch
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+# Upper bound on the request body of a POST /batch, which the rate limiter reads before the route does
+BATCH_MAX_BODY_BYTES = int(os.getenv("BATCH_MAX_BODY_BYTES", str(64 * 1024)))
+# Upper bound on the sub-response bytes a POST /batch buffers in memory, all sub-requests together
+BATCH_MAX_RESPONSE_BYTES = int(os.getenv("BATCH_MAX_RESPONSE_BYTES", str(4 * 1024 * 1024)))
+# Rows inserted per transaction by the bulk endpoints
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "200"))
+
+# Rows fetched per round trip from the server-side cursor of the export endpoints
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Rows validated and inserted per transaction by the import endpoints and CLI
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+# Per-row errors listed in an import report
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "100"))
+# Uploaded import bodies larger than this many bytes are spooled to a temporary file
+IMPORT_SPOOL_SIZE = int(os.getenv("IMPORT_SPOOL_SIZE", str(1024 * 1024)))
+
+# Pre-rendered response bodies of the GET routes, keyed by namespace generation
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(LIST_CACHE_TTL)))
+# Entries of the in-process tier of the response cache; 0 keeps responses in Redis only
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+
+# Warm-up: replay the most requested cached GET paths at startup (or with `python -m app.cli warm`)
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+WARMUP_MAX_PATHS = int(os.getenv("WARMUP_MAX_PATHS", "200"))
+# Seconds a warm-up may take; startup continues with whatever was loaded by then
+WARMUP_TIME_BUDGET = float(os.getenv("WARMUP_TIME_BUDGET", "10"))
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", "4"))
+# Share of cached GET requests counted towards the hot path ranking, and how many paths are ranked
+WARMUP_SAMPLE_RATE = float(os.getenv("WARMUP_SAMPLE_RATE", "0.01"))
+WARMUP_TRACKED_PATHS = int(os.getenv("WARMUP_TRACKED_PATHS", "1000"))
+
+# Cached responses read with fewer than this many seconds left are re-rendered in the background; 0 disables.
+# Keep it above LOCAL_CACHE_TTL so a hot key is read from Redis at least once inside the window
+REFRESH_AHEAD_WINDOW = int(os.getenv("REFRESH_AHEAD_WINDOW", "60"))
+
+# Cache-Control header of the cached GET routes; clients revalidate with If-None-Match by default
+CACHE_CONTROL = os.getenv("CACHE_CONTROL", "no-cache")
+# Per-route overrides as JSON keyed by endpoint name, e.g. {"get_book": "public, max-age=60"}
+CACHE_CONTROL_ROUTES = json.loads(os.getenv("CACHE_CONTROL_ROUTES", "{}"))
+
+# Responses are compressed with brotli or gzip (per Accept-Encoding) from this many bytes up
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# Brotli 4 is close to gzip 6 in CPU cost while producing smaller JSON
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# Admission control: requests served at once per worker (0 disables) and how many more may wait for a slot;
+# beyond that, or after ADMISSION_QUEUE_TIMEOUT seconds of waiting, requests get a 503 with Retry-After
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "40"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "100"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+# Token bucket rate limiting in Redis, per API key (RATE_LIMIT_KEY_HEADER) or else per client IP
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "false").lower() in ("1", "true", "yes")
+RATE_LIMIT_KEY_HEADER = os.getenv("RATE_LIMIT_KEY_HEADER", "x-api-key")
+# Tokens per second and bucket size for cheap GETs of the cached routes
+RATE_LIMIT_READ_RATE = float(os.getenv("RATE_LIMIT_READ_RATE", "50"))
+RATE_LIMIT_READ_BURST = int(os.getenv("RATE_LIMIT_READ_BURST", "100"))
+# ...and for writes, search (?q=), export, import and batch
+RATE_LIMIT_EXPENSIVE_RATE = float(os.getenv("RATE_LIMIT_EXPENSIVE_RATE", "5"))
+RATE_LIMIT_EXPENSIVE_BURST = int(os.getenv("RATE_LIMIT_EXPENSIVE_BURST", "20"))
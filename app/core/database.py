@@ -1,15 +1,308 @@
-from sqlalchemy import create_engine
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from app.core.config import DATABASE_URL
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.config import (
+    ASYNC_DATABASE_URL,
+    ASYNC_MODE,
+    DATABASE_READ_URLS,
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    REPLICA_CHECK_INTERVAL,
+)
+from app.core.metrics import TimedAsyncQueuePool, TimedQueuePool, instrument_engine
+
+logger = logging.getLogger(__name__)
+
+# Requests with these methods never write and may be served by a replica
+READ_METHODS = frozenset({"GET", "HEAD"})
+
+# Session.info flag of the sessions opened on a read replica
+REPLICA_INFO_KEY = "replica"
+
+# Scope entry of the sub-requests of POST /batch: the sessions they share, by kind ("sync", "async")
+SHARED_SESSIONS_SCOPE_KEY = "app.shared_sessions"
+
+
+def engine_options(url: str, database: str) -> dict:
+    """
+    Pool settings for ``create_engine`` / ``create_async_engine``.
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    ``database`` (``primary`` or ``replica``) labels the pool in the checkout wait metric.
+    """
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    parsed = make_url(url)
+    # SQLite uses a NullPool or a single-connection pool, which take no sizing arguments
+    if parsed.get_backend_name() != "sqlite":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            poolclass=TimedAsyncQueuePool if parsed.get_dialect().is_async else TimedQueuePool,
+            pool_logging_name=database,
+        )
+    return options
+
+
+def create_instrumented_engine(url: str, database: str):
+    engine = create_engine(url, **engine_options(url, database))
+    instrument_engine(engine, database)
+    return engine
+
+
+def create_instrumented_async_engine(url: str, database: str):
+    engine = create_async_engine(url, **engine_options(url, database))
+    instrument_engine(engine.sync_engine, database)
+    return engine
+
+
+# Bound to their engines by init_database(), so importing the app opens nothing
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+# expire_on_commit=False because attributes cannot be lazy-loaded outside of an await
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+
+
+def to_async_url(url: str) -> str:
+    """Swap the driver of a sync database URL for its async counterpart."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}', set ASYNC_DATABASE_URL")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+class ReplicaSet:
+    """
+    Round-robin over read replicas, skipping the ones that failed a recent health check.
+
+    A replica is probed with ``SELECT 1`` when its session is checked out and the last
+    probe is older than ``check_interval``. A failed probe takes it out of rotation for
+    ``check_interval`` seconds. When no replica is usable the caller falls back to the primary.
+    """
+
+    def __init__(self, sessionmakers: List[Callable], check_interval: float = REPLICA_CHECK_INTERVAL):
+        self.sessionmakers = sessionmakers
+        self.check_interval = check_interval
+        self._next = itertools.count()
+        self._checked_at = [float("-inf")] * len(sessionmakers)
+        self._down_until = [0.0] * len(sessionmakers)
+
+    def __len__(self) -> int:
+        return len(self.sessionmakers)
+
+    def _candidates(self):
+        if not self.sessionmakers:
+            return
+        start = next(self._next)
+        now = time.monotonic()
+        for offset in range(len(self.sessionmakers)):
+            index = (start + offset) % len(self.sessionmakers)
+            if self._down_until[index] <= now:
+                yield index, now - self._checked_at[index] >= self.check_interval
+
+    def _mark(self, index: int, healthy: bool) -> None:
+        now = time.monotonic()
+        self._checked_at[index] = now
+        if healthy:
+            self._down_until[index] = 0.0
+        else:
+            logger.warning("Read replica %d failed its health check, using the others for %gs", index, self.check_interval)
+            self._down_until[index] = now + self.check_interval
+
+    def session(self) -> Optional[Session]:
+        """Return a session on the next healthy replica, or None when there is none."""
+        for index, probe in self._candidates():
+            db = self.sessionmakers[index]()
+            if probe:
+                try:
+                    db.execute(text("SELECT 1"))
+                except (DBAPIError, OSError):
+                    db.close()
+                    self._mark(index, False)
+                    continue
+                self._mark(index, True)
+            return db
+        return None
+
+    async def async_session(self) -> Optional[AsyncSession]:
+        """Async variant of :meth:`session`."""
+        for index, probe in self._candidates():
+            db = self.sessionmakers[index]()
+            if probe:
+                try:
+                    await db.execute(text("SELECT 1"))
+                except (DBAPIError, OSError):
+                    await db.close()
+                    self._mark(index, False)
+                    continue
+                self._mark(index, True)
+            return db
+        return None
+
+
+engine: Optional[Engine] = None
+async_engine: Optional[AsyncEngine] = None
+read_replicas = ReplicaSet([])
+async_read_replicas = ReplicaSet([])
+_init_lock = threading.Lock()
+
+
+def init_database() -> Engine:
+    """
+    Create the engines and bind the session factories, once per process.
+
+    Called from the application lifespan, and on first use by scripts that do
+    not run it. Creating an engine does not connect; the pools open their
+    connections on the first checkout.
+    """
+    global engine, async_engine, read_replicas, async_read_replicas
+    if engine is not None:
+        return engine
+    with _init_lock:
+        if engine is not None:
+            return engine
+        primary = create_instrumented_engine(DATABASE_URL, "primary")
+        SessionLocal.configure(bind=primary)
+        read_replicas = ReplicaSet([
+            sessionmaker(autocommit=False, autoflush=False, bind=create_instrumented_engine(url, "replica"), info={REPLICA_INFO_KEY: True})
+            for url in DATABASE_READ_URLS
+        ])
+        # The async engine is only built in async mode so the sync deployment needs no async driver
+        if ASYNC_MODE:
+            async_engine = create_instrumented_async_engine(ASYNC_DATABASE_URL or to_async_url(DATABASE_URL), "primary")
+            AsyncSessionLocal.configure(bind=async_engine)
+            async_read_replicas = ReplicaSet([
+                async_sessionmaker(
+                    create_instrumented_async_engine(to_async_url(url), "replica"),
+                    autoflush=False,
+                    expire_on_commit=False,
+                    info={REPLICA_INFO_KEY: True},
+                )
+                for url in DATABASE_READ_URLS
+            ])
+        engine = primary
+    return engine
+
+
+def _engines() -> list:
+    """Every engine created so far, async ones included."""
+    engines = [engine, async_engine]
+    for replicas in (read_replicas, async_read_replicas):
+        engines.extend(factory.kw["bind"] for factory in replicas.sessionmakers)
+    return [e for e in engines if e is not None]
+
+
+def _dispose_after_fork() -> None:
+    # A forked worker must not reuse the pooled connections of its parent; close=False leaves them to the parent
+    for e in _engines():
+        getattr(e, "sync_engine", e).dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_dispose_after_fork)
+
+
+async def dispose_database() -> None:
+    """Close every pooled connection, on shutdown."""
+    for e in _engines():
+        if isinstance(e, AsyncEngine):
+            await e.dispose()
+        else:
+            e.dispose()
+
+
+async def close_shared_sessions(sessions: Dict[str, object]) -> None:
+    """Close and forget the sessions shared by the sub-requests of a ``POST /batch``."""
+    db = sessions.pop("sync", None)
+    if db is not None:
+        await run_in_threadpool(db.close)
+    async_db = sessions.pop("async", None)
+    if async_db is not None:
+        await async_db.close()
+
+
+@contextmanager
+def primary_session(db: Session) -> Iterator[Session]:
+    """
+    ``db`` itself, or a new primary session for the block when ``db`` is on a replica.
+
+    Everything stored in a cache loads from it: the ``book:{id}`` and
+    ``author:{id}`` records, which have no TTL, and, through
+    :func:`app.core.response_cache.cache_response`, the list pages, counters and
+    response bodies kept under a generation. A lagging replica would otherwise
+    freeze rows from before the last write under the generation it bumped.
+    """
+    if not db.info.get(REPLICA_INFO_KEY):
+        yield db
+        return
+    primary = SessionLocal()
+    try:
+        yield primary
+    finally:
+        primary.close()
+
+
+@asynccontextmanager
+async def async_primary_session(db: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """Async variant of :func:`primary_session`."""
+    if not db.info.get(REPLICA_INFO_KEY):
+        yield db
+        return
+    async with AsyncSessionLocal() as primary:
+        yield primary
+
+
+def _session(request: Request) -> Session:
+    # Reads go to a replica when one is configured and healthy, everything else to the primary
+    db = read_replicas.session() if request.method in READ_METHODS else None
+    return db if db is not None else SessionLocal()
+
+
+async def _async_session(request: Request) -> AsyncSession:
+    db = await async_read_replicas.async_session() if request.method in READ_METHODS else None
+    return db if db is not None else AsyncSessionLocal()
+
+
+def get_db(request: Request):
+    init_database()
+    shared = request.scope.get(SHARED_SESSIONS_SCOPE_KEY)
+    if shared is not None:
+        # Sub-request of POST /batch: the first one opens the session, the batch closes it
+        if "sync" not in shared:
+            shared["sync"] = _session(request)
+        yield shared["sync"]
+        return
+    db = _session(request)
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db(request: Request):
+    init_database()
+    shared = request.scope.get(SHARED_SESSIONS_SCOPE_KEY)
+    if shared is not None:
+        if "async" not in shared:
+            shared["async"] = await _async_session(request)
+        yield shared["async"]
+        return
+    async with await _async_session(request) as db:
+        yield db
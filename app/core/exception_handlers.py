@@ -1,8 +1,8 @@
 from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
+from app.core.responses import APIJSONResponse
 
 async def http_exception_handler(request: Request, exc: HTTPException):
-    return JSONResponse(
+    return APIJSONResponse(
         status_code=exc.status_code,
         content={
             "success": False,
@@ -11,7 +11,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     )
 
 async def general_exception_handler(request: Request, exc: Exception):
-    return JSONResponse(
+    return APIJSONResponse(
         status_code=500,
         content={
             "success": False,
@@ -0,0 +1,147 @@
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.multiprocess import MultiProcessCollector
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Redis and SQL calls are mostly sub-millisecond, the default buckets start at 5ms
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route and status code", ["method", "route", "status"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to serve an HTTP request, body included", ["method", "route"]
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by key namespace, tier and result", ["namespace", "tier", "result"]
+)
+REDIS_DURATION = Histogram(
+    "redis_request_duration_seconds", "Latency of Redis cache reads by key namespace", ["namespace"], buckets=FAST_BUCKETS
+)
+REDIS_BYPASSES = Counter(
+    "redis_bypass_total", "Redis commands skipped because Redis was unavailable", ["command"]
+)
+REDIS_CIRCUIT_OPEN = Gauge(
+    "redis_circuit_open", "1 while the Redis circuit breaker is open and the cache is bypassed", multiprocess_mode="max"
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time; the count is the number of statements", ["database"],
+    buckets=FAST_BUCKETS,
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection", ["database"],
+    buckets=FAST_BUCKETS,
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight", "Requests being served, per worker under admission control", multiprocess_mode="livesum"
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth", "Requests waiting for an admission slot", multiprocess_mode="livesum"
+)
+ADMISSION_SHED = Counter(
+    "admission_shed_total", "Requests rejected with a 503 by admission control", ["reason"]
+)
+RATE_LIMITED = Counter(
+    "rate_limited_total", "Requests rejected with a 429 by the rate limiter, by budget", ["budget"]
+)
+
+# Label of requests that matched no route, so unknown paths cannot blow up the label set
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def cache_namespace(key: str) -> str:
+    """Label for a cache key: ``book:12`` -> ``book``, ``books:3:id:0:10`` -> ``books``."""
+    return key.split(":", 1)[0]
+
+
+def record_cache_lookup(key: str, tier: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache_namespace(key), tier, "hit" if hit else "miss").inc()
+
+
+def record_redis_duration(key: str, started: float) -> None:
+    REDIS_DURATION.labels(cache_namespace(key)).observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine, database: str) -> None:
+    """Time every statement run on ``engine`` (sync engine, or the ``sync_engine`` of an async one)."""
+    histogram = DB_QUERY_DURATION.labels(database)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        histogram.observe(time.perf_counter() - conn.info["query_started"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        # Failed statements never reach after_cursor_execute
+        if context.connection is not None and context.connection.info.get("query_started"):
+            histogram.observe(time.perf_counter() - context.connection.info["query_started"].pop())
+
+
+class _TimedPoolMixin:
+    """Records how long :meth:`connect` waits for a connection, labelled by the pool's logging name."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            DB_POOL_WAIT.labels(self._orig_logging_name or "default").observe(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware counting requests and timing them per route template
+    (``/books/{id}``, not ``/books/12``) until the last body chunk is sent.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the shared scope
+            route = scope.get("route")
+            path = getattr(route, "path", UNMATCHED_ROUTE)
+            HTTP_REQUESTS.labels(scope["method"], path, str(status)).inc()
+            HTTP_REQUEST_DURATION.labels(scope["method"], path).observe(time.perf_counter() - started)
+
+
+def render_metrics() -> bytes:
+    """Metrics of this process, or of every worker when PROMETHEUS_MULTIPROC_DIR is set."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
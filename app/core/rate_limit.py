@@ -0,0 +1,216 @@
+import hashlib
+import math
+from collections import Counter
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import parse_qs
+
+import orjson
+from redis.exceptions import NoScriptError
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.admission import is_exempt
+from app.core.config import BATCH_MAX_BODY_BYTES, BATCH_MAX_REQUESTS
+from app.core.metrics import RATE_LIMITED
+from app.core.redis import async_redis_client
+from app.core.responses import APIJSONResponse
+
+# Budgets: GETs of the cached routes, and everything that reaches the database or streams the table
+READ_BUDGET = "read"
+EXPENSIVE_BUDGET = "expensive"
+
+# Charged per sub-request rather than per request, see batch_costs()
+BATCH_PATH = "/batch"
+
+# Refill each bucket of KEYS for the time elapsed since its last request, then take the cost of every
+# bucket if they all have enough, else none. ARGV holds rate, burst and cost per key. Redis' clock is used
+# so every worker agrees. Returns {allowed, milliseconds until enough tokens, index of the short bucket}.
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local tokens = {}
+local short, wait = 0, 0
+for i, key in ipairs(KEYS) do
+    local rate, burst, cost = tonumber(ARGV[3 * i - 2]), tonumber(ARGV[3 * i - 1]), tonumber(ARGV[3 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local ts = tonumber(state[2]) or now
+    tokens[i] = math.min(burst, (tonumber(state[1]) or burst) + math.max(0, now - ts) * rate / 1000)
+    if short == 0 and tokens[i] < cost then
+        short, wait = i, math.ceil((cost - tokens[i]) * 1000 / rate)
+    end
+end
+for i, key in ipairs(KEYS) do
+    local rate, burst, cost = tonumber(ARGV[3 * i - 2]), tonumber(ARGV[3 * i - 1]), tonumber(ARGV[3 * i])
+    if short == 0 then
+        tokens[i] = tokens[i] - cost
+    end
+    redis.call('HSET', key, 'tokens', tokens[i], 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(burst * 1000 / rate) + 1000)
+end
+return {short == 0 and 1 or 0, wait, short}
+"""
+TOKEN_BUCKET_SHA = hashlib.sha1(TOKEN_BUCKET_SCRIPT.encode()).hexdigest()
+
+
+class Budget(NamedTuple):
+    rate: float  # tokens refilled per second
+    burst: int  # bucket size
+
+
+def request_budget(scope: Scope) -> str:
+    """Budget a request is charged to: cheap cached reads, or writes, search and export."""
+    if scope["method"] not in ("GET", "HEAD") or scope["path"].endswith("/export"):
+        return EXPENSIVE_BUDGET
+    query = parse_qs(scope["query_string"].decode("latin-1"))
+    if any(value.strip() for value in query.get("q", [])):
+        return EXPENSIVE_BUDGET
+    return READ_BUDGET
+
+
+def batch_costs(body: bytes) -> Dict[str, int]:
+    """
+    Tokens a ``POST /batch`` is charged per budget: one per sub-request, taken
+    from the budget the sub-request would be charged to on its own.
+
+    A body that is not a batch is charged one expensive token; the route rejects it anyway.
+    """
+    try:
+        items = orjson.loads(body)["requests"]
+    except (orjson.JSONDecodeError, KeyError, TypeError):
+        return {EXPENSIVE_BUDGET: 1}
+    if not isinstance(items, list) or not items:
+        return {EXPENSIVE_BUDGET: 1}
+    costs = Counter()
+    # Batches over the limit are rejected by validation, they cost no more than the largest valid one
+    for item in items[:BATCH_MAX_REQUESTS]:
+        path = item.get("path") if isinstance(item, dict) else None
+        path, _, query = (path if isinstance(path, str) else "").partition("?")
+        costs[request_budget({"method": "GET", "path": path, "query_string": query.encode()})] += 1
+    return dict(costs)
+
+
+class BodyTooLarge(Exception):
+    """The request body is larger than the limiter is willing to read."""
+
+
+async def read_body(receive: Receive, max_bytes: int) -> Tuple[bytes, Receive]:
+    """
+    Read the whole request body, and return it with a ``receive`` that replays it to the app.
+
+    :raises BodyTooLarge: As soon as more than ``max_bytes`` have arrived, without reading the rest
+    """
+    chunks, message, size = [], None, 0
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        size += len(chunks[-1])
+        if size > max_bytes:
+            raise BodyTooLarge()
+        if not message.get("more_body", False):
+            message = None
+            break
+    body = b"".join(chunks)
+    pending = [{"type": "http.request", "body": body, "more_body": False}] + ([message] if message else [])
+
+    async def replay() -> Message:
+        return pending.pop(0) if pending else await receive()
+
+    return body, replay
+
+
+def client_identity(scope: Scope, key_header: bytes) -> str:
+    """The API key when the request carries one, hashed so it is not stored in Redis, else the client IP."""
+    for name, value in scope["headers"]:
+        if name == key_header and value:
+            return "key:" + hashlib.blake2b(value, digest_size=12).hexdigest()
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+async def take_tokens(charges: Sequence[Tuple[str, Budget, int]]) -> Optional[Tuple[int, int]]:
+    """
+    Take ``cost`` tokens from each ``(key, budget, cost)`` bucket in one round
+    trip: from all of them when every one has enough, else from none.
+
+    :return: None when allowed, else the index of the first bucket short of
+             tokens and the milliseconds until it has enough.
+             Allowed as well while Redis is unavailable: the limiter fails open
+    """
+    keys = [key for key, _, _ in charges]
+    args = [value for _, budget, cost in charges for value in (budget.rate, budget.burst, cost)]
+    try:
+        result = await async_redis_client.evalsha(TOKEN_BUCKET_SHA, len(keys), *keys, *args)
+    except NoScriptError:
+        # First call after a Redis restart: EVAL also caches the script for the next EVALSHA
+        result = await async_redis_client.eval(TOKEN_BUCKET_SCRIPT, len(keys), *keys, *args)
+    if not result or result[0]:
+        return None
+    return int(result[2]) - 1, int(result[1])
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware limiting each client with Redis token buckets.
+
+    Clients are told apart by the ``key_header`` API key, or by IP when they
+    send none (behind a proxy, run uvicorn with ``--proxy-headers`` so the IP
+    is the client's). Each client has one bucket per budget of ``budgets``,
+    see :func:`request_budget`. A request costs one Redis round trip (one
+    EVALSHA); a client out of tokens gets a 429 with ``Retry-After``.
+
+    ``POST /batch`` is read first and charged one token per sub-request, in
+    the budget of each (:func:`batch_costs`), so a batch of searches costs what
+    the searches would. Both budgets are charged in the same EVALSHA, all or
+    nothing. Its body is read up to ``max_batch_body`` bytes; a larger one gets
+    a 413 without being buffered. Internal warm-up and refresh requests are not
+    limited.
+    """
+
+    def __init__(self, app: ASGIApp, budgets: Dict[str, Budget], key_header: str, max_batch_body: int = BATCH_MAX_BODY_BYTES):
+        self.app = app
+        self.budgets = budgets
+        self.key_header = key_header.lower().encode()
+        self.max_batch_body = max_batch_body
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or is_exempt(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "POST" and scope["path"] == BATCH_PATH:
+            length = Headers(scope=scope).get("content-length", "")
+            try:
+                # A declared length over the limit is refused before reading anything
+                if length.isdigit() and int(length) > self.max_batch_body:
+                    raise BodyTooLarge()
+                body, receive = await read_body(receive, self.max_batch_body)
+            except BodyTooLarge:
+                response = APIJSONResponse(status_code=413, content={"success": False, "message": "Batch body too large"})
+                await response(scope, receive, send)
+                return
+            costs = batch_costs(body)
+        else:
+            costs = {request_budget(scope): 1}
+
+        identity = client_identity(scope, self.key_header)
+        # A cost above the burst could never be paid, a full bucket is taken instead
+        charges = [
+            (f"ratelimit:{budget}:{identity}", self.budgets[budget], min(cost, self.budgets[budget].burst))
+            for budget, cost in costs.items()
+        ]
+        refused = await take_tokens(charges)
+        if refused is None:
+            await self.app(scope, receive, send)
+            return
+
+        index, wait = refused
+        budget = list(costs)[index]
+        RATE_LIMITED.labels(budget).inc()
+        response = APIJSONResponse(
+            status_code=429,
+            content={"success": False, "message": "Rate limit exceeded"},
+            headers={"Retry-After": str(max(1, math.ceil(wait / 1000)))},
+        )
+        await response(scope, receive, send)
@@ -1,4 +1,65 @@
+import os
+
 import redis
-from app.core.config import REDIS_URL
+import redis.asyncio
+from app.core.circuit_breaker import AsyncGuardedRedis, CircuitBreaker, GuardedRedis
+from app.core.config import (
+    REDIS_CIRCUIT_FAILURES,
+    REDIS_CONNECT_TIMEOUT,
+    REDIS_MAX_PENDING_INVALIDATIONS,
+    REDIS_PROBE_INTERVAL,
+    REDIS_SOCKET_TIMEOUT,
+    REDIS_URL,
+)
+
+# REDIS_URL=memory:// swaps Redis for an in-process fake, for tests and benchmarks on one process
+MEMORY_URL_SCHEME = "memory://"
+
+
+def _memory_clients():
+    try:
+        import fakeredis
+        import fakeredis.aioredis
+    except ImportError:
+        raise RuntimeError("REDIS_URL=memory:// needs the fakeredis and lupa packages")
+    # One server so the text, binary, sync and async clients all see the same keys
+    server = fakeredis.FakeServer()
+    return (
+        fakeredis.FakeStrictRedis(server=server, decode_responses=True),
+        fakeredis.aioredis.FakeRedis(server=server, decode_responses=True),
+        fakeredis.FakeStrictRedis(server=server),
+        fakeredis.aioredis.FakeRedis(server=server),
+    )
+
+
+def _redis_clients():
+    timeouts = {"socket_timeout": REDIS_SOCKET_TIMEOUT, "socket_connect_timeout": REDIS_CONNECT_TIMEOUT}
+    return (
+        redis.StrictRedis.from_url(REDIS_URL, decode_responses=True, **timeouts),
+        # Used by the async repositories; the connection pool is created lazily on first command
+        redis.asyncio.StrictRedis.from_url(REDIS_URL, decode_responses=True, **timeouts),
+        # Binary clients for caches whose values are bytes (record codec, pre-rendered responses)
+        redis.StrictRedis.from_url(REDIS_URL, **timeouts),
+        redis.asyncio.StrictRedis.from_url(REDIS_URL, **timeouts),
+    )
+
+
+# Building a client opens no connection, and redis-py resets its pools in a forked worker,
+# so the clients can be created at import, also in a pre-forking master
+_sync_text, _async_text, _sync_bytes, _async_bytes = (
+    _memory_clients() if REDIS_URL.startswith(MEMORY_URL_SCHEME) else _redis_clients()
+)
+
+# All clients talk to the same Redis, so one breaker decides for all of them
+redis_breaker = CircuitBreaker(
+    _sync_text,
+    failure_threshold=REDIS_CIRCUIT_FAILURES,
+    probe_interval=REDIS_PROBE_INTERVAL,
+    max_pending=REDIS_MAX_PENDING_INVALIDATIONS,
+)
+os.register_at_fork(after_in_child=redis_breaker.after_fork)
 
-redis_client = redis.StrictRedis.from_url(REDIS_URL, decode_responses=True)
+redis_client = GuardedRedis(_sync_text, redis_breaker)
+async_redis_client = AsyncGuardedRedis(_async_text, redis_breaker)
+redis_bytes_client = GuardedRedis(_sync_bytes, redis_breaker)
+async_redis_bytes_client = AsyncGuardedRedis(_async_bytes, redis_breaker)
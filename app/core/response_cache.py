@@ -0,0 +1,264 @@
+import functools
+import hashlib
+import inspect
+from datetime import date
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Type, Union
+from urllib.parse import urlencode
+
+from fastapi import Request, Response, params
+from pydantic import BaseModel
+
+from app.core.cache import async_get_generations, get_generations, response_cache
+from app.core.compression import identity_etag
+from app.core.config import CACHE_CONTROL, CACHE_CONTROL_ROUTES, RESPONSE_CACHE_TTL
+from app.core.database import async_primary_session, primary_session
+from app.core.redis import redis_breaker
+from app.core.warmup import async_record_hit, is_refresh, needs_refresh, record_hit, schedule_refresh
+
+
+def query_parameters(endpoint: Callable) -> Dict[str, params.Query]:
+    """The ``Query(...)`` declaration of each query parameter of ``endpoint``, by argument name."""
+    return {
+        name: parameter.default
+        for name, parameter in inspect.signature(endpoint).parameters.items()
+        if isinstance(parameter.default, params.Query)
+    }
+
+
+def _query_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def cache_path(request: Request, values: Mapping[str, Any], queries: Mapping[str, params.Query]) -> str:
+    """
+    Path plus the validated query parameters that differ from their default,
+    sorted by name.
+
+    Equivalent requests share one entry: ``?page=1&limit=5`` and
+    ``?limit=5&page=1``, ``?author_id=07`` and ``?author_id=7``, ``?page=0``
+    and no query at all. Parameters the route does not declare are left out.
+    The result is still a valid URL of the route, the warm-up requests it.
+    """
+    items = sorted(
+        (query.alias or name, _query_value(values[name]))
+        for name, query in queries.items()
+        if values.get(name) is not None and values[name] != query.default
+    )
+    return f"{request.url.path}?{urlencode(items)}"
+
+
+def response_cache_key(namespaces: Sequence[str], generations: Sequence[int], path: str) -> str:
+    """Key of a cached response body: the generations it depends on, then the :func:`cache_path`."""
+    versions = ",".join(f"{namespace}:{generation}" for namespace, generation in zip(namespaces, generations))
+    return f"resp:{versions}:{path}"
+
+
+# Scope entry of the sub-requests of POST /batch, holding their BatchCache
+BATCH_CACHE_SCOPE_KEY = "app.batch_cache"
+
+
+class BatchCache:
+    """
+    Response cache reads of the sub-requests of one ``POST /batch``, merged.
+
+    The sub-requests of cached routes first run while :attr:`planning` is set:
+    the :func:`cache_response` wrapper validates the parameters, notes the
+    namespaces and path it would read and returns without calling the route.
+    :meth:`prefetch` then reads the generations of every noted namespace with
+    one MGET and the cached bodies with another, and the sub-requests run for
+    real against those results: two Redis round trips for the whole batch
+    instead of two per sub-request. Misses are rendered and stored as usual.
+    """
+
+    def __init__(self):
+        self.planning = True
+        self._planned: List[Tuple[Tuple[str, ...], str]] = []
+        self._generations: Dict[str, int] = {}
+        self._bodies: Dict[str, Optional[bytes]] = {}
+
+    def plan(self, namespaces: Tuple[str, ...], path: str) -> None:
+        self._planned.append((namespaces, path))
+
+    async def prefetch(self) -> None:
+        self.planning = False
+        if not self._planned:
+            return
+        names = sorted({name for namespaces, _ in self._planned for name in namespaces})
+        self._generations = dict(zip(names, await async_get_generations(*names)))
+        self._bodies = await response_cache.async_get_many([self.key(namespaces, path) for namespaces, path in self._planned])
+
+    def key(self, namespaces: Tuple[str, ...], path: str) -> str:
+        return response_cache_key(namespaces, [self._generations[name] for name in namespaces], path)
+
+    def body(self, key: str) -> Optional[bytes]:
+        return self._bodies.get(key)
+
+
+def render(response_model: Type[BaseModel], content: Any) -> bytes:
+    """
+    Serialize ``content`` the way FastAPI would for ``response_model``.
+
+    Nested models are serialized by their own class, so the sparse list
+    models of ``?fields=`` (see :func:`app.schemas.response_schema.sparse_list`)
+    render only their fields.
+    """
+    return response_model.model_validate(content, from_attributes=True).model_dump_json(serialize_as_any=True).encode()
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag of a response body."""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Weak comparison of an ``If-None-Match`` header against ``etag``, as RFC 9110 requires for GET.
+
+    The tags of compressed copies carry an encoding suffix (see
+    :func:`app.core.compression.encoded_etag`), which is ignored: any
+    encoding of an unchanged body is still current.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(identity_etag(tag.strip().removeprefix("W/")) == etag for tag in if_none_match.split(","))
+
+
+def cached_body_response(request: Request, body: bytes, cache_control: str) -> Response:
+    """Return ``body`` with its ETag, or an empty 304 if the client already has it."""
+    etag = compute_etag(body)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cache_response(
+    namespace: Union[str, Sequence[str]],
+    response_model: Type[BaseModel],
+    cache_control: Optional[str] = None,
+    record: Optional[str] = None,
+):
+    """
+    Serve a GET route from pre-rendered response bytes.
+
+    On a hit the cached body is returned as is, skipping the repository, the
+    ORM objects and the Pydantic validation and serialization of
+    ``response_model``. On a miss the route runs normally and its rendered
+    body is stored under the current generation of ``namespace`` (or of each
+    namespace, when the route reads several), so any write to them makes the
+    entry unreachable.
+
+    Single-record routes pass ``record``, a template formatted with the
+    route's arguments (:data:`app.core.cache.BOOK_RECORD`). Their entry is
+    keyed on that record's version instead,
+    so writes to other records of the namespace leave it and its ETag alone.
+
+    Responses carry a strong ETag computed from the body, so it only changes
+    when the record or page does, and ``If-None-Match`` is answered with a 304.
+    The body comes from the cache, so a revalidation does not touch the
+    database while the entry is cached. ``Cache-Control`` defaults to
+    ``CACHE_CONTROL_ROUTES[<endpoint name>]``, then ``CACHE_CONTROL``.
+
+    Requests are sampled into the hot path ranking used by the warm-up, and
+    a hit on an entry about to expire re-renders it in the background
+    (refresh-ahead, see :mod:`app.core.warmup`).
+
+    Entries are keyed by the validated query parameters (see
+    :func:`cache_path`), not by the raw query string. Sub-requests of
+    ``POST /batch`` read their entries through the batch's :class:`BatchCache`.
+
+    A miss runs the route on the primary (see :func:`primary_session`), even
+    for a GET served by a replica: the rendered body, and the list pages and
+    counters the repositories cache on the way, are stored under the
+    generation a write has just bumped, and a lagging replica would freeze its
+    pre-write rows under it.
+
+    The decorated route must take ``request: Request`` and ``db`` parameters.
+    Errors raised by the route (404, 400) are not cached.
+    """
+    namespaces = (namespace,) if isinstance(namespace, str) else tuple(namespace)
+
+    def decorator(endpoint: Callable) -> Callable:
+        header = cache_control or CACHE_CONTROL_ROUTES.get(endpoint.__name__, CACHE_CONTROL)
+        queries = query_parameters(endpoint)
+
+        def versioned(kwargs) -> Tuple[str, ...]:
+            # What the entry is keyed on: the record's own version, or the namespace generations
+            return (record.format(**kwargs),) if record else namespaces
+
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def async_wrapper(*args, **kwargs):
+                request: Request = kwargs["request"]
+                path = cache_path(request, kwargs, queries)
+                versions = versioned(kwargs)
+                batch: Optional[BatchCache] = request.scope.get(BATCH_CACHE_SCOPE_KEY)
+                if batch is not None and batch.planning:
+                    batch.plan(versions, path)
+                    return Response(status_code=204)
+                if redis_breaker.is_open:
+                    return cached_body_response(request, render(response_model, await endpoint(*args, **kwargs)), header)
+                refresh = is_refresh(request.headers)
+                if not refresh:
+                    await async_record_hit(path)
+                if batch is not None:
+                    key = batch.key(versions, path)
+                    body, ttl = batch.body(key), None
+                else:
+                    key = response_cache_key(versions, await async_get_generations(*versions), path)
+                    body, ttl = (None, None) if refresh else await response_cache.async_get_with_ttl(key)
+                if body is None:
+                    async with async_primary_session(kwargs["db"]) as db:
+                        body = render(response_model, await endpoint(*args, **{**kwargs, "db": db}))
+                    await response_cache.async_set(key, body, publish=False, ex=RESPONSE_CACHE_TTL)
+                response = cached_body_response(request, body, header)
+                if needs_refresh(ttl):
+                    schedule_refresh(response, request.app, path, key)
+                return response
+
+            async_wrapper.cache_namespaces = namespaces
+            return async_wrapper
+
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            request: Request = kwargs["request"]
+            path = cache_path(request, kwargs, queries)
+            versions = versioned(kwargs)
+            batch: Optional[BatchCache] = request.scope.get(BATCH_CACHE_SCOPE_KEY)
+            if batch is not None and batch.planning:
+                # First pass of POST /batch: only note what would be read, see BatchCache
+                batch.plan(versions, path)
+                return Response(status_code=204)
+            # Generations cannot be read while Redis is unavailable, so no cached body can be trusted
+            if redis_breaker.is_open:
+                return cached_body_response(request, render(response_model, endpoint(*args, **kwargs)), header)
+            # A refresh-ahead request skips the read and stores a fresh copy
+            refresh = is_refresh(request.headers)
+            if not refresh:
+                record_hit(path)
+            if batch is not None:
+                key = batch.key(versions, path)
+                body, ttl = batch.body(key), None
+            else:
+                key = response_cache_key(versions, get_generations(*versions), path)
+                body, ttl = (None, None) if refresh else response_cache.get_with_ttl(key)
+            if body is None:
+                with primary_session(kwargs["db"]) as db:
+                    body = render(response_model, endpoint(*args, **{**kwargs, "db": db}))
+                response_cache.set(key, body, publish=False, ex=RESPONSE_CACHE_TTL)
+            response = cached_body_response(request, body, header)
+            if needs_refresh(ttl):
+                schedule_refresh(response, request.app, path, key)
+            return response
+
+        # Lets POST /batch tell the cached routes apart
+        wrapper.cache_namespaces = namespaces
+        return wrapper
+
+    return decorator
@@ -0,0 +1,197 @@
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from redis.exceptions import LockError
+
+from app.core.config import CACHE_LOCK_TIMEOUT, CACHE_LOCK_WAIT
+from app.core.redis import async_redis_client, redis_client
+
+# Interval between cache reads while waiting for another worker to fill a key
+POLL_INTERVAL = 0.02
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key within one process: the first
+    caller runs the function, the others block and receive its result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+class AsyncSingleFlight:
+    """Same as :class:`SingleFlight` for coroutines running on the event loop."""
+
+    def __init__(self):
+        # Keyed by event loop too, a future can only be awaited on the loop that created it
+        self._calls: Dict[tuple, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        loop = asyncio.get_running_loop()
+        call_key = (loop, key)
+        future = self._calls.get(call_key)
+        if future is not None:
+            # shield: a cancelled follower must not cancel the shared load
+            return await asyncio.shield(future)
+
+        future = self._calls[call_key] = loop.create_future()
+        try:
+            result = await fn()
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when no follower was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[call_key]
+
+
+_flight = SingleFlight()
+_async_flight = AsyncSingleFlight()
+
+
+def lock_key(key: str) -> str:
+    return f"lock:{key}"
+
+
+def load_once(
+    key: str,
+    load: Callable[[], Optional[str]],
+    read: Callable[[], Optional[str]],
+    write: Callable[[str], None],
+    stale: Optional[Callable[[], Optional[str]]] = None,
+) -> Optional[str]:
+    """
+    Rebuild a missing cache entry without a stampede.
+
+    Concurrent misses in this worker share one call. Across workers only the
+    holder of a short Redis lock runs ``load``; the others return the value of
+    ``stale`` when given, or wait up to ``CACHE_LOCK_WAIT`` for the holder to
+    fill the key before falling back to loading it themselves.
+
+    :param key: Cache key being rebuilt
+    :param load: Loads the serialized value from the database, or None if it does not exist
+    :param read: Reads the key from the cache
+    :param write: Stores a loaded value in the cache
+    :param stale: Optionally reads an older copy to serve while another worker rebuilds
+    :return: The serialized value, or None if ``load`` found nothing
+    """
+    return _flight.do(key, lambda: _load_locked(key, load, read, write, stale))
+
+
+def _load_locked(key, load, read, write, stale) -> Optional[str]:
+    lock = redis_client.lock(lock_key(key), timeout=CACHE_LOCK_TIMEOUT)
+    if lock.acquire(blocking=False):
+        try:
+            value = load()
+            if value is not None:
+                write(value)
+            return value
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                pass
+
+    if stale is not None:
+        value = stale()
+        if value is not None:
+            return value
+
+    deadline = time.monotonic() + CACHE_LOCK_WAIT
+    while True:
+        value = read()
+        if value is not None:
+            return value
+        if time.monotonic() >= deadline or not redis_client.exists(lock.name):
+            break
+        time.sleep(POLL_INTERVAL)
+
+    # The holder gave up, found nothing or is too slow
+    value = load()
+    if value is not None:
+        write(value)
+    return value
+
+
+async def async_load_once(
+    key: str,
+    load: Callable[[], Awaitable[Optional[str]]],
+    read: Callable[[], Awaitable[Optional[str]]],
+    write: Callable[[str], Awaitable[None]],
+    stale: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+) -> Optional[str]:
+    """Async counterpart of :func:`load_once`, taking coroutine functions."""
+    return await _async_flight.do(key, lambda: _async_load_locked(key, load, read, write, stale))
+
+
+async def _async_load_locked(key, load, read, write, stale) -> Optional[str]:
+    lock = async_redis_client.lock(lock_key(key), timeout=CACHE_LOCK_TIMEOUT)
+    if await lock.acquire(blocking=False):
+        try:
+            value = await load()
+            if value is not None:
+                await write(value)
+            return value
+        finally:
+            try:
+                await lock.release()
+            except LockError:
+                pass
+
+    if stale is not None:
+        value = await stale()
+        if value is not None:
+            return value
+
+    deadline = time.monotonic() + CACHE_LOCK_WAIT
+    while True:
+        value = await read()
+        if value is not None:
+            return value
+        if time.monotonic() >= deadline or not await async_redis_client.exists(lock.name):
+            break
+        await asyncio.sleep(POLL_INTERVAL)
+
+    value = await load()
+    if value is not None:
+        await write(value)
+    return value
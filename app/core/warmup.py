@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import random
+import time
+import uuid
+from typing import List, Set
+
+import httpx
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import (
+    REFRESH_AHEAD_WINDOW,
+    WARMUP_CONCURRENCY,
+    WARMUP_SAMPLE_RATE,
+    WARMUP_TRACKED_PATHS,
+)
+from app.core.admission import INTERNAL_SCOPE_KEY
+from app.core.redis import async_redis_client, redis_client
+
+logger = logging.getLogger(__name__)
+
+# Sorted set of cached GET paths (with their normalized query) scored by sampled request count
+HOT_PATHS_KEY = "hot:paths"
+
+# Refresh requests carry this per-process token, so clients cannot force a cache bypass
+REFRESH_HEADER = "x-cache-refresh"
+REFRESH_TOKEN = uuid.uuid4().hex
+
+# Running refresh tasks, referenced so they are not garbage collected mid-flight
+_refresh_tasks: Set[asyncio.Task] = set()
+
+
+def record_hit(path: str) -> None:
+    """Count a request for ``path`` in the hot path ranking, for a sample of the calls."""
+    if random.random() >= WARMUP_SAMPLE_RATE:
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zincrby(HOT_PATHS_KEY, 1, path)
+    # Keep only the best ranked paths
+    pipe.zremrangebyrank(HOT_PATHS_KEY, 0, -WARMUP_TRACKED_PATHS - 1)
+    pipe.execute()
+
+
+async def async_record_hit(path: str) -> None:
+    if random.random() >= WARMUP_SAMPLE_RATE:
+        return
+    pipe = async_redis_client.pipeline(transaction=False)
+    pipe.zincrby(HOT_PATHS_KEY, 1, path)
+    pipe.zremrangebyrank(HOT_PATHS_KEY, 0, -WARMUP_TRACKED_PATHS - 1)
+    await pipe.execute()
+
+
+def is_refresh(headers) -> bool:
+    return headers.get(REFRESH_HEADER) == REFRESH_TOKEN
+
+
+def needs_refresh(ttl_ms) -> bool:
+    """Whether a cached entry with ``ttl_ms`` left (None when unknown) is due for refresh-ahead."""
+    return REFRESH_AHEAD_WINDOW > 0 and ttl_ms is not None and 0 <= ttl_ms < REFRESH_AHEAD_WINDOW * 1000
+
+
+def schedule_refresh(response: Response, app, path: str, key: str) -> None:
+    """
+    Re-render ``path`` in the background once ``response`` is sent.
+
+    The refresh is a regular in-process GET carrying :data:`REFRESH_TOKEN`, so
+    it runs with its own request scope and database session; the route skips
+    the cache read and stores a fresh copy. Only one worker refreshes a key.
+    """
+    response.background = BackgroundTask(_start_refresh, app, path, key)
+
+
+async def _start_refresh(app, path: str, key: str) -> None:
+    # Detached from the request so it does not hold the connection or count in its latency
+    task = asyncio.get_running_loop().create_task(_refresh(app, path, key))
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+async def _refresh(app, path: str, key: str) -> None:
+    if not await async_redis_client.set(f"refresh:{key}", 1, nx=True, ex=REFRESH_AHEAD_WINDOW):
+        return
+    try:
+        await _fetch(app, [path], {REFRESH_HEADER: REFRESH_TOKEN}, concurrency=1, deadline=None)
+    except Exception:
+        logger.exception("Refresh-ahead of %s failed", path)
+
+
+def _internal(app: ASGIApp) -> ASGIApp:
+    # Flags the requests so the rate limiter and admission control let them through
+    async def internal_app(scope: Scope, receive: Receive, send: Send) -> None:
+        await app({**scope, INTERNAL_SCOPE_KEY: True}, receive, send)
+
+    return internal_app
+
+
+async def _fetch(app, paths: List[str], headers: dict, concurrency: int, deadline) -> int:
+    pending = iter(paths)
+    loaded = 0
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal loaded
+        for path in pending:
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            response = await client.get(path, headers=headers)
+            if response.status_code == 200:
+                loaded += 1
+
+    transport = httpx.ASGITransport(app=_internal(app))
+    async with httpx.AsyncClient(transport=transport, base_url="http://cache-warmup") as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return loaded
+
+
+async def warm_up(app, max_paths: int, time_budget: float, concurrency: int = WARMUP_CONCURRENCY) -> dict:
+    """
+    Request the ``max_paths`` most requested cached GET paths through ``app``.
+
+    Each request fills every cache layer it reads through (records, list pages,
+    rendered responses, the local tier of this worker). Stops when
+    ``time_budget`` seconds have passed.
+    """
+    started = time.monotonic()
+    paths = await async_redis_client.zrevrange(HOT_PATHS_KEY, 0, max_paths - 1) or []
+    loaded = await _fetch(app, paths, {}, concurrency, deadline=started + time_budget)
+    result = {"paths": len(paths), "loaded": loaded, "seconds": round(time.monotonic() - started, 3)}
+    logger.info("Cache warm-up: %s", result)
+    return result
@@ -1,14 +1,88 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.openapi.utils import get_openapi
+from fastapi.routing import APIRoute
 from app.core.exception_handlers import general_exception_handler, http_exception_handler
-from app.core.database import engine, Base
-from app.routers import author_route, book_router
+from app.core.admission import AdmissionControlMiddleware
+from app.core.cache import record_cache
+from app.core.compression import CompressionMiddleware
+from app.core.config import (
+    ADMISSION_MAX_IN_FLIGHT,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT,
+    ADMISSION_RETRY_AFTER,
+    ASYNC_MODE,
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MINIMUM_SIZE,
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_EXPENSIVE_BURST,
+    RATE_LIMIT_EXPENSIVE_RATE,
+    RATE_LIMIT_KEY_HEADER,
+    RATE_LIMIT_READ_BURST,
+    RATE_LIMIT_READ_RATE,
+    WARMUP_MAX_PATHS,
+    WARMUP_ON_STARTUP,
+    WARMUP_TIME_BUDGET,
+)
+from app.core.database import dispose_database, init_database
+from app.core.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, render_metrics
+from app.core.rate_limit import EXPENSIVE_BUDGET, READ_BUDGET, Budget, RateLimitMiddleware
+from app.core.responses import APIJSONResponse
+from app.core.warmup import warm_up
+from app.routers import author_route, batch_router, book_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Engine dibuat di sini, per worker, bukan saat import; skema dibuat dengan `python -m app.cli bootstrap`
+    init_database()
+    # Dengarkan pesan invalidasi dari worker lain untuk cache lokal
+    record_cache.start_listener()
+    if WARMUP_ON_STARTUP:
+        # Isi cache dengan path yang paling sering diminta sebelum menerima traffic
+        await warm_up(app, WARMUP_MAX_PATHS, WARMUP_TIME_BUDGET)
+    yield
+    record_cache.stop_listener()
+    await dispose_database()
+
 
 app = FastAPI(
     title="Book and Author API",
     description="An API for managing authors and books, with support for pagination, search, and caching using Redis.",
     version="1.0.0",
+    lifespan=lifespan,
+    # Semua route memakai encoder orjson
+    default_response_class=APIJSONResponse,
+)
+
+# Kompresi brotli/gzip sesuai Accept-Encoding, hanya untuk body yang cukup besar
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MINIMUM_SIZE,
+    gzip_level=COMPRESSION_GZIP_LEVEL,
+    brotli_quality=COMPRESSION_BROTLI_QUALITY,
 )
+# Batasi request yang dilayani bersamaan; kelebihannya menunggu sebentar atau langsung mendapat 503
+app.add_middleware(
+    AdmissionControlMiddleware,
+    max_in_flight=ADMISSION_MAX_IN_FLIGHT,
+    max_queue=ADMISSION_MAX_QUEUE,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+    retry_after=ADMISSION_RETRY_AFTER,
+)
+if RATE_LIMIT_ENABLED:
+    # Di luar admission control, sehingga client yang melebihi jatahnya tidak ikut mengantre
+    app.add_middleware(
+        RateLimitMiddleware,
+        budgets={
+            READ_BUDGET: Budget(RATE_LIMIT_READ_RATE, RATE_LIMIT_READ_BURST),
+            EXPENSIVE_BUDGET: Budget(RATE_LIMIT_EXPENSIVE_RATE, RATE_LIMIT_EXPENSIVE_BURST),
+        },
+        key_header=RATE_LIMIT_KEY_HEADER,
+    )
+# Didaftarkan terakhir sehingga menjadi lapisan terluar dan ikut mengukur waktu kompresi
+app.add_middleware(MetricsMiddleware)
 
 
 def custom_openapi():
@@ -30,8 +104,30 @@ app.openapi = custom_openapi
 app.add_exception_handler(HTTPException, http_exception_handler)
 app.add_exception_handler(Exception, general_exception_handler)
 
+if ASYNC_MODE:
+    # Route async didaftarkan lebih dulu sehingga menang atas route sync dengan path yang sama
+    from app.routers import async_author_route, async_book_router
+
+    app.include_router(async_author_route.router)
+    app.include_router(async_book_router.router)
+
 app.include_router(author_route.router)
 app.include_router(book_router.router)
+# POST /batch menjalankan sub-request lewat route di atas, termasuk versi async-nya
+app.include_router(batch_router.router)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Format teks Prometheus: latensi per route, hit/miss cache per namespace, waktu query SQL dan tunggu pool
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
 
-# Membuat tabel database saat aplikasi berjalan
-Base.metadata.create_all(bind=engine)
+if ASYNC_MODE:
+    # Sembunyikan route sync yang tertutup versi async-nya dari dokumentasi
+    served = set()
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            key = (route.path, frozenset(route.methods))
+            if key in served:
+                route.include_in_schema = False
+            served.add(key)
@@ -1,10 +1,19 @@
-from sqlalchemy import Column, Integer, String, Text, Date
+from sqlalchemy import Column, Integer, String, Text, Date, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
+from app.utils.codec import RecordCodec
+from app.utils.search import register_sqlite_fts
+
+# Columns searched by ?q=, in the order of the FULLTEXT index
+AUTHOR_SEARCH_FIELDS = ["name", "bio"]
 
 
 class Author(Base):
     __tablename__ = "authors"
+    __table_args__ = (
+        # FULLTEXT index on MySQL only; SQLite uses the FTS5 table registered below
+        Index("ft_authors_name_bio", *AUTHOR_SEARCH_FIELDS, mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     # Menyertakan panjang maksimum 255 karakter untuk nama
@@ -12,13 +21,39 @@ class Author(Base):
     # Menggunakan tipe Text untuk bio, tanpa panjang maksimum yang diperlukan
     bio = Column(Text)
     birth_date = Column(Date)
+    # Jumlah buku author ini, diperbarui oleh BookRepository pada setiap penulisan buku; index untuk sort=-book_count
+    book_count = Column(Integer, nullable=False, default=0, server_default="0", index=True)
 
-    books = relationship("Book", back_populates="author")
+    books = relationship("Book", back_populates="author", order_by="Book.id")
 
     def to_dict(self):
         return {
             "id": self.id,
             "name": self.name,
             "bio": self.bio,
-            "birth_date": self.birth_date.isoformat() if self.birth_date else None
+            "birth_date": self.birth_date.isoformat() if self.birth_date else None,
+            "book_count": self.book_count,
         }
+
+
+register_sqlite_fts(Author.__table__, AUTHOR_SEARCH_FIELDS)
+
+# Columns written by GET /authors/export, in table order
+AUTHOR_EXPORT_FIELDS = [column.name for column in Author.__table__.columns]
+
+# Default columns of author lists; bio (Text) is only loaded when requested with ?fields=
+AUTHOR_LIST_FIELDS = [field for field in AUTHOR_EXPORT_FIELDS if field != "bio"]
+
+# Binary format of the author:{id} cache, matching to_dict()
+AUTHOR_RECORD_CODEC = RecordCodec([
+    ("id", "int"),
+    ("name", "str"),
+    ("bio", "str"),
+    ("birth_date", "date"),
+    ("book_count", "int"),
+])
+
+
+def author_cache_key(author_id: int) -> str:
+    # v2: records carry book_count; author:{id} entries written before it are never read again
+    return f"author:v2:{author_id}"
@@ -1,15 +1,27 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
+from app.utils.codec import RecordCodec
+from app.utils.search import register_sqlite_fts
+
+# Kolom yang dicari oleh ?q=, sesuai urutan kolom pada index FULLTEXT
+BOOK_SEARCH_FIELDS = ["title", "description"]
 
 class Book(Base):
     __tablename__ = "books"
+    __table_args__ = (
+        # Index FULLTEXT hanya untuk MySQL; SQLite memakai tabel FTS5 di bawah
+        Index("ft_books_title_description", *BOOK_SEARCH_FIELDS, mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+        # Filter author_id dengan sort/range publish_date dibaca langsung dari index ini;
+        # kolom depannya juga melayani setiap lookup author_id dan pemeriksaan foreign key
+        Index("ix_books_author_id_publish_date", "author_id", "publish_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), index=True)  # Menyertakan panjang maksimum 255 karakter untuk title
     description = Column(String(1000))  # Menyertakan panjang maksimum 1000 karakter untuk description
-    publish_date = Column(Date)
-    author_id = Column(Integer, ForeignKey("authors.id"))
+    publish_date = Column(Date, index=True)  # Index untuk sort=publish_date dan filter published_from/published_to
+    author_id = Column(Integer, ForeignKey("authors.id"))  # Tanpa index sendiri, lihat ix_books_author_id_publish_date
 
     author = relationship("Author", back_populates="books")
 
@@ -21,3 +33,21 @@ class Book(Base):
             "publish_date": self.publish_date.isoformat() if self.publish_date else None,
             "author_id": self.author_id
         }
+
+
+register_sqlite_fts(Book.__table__, BOOK_SEARCH_FIELDS)
+
+# Kolom yang ditulis oleh GET /books/export, sesuai urutan kolom tabel
+BOOK_EXPORT_FIELDS = [column.name for column in Book.__table__.columns]
+
+# Kolom default pada daftar buku; description (sampai 1000 karakter) hanya dimuat jika diminta lewat ?fields=
+BOOK_LIST_FIELDS = [field for field in BOOK_EXPORT_FIELDS if field != "description"]
+
+# Format biner cache book:{id}, field sesuai to_dict()
+BOOK_RECORD_CODEC = RecordCodec([
+    ("id", "int"),
+    ("title", "str"),
+    ("description", "str"),
+    ("publish_date", "date"),
+    ("author_id", "int"),
+])
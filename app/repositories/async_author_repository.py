@@ -0,0 +1,199 @@
+from typing import Any, AsyncIterator, Mapping, Optional, List, Sequence, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.models.author_model import AUTHOR_EXPORT_FIELDS, AUTHOR_LIST_FIELDS, AUTHOR_RECORD_CODEC, AUTHOR_SEARCH_FIELDS, Author, author_cache_key
+from app.schemas.author_schema import AuthorCreate, AuthorUpdate
+from app.core.cache import (
+    AUTHOR_RECORD,
+    AUTHORS_NAMESPACE,
+    BOOK_RECORD,
+    BOOKS_NAMESPACE,
+    async_bump_generation,
+    async_get_count,
+    async_get_generation,
+    async_get_list_page,
+    async_set_list_page,
+    async_stale_list_page,
+    list_cache_keys,
+    record_cache,
+)
+from app.core.database import async_primary_session
+from app.core.config import EXPORT_BATCH_SIZE
+from app.core.redis import async_redis_client
+from app.core.singleflight import async_load_once
+from app.repositories.author_repository import AUTHOR_SORT_FIELDS, author_from_dict, author_to_dict, books_option
+from app.utils.query_helper import columns_to_dict, estimate_row_count, load_columns
+from app.utils.search import normalize_query, search
+from app.utils.pagination import apply_keyset, apply_sort, decode_cursor, sort_columns, validate_sort
+import json
+
+class AsyncAuthorRepository:
+    """Async counterpart of AuthorRepository, sharing its cache keys."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_author(self, author: AuthorCreate) -> Author:
+        db_author = Author(**author.model_dump())
+        self.db.add(db_author)
+        await self.db.commit()
+        await self.db.refresh(db_author)
+
+        # Cache the newly created author in Redis
+        await record_cache.async_set(author_cache_key(db_author.id), AUTHOR_RECORD_CODEC.pack(db_author.to_dict()))
+        await async_bump_generation(AUTHORS_NAMESPACE, count_deltas={AUTHORS_NAMESPACE: 1})
+        return db_author
+
+    async def get_author(self, author_id: int) -> Optional[Author]:
+        cache_key = author_cache_key(author_id)
+
+        # Try to get the author from Redis cache
+        cached_author = await record_cache.async_get(cache_key)
+        if cached_author is None:
+            # If not found in cache, let a single request load it from the database
+            cached_author = await async_load_once(
+                cache_key,
+                load=lambda: self._load_author(author_id),
+                read=lambda: record_cache.async_get(cache_key),
+                write=lambda value: record_cache.async_set(cache_key, value, publish=False),
+            )
+        if cached_author:
+            return Author(**AUTHOR_RECORD_CODEC.unpack(cached_author))
+        return None
+
+    async def _load_author(self, author_id: int) -> Optional[str]:
+        # Record caches have no TTL, so they are filled from the primary
+        async with async_primary_session(self.db) as db:
+            author = await db.get(Author, author_id)
+        return AUTHOR_RECORD_CODEC.pack(author.to_dict()) if author else None
+
+    async def get_authors_by_ids(self, author_ids: List[int]) -> List[Author]:
+        cache_keys = {author_id: author_cache_key(author_id) for author_id in author_ids}
+
+        # Serve whatever is cached with a single MGET
+        cached = await record_cache.async_get_many(list(cache_keys.values()))
+        missing = [author_id for author_id, cache_key in cache_keys.items() if cached[cache_key] is None]
+        if missing:
+            async with async_primary_session(self.db) as db:
+                authors = (await db.scalars(select(Author).where(Author.id.in_(missing)))).all()
+            loaded = {cache_keys[author.id]: AUTHOR_RECORD_CODEC.pack(author.to_dict()) for author in authors}
+            if loaded:
+                await record_cache.async_set_many(loaded, publish=False)
+            cached.update(loaded)
+
+        return [Author(**AUTHOR_RECORD_CODEC.unpack(cached[cache_key])) for cache_key in cache_keys.values() if cached[cache_key]]
+
+    async def get_authors(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        sort: str = "id",
+        cursor: Optional[str] = None,
+        include_books: bool = False,
+        fields: Sequence[str] = AUTHOR_LIST_FIELDS,
+    ) -> List[Author]:
+        validate_sort(sort, AUTHOR_SORT_FIELDS)
+        columns = sort_columns(fields, AUTHOR_SORT_FIELDS[sort])
+        suffix = f"cursor:{sort}:{cursor}:{limit}" if cursor else f"{sort}:{skip}:{limit}"
+        suffix += f":{','.join(columns)}"
+        if include_books:
+            suffix += f":books:{await async_get_generation(BOOKS_NAMESPACE)}"
+        cache_key, stale_key = list_cache_keys(AUTHORS_NAMESPACE, await async_get_generation(AUTHORS_NAMESPACE), suffix)
+
+        # Try to get the list of authors from Redis cache
+        cached_authors = await async_get_list_page(cache_key)
+        if cached_authors is None:
+            # If not found in cache, get the data from the database
+            query = apply_sort(select(Author).options(load_columns(Author, columns)), sort, AUTHOR_SORT_FIELDS, Author.id)
+            if cursor:
+                after = decode_cursor(cursor, sort, AUTHOR_SORT_FIELDS, Author.id)
+                query = apply_keyset(query, sort, AUTHOR_SORT_FIELDS, Author.id, after)
+            else:
+                query = query.offset(skip)
+            if include_books:
+                # Lazy loading is not available in async mode; selectinload fetches the books in one query
+                query = query.options(books_option())
+
+            async def load() -> str:
+                authors = (await self.db.scalars(query.limit(limit))).all()
+                return json.dumps([author_to_dict(author, columns, include_books) for author in authors])
+
+            cached_authors = await async_load_once(
+                cache_key,
+                load=load,
+                read=lambda: async_redis_client.get(cache_key),
+                write=lambda value: async_set_list_page(cache_key, stale_key, value),
+                stale=async_stale_list_page(stale_key),
+            )
+
+        return [author_from_dict(author_dict) for author_dict in json.loads(cached_authors)]
+
+    async def search_authors(
+        self, q: str, skip: int = 0, limit: int = 10, fields: Sequence[str] = AUTHOR_EXPORT_FIELDS
+    ) -> Tuple[List[Author], int]:
+        q = normalize_query(q)
+        suffix = f"search:{q}:{skip}:{limit}:{','.join(fields)}"
+        cache_key, stale_key = list_cache_keys(AUTHORS_NAMESPACE, await async_get_generation(AUTHORS_NAMESPACE), suffix)
+
+        cached_result = await async_get_list_page(cache_key)
+        if cached_result is None:
+            def load_sync(session) -> str:
+                authors, total = search(session, Author, AUTHOR_SEARCH_FIELDS, q, skip, limit, load=fields)
+                return json.dumps({"total": total, "authors": [columns_to_dict(author, fields) for author in authors]})
+
+            cached_result = await async_load_once(
+                cache_key,
+                load=lambda: self.db.run_sync(load_sync),
+                read=lambda: async_redis_client.get(cache_key),
+                write=lambda value: async_set_list_page(cache_key, stale_key, value),
+                stale=async_stale_list_page(stale_key),
+            )
+
+        result = json.loads(cached_result)
+        return [Author(**author_dict) for author_dict in result["authors"]], result["total"]
+
+    async def stream_authors(self, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[List[Mapping[str, Any]]]:
+        result = await self.db.stream(select(Author.__table__).order_by(Author.id).execution_options(yield_per=batch_size))
+        async for rows in result.mappings().partitions():
+            yield rows
+
+    async def count_authors(self) -> int:
+        return await async_get_count(AUTHORS_NAMESPACE, lambda: self.db.scalar(select(func.count()).select_from(Author)))
+
+    async def estimate_authors(self) -> Optional[int]:
+        return await self.db.run_sync(estimate_row_count, Author)
+
+    async def update_author(self, author_id: int, author_update: AuthorUpdate) -> Optional[Author]:
+        author = await self.db.get(Author, author_id)
+        if author:
+            for key, value in author_update.model_dump().items():
+                setattr(author, key, value)
+            await self.db.commit()
+
+            # Update the cache with the new data
+            await record_cache.async_set(author_cache_key(author.id), AUTHOR_RECORD_CODEC.pack(author.to_dict()))
+            await async_bump_generation(AUTHORS_NAMESPACE, records=[AUTHOR_RECORD.format(author_id=author.id)])
+
+        return author
+
+    async def delete_author(self, author_id: int) -> Optional[Author]:
+        # Load the books up front, the delete cascade cannot lazy-load them in async mode
+        author = await self.db.get(Author, author_id, options=[selectinload(Author.books)])
+        if author:
+            # Deleting the author clears author_id on its books, so their cached records go stale too
+            book_ids = [book.id for book in author.books]
+            await self.db.delete(author)
+            await self.db.commit()
+
+            # Remove the author (and its books) from the Redis cache
+            await record_cache.async_delete(author_cache_key(author_id), *[f"book:{book_id}" for book_id in book_ids])
+            await async_bump_generation(
+                AUTHORS_NAMESPACE,
+                BOOKS_NAMESPACE,
+                count_deltas={AUTHORS_NAMESPACE: -1},
+                records=[AUTHOR_RECORD.format(author_id=author_id)]
+                + [BOOK_RECORD.format(book_id=book_id) for book_id in book_ids],
+            )
+
+        return author
@@ -0,0 +1,236 @@
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.author_model import author_cache_key
+from app.models.book_model import BOOK_EXPORT_FIELDS, BOOK_LIST_FIELDS, BOOK_RECORD_CODEC, BOOK_SEARCH_FIELDS, Book
+from app.schemas.book_schema import BookCreate, BookUpdate
+from app.core.cache import (
+    AUTHOR_RECORD,
+    AUTHORS_NAMESPACE,
+    BOOK_RECORD,
+    BOOKS_NAMESPACE,
+    async_bump_generation,
+    async_get_count,
+    async_get_generation,
+    async_get_list_page,
+    async_set_list_page,
+    async_stale_list_page,
+    list_cache_keys,
+    record_cache,
+)
+from app.core.database import async_primary_session
+from app.core.config import EXPORT_BATCH_SIZE
+from app.core.redis import async_redis_client
+from app.core.singleflight import async_load_once
+from app.repositories.book_repository import BOOK_SORT_FIELDS, BookFilter, book_count_updates
+from app.utils.query_helper import columns_to_dict, estimate_row_count, load_columns
+from app.utils.search import normalize_query, search
+from app.utils.pagination import apply_keyset, apply_sort, decode_cursor, sort_columns
+import json
+from typing import Any, AsyncIterator, Mapping, Optional, List, Sequence, Tuple
+
+class AsyncBookRepository:
+    """Versi async dari BookRepository, memakai cache key yang sama."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_book(self, book: BookCreate) -> Book:
+        db_book = Book(**book.model_dump())
+        # book_count dinaikkan sebelum INSERT, seperti BookRepository.create_book
+        deltas = {db_book.author_id: 1}
+        await self._adjust_book_counts(deltas)
+        self.db.add(db_book)
+        await self.db.commit()
+        await self.db.refresh(db_book)
+
+        # Cache buku yang baru dibuat di Redis
+        await record_cache.async_set(f"book:{db_book.id}", BOOK_RECORD_CODEC.pack(db_book.to_dict()))
+        await self._invalidate_books_cache(count_delta=1, book_counts=deltas)
+
+        return db_book
+
+    async def get_book(self, book_id: int) -> Optional[Book]:
+        cache_key = f"book:{book_id}"
+
+        # Mencoba mendapatkan buku dari Redis cache
+        cached_book = await record_cache.async_get(cache_key)
+        if cached_book is None:
+            # Jika tidak ditemukan di cache, hanya satu request yang memuat dari database
+            cached_book = await async_load_once(
+                cache_key,
+                load=lambda: self._load_book(book_id),
+                read=lambda: record_cache.async_get(cache_key),
+                write=lambda value: record_cache.async_set(cache_key, value, publish=False),
+            )
+        if cached_book:
+            return Book(**BOOK_RECORD_CODEC.unpack(cached_book))
+        return None
+
+    async def _load_book(self, book_id: int) -> Optional[str]:
+        # Record cache tidak memiliki TTL, jadi selalu diisi dari primary
+        async with async_primary_session(self.db) as db:
+            book = await db.get(Book, book_id)
+        return BOOK_RECORD_CODEC.pack(book.to_dict()) if book else None
+
+    async def get_books_by_ids(self, book_ids: List[int]) -> List[Book]:
+        cache_keys = {book_id: f"book:{book_id}" for book_id in book_ids}
+
+        # Ambil semua yang ada di cache dengan satu MGET
+        cached = await record_cache.async_get_many(list(cache_keys.values()))
+        missing = [book_id for book_id, cache_key in cache_keys.items() if cached[cache_key] is None]
+        if missing:
+            async with async_primary_session(self.db) as db:
+                books = (await db.scalars(select(Book).where(Book.id.in_(missing)))).all()
+            loaded = {cache_keys[book.id]: BOOK_RECORD_CODEC.pack(book.to_dict()) for book in books}
+            if loaded:
+                await record_cache.async_set_many(loaded, publish=False)
+            cached.update(loaded)
+
+        return [Book(**BOOK_RECORD_CODEC.unpack(cached[cache_key])) for cache_key in cache_keys.values() if cached[cache_key]]
+
+    async def get_books(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        sort: str = "id",
+        cursor: Optional[str] = None,
+        fields: Sequence[str] = BOOK_LIST_FIELDS,
+        filters: BookFilter = BookFilter(),
+    ) -> List[Book]:
+        filters.validate(sort)
+        columns = sort_columns(fields, BOOK_SORT_FIELDS[sort])
+        suffix = f"cursor:{sort}:{cursor}:{limit}" if cursor else f"{sort}:{skip}:{limit}"
+        suffix += f":{','.join(columns)}"
+        if filters:
+            suffix = f"{filters.cache_key}:{suffix}"
+        cache_key, stale_key = list_cache_keys(BOOKS_NAMESPACE, await async_get_generation(BOOKS_NAMESPACE), suffix)
+
+        # Mencoba mendapatkan daftar buku dari Redis cache
+        cached_books = await async_get_list_page(cache_key)
+        if cached_books is None:
+            # Jika tidak ditemukan di cache, dapatkan dari database
+            query = select(Book).options(load_columns(Book, columns)).where(*filters.conditions())
+            query = apply_sort(query, sort, BOOK_SORT_FIELDS, Book.id)
+            if cursor:
+                after = decode_cursor(cursor, sort, BOOK_SORT_FIELDS, Book.id)
+                query = apply_keyset(query, sort, BOOK_SORT_FIELDS, Book.id, after)
+            else:
+                query = query.offset(skip)
+
+            async def load() -> str:
+                books = (await self.db.scalars(query.limit(limit))).all()
+                return json.dumps([columns_to_dict(book, columns) for book in books])
+
+            cached_books = await async_load_once(
+                cache_key,
+                load=load,
+                read=lambda: async_redis_client.get(cache_key),
+                write=lambda value: async_set_list_page(cache_key, stale_key, value),
+                stale=async_stale_list_page(stale_key),
+            )
+
+        return [Book(**book_dict) for book_dict in json.loads(cached_books)]
+
+    async def search_books(
+        self, q: str, skip: int = 0, limit: int = 10, fields: Sequence[str] = BOOK_EXPORT_FIELDS
+    ) -> Tuple[List[Book], int]:
+        q = normalize_query(q)
+        suffix = f"search:{q}:{skip}:{limit}:{','.join(fields)}"
+        cache_key, stale_key = list_cache_keys(BOOKS_NAMESPACE, await async_get_generation(BOOKS_NAMESPACE), suffix)
+
+        cached_result = await async_get_list_page(cache_key)
+        if cached_result is None:
+            def load_sync(session) -> str:
+                books, total = search(session, Book, BOOK_SEARCH_FIELDS, q, skip, limit, load=fields)
+                return json.dumps({"total": total, "books": [columns_to_dict(book, fields) for book in books]})
+
+            cached_result = await async_load_once(
+                cache_key,
+                load=lambda: self.db.run_sync(load_sync),
+                read=lambda: async_redis_client.get(cache_key),
+                write=lambda value: async_set_list_page(cache_key, stale_key, value),
+                stale=async_stale_list_page(stale_key),
+            )
+
+        result = json.loads(cached_result)
+        return [Book(**book_dict) for book_dict in result["books"]], result["total"]
+
+    async def stream_books(self, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[List[Mapping[str, Any]]]:
+        result = await self.db.stream(select(Book.__table__).order_by(Book.id).execution_options(yield_per=batch_size))
+        async for rows in result.mappings().partitions():
+            yield rows
+
+    async def count_books(self, filters: BookFilter = BookFilter()) -> int:
+        if not filters:
+            return await async_get_count(BOOKS_NAMESPACE, lambda: self.db.scalar(select(func.count()).select_from(Book)))
+
+        suffix = f"count:{filters.cache_key}"
+        cache_key, stale_key = list_cache_keys(BOOKS_NAMESPACE, await async_get_generation(BOOKS_NAMESPACE), suffix)
+        cached_total = await async_get_list_page(cache_key)
+        if cached_total is None:
+            async def load() -> str:
+                return str(await self.db.scalar(select(func.count(Book.id)).where(*filters.conditions())))
+
+            cached_total = await async_load_once(
+                cache_key,
+                load=load,
+                read=lambda: async_redis_client.get(cache_key),
+                write=lambda value: async_set_list_page(cache_key, stale_key, value),
+                stale=async_stale_list_page(stale_key),
+            )
+        return int(cached_total)
+
+    async def estimate_books(self) -> Optional[int]:
+        return await self.db.run_sync(estimate_row_count, Book)
+
+    async def update_book(self, book_id: int, book_update: BookUpdate) -> Optional[Book]:
+        book = await self.db.get(Book, book_id)
+        if book:
+            values = book_update.model_dump()
+            # Buku pindah author: satu buku berkurang dari author lama dan bertambah pada author baru
+            deltas = {}
+            if values["author_id"] != book.author_id:
+                deltas = {book.author_id: -1, values["author_id"]: 1}
+                await self._adjust_book_counts(deltas)
+            for key, value in values.items():
+                setattr(book, key, value)
+            await self.db.commit()
+
+            # Update cache dengan data baru
+            await record_cache.async_set(f"book:{book.id}", BOOK_RECORD_CODEC.pack(book.to_dict()))
+            await self._invalidate_books_cache(book_counts=deltas, books=[book.id])
+
+        return book
+
+    async def delete_book(self, book_id: int) -> Optional[Book]:
+        book = await self.db.get(Book, book_id)
+        if book:
+            deltas = {book.author_id: -1}
+            await self._adjust_book_counts(deltas)
+            await self.db.delete(book)
+            await self.db.commit()
+
+            # Hapus buku dari Redis cache
+            await record_cache.async_delete(f"book:{book_id}")
+            await self._invalidate_books_cache(count_delta=-1, book_counts=deltas, books=[book_id])
+
+        return book
+
+    async def _adjust_book_counts(self, deltas: Mapping[Optional[int], int]) -> None:
+        for statement in book_count_updates(deltas):
+            await self.db.execute(statement)
+
+    async def _invalidate_books_cache(
+        self, count_delta: int = 0, book_counts: Optional[Mapping[Optional[int], int]] = None, books: Sequence[int] = ()
+    ):
+        # Author yang book_count-nya berubah: record dan daftar author ikut kadaluwarsa
+        authors = [author_id for author_id, delta in (book_counts or {}).items() if author_id is not None and delta]
+        if authors:
+            await record_cache.async_delete(*[author_cache_key(author_id) for author_id in authors])
+        await async_bump_generation(
+            BOOKS_NAMESPACE,
+            *([AUTHORS_NAMESPACE] if authors else []),
+            count_deltas={BOOKS_NAMESPACE: count_delta} if count_delta else None,
+            records=[BOOK_RECORD.format(book_id=book_id) for book_id in books]
+            + [AUTHOR_RECORD.format(author_id=author_id) for author_id in authors],
+        )
@@ -1,10 +1,69 @@
-from typing import Optional, List
-from sqlalchemy.orm import Session
-from app.models.author_model import Author
+from typing import Any, Iterable, Iterator, Mapping, Optional, List, Sequence, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, selectinload
+from app.models.author_model import AUTHOR_EXPORT_FIELDS, AUTHOR_LIST_FIELDS, AUTHOR_RECORD_CODEC, AUTHOR_SEARCH_FIELDS, Author, author_cache_key
+from app.models.book_model import BOOK_LIST_FIELDS, Book
+from app.repositories.book_repository import BOOK_SORT_FIELDS
 from app.schemas.author_schema import AuthorCreate, AuthorUpdate
+from app.core.cache import (
+    AUTHOR_RECORD,
+    AUTHORS_NAMESPACE,
+    BOOK_RECORD,
+    BOOKS_NAMESPACE,
+    bump_generation,
+    get_count,
+    get_generation,
+    get_list_page,
+    list_cache_keys,
+    record_cache,
+    set_list_page,
+    stale_list_page,
+)
+from app.core.database import primary_session
+from app.core.config import BULK_CHUNK_SIZE, EXPORT_BATCH_SIZE, IMPORT_CHUNK_SIZE
 from app.core.redis import redis_client
+from app.core.singleflight import load_once
+from app.schemas.response_schema import ImportResult
+from app.utils.importer import ParsedRow, import_rows
+from app.utils.query_helper import bulk_insert, columns_to_dict, estimate_row_count, load_columns
+from app.utils.search import normalize_query, search
+from app.utils.pagination import apply_keyset, apply_sort, decode_cursor, sort_columns, validate_sort
 import json
 
+# Columns authors can be sorted by, all of them indexed
+AUTHOR_SORT_FIELDS = {
+    "id": Author.id,
+    "name": Author.name,
+    "book_count": Author.book_count,
+    "-book_count": Author.book_count,
+}
+
+# Order of GET /authors/{id}/books, the order ix_books_author_id_publish_date returns one author's books in
+AUTHOR_BOOKS_SORT = "publish_date"
+
+
+def author_to_dict(author: Author, fields: Sequence[str] = AUTHOR_EXPORT_FIELDS, include_books: bool = False) -> dict:
+    author_dict = columns_to_dict(author, fields)
+    if include_books:
+        # Embedded books carry the default book list columns
+        author_dict["books"] = [columns_to_dict(book, BOOK_LIST_FIELDS) for book in author.books]
+    return author_dict
+
+
+def books_option():
+    """Loader option for include=books: one SELECT ... WHERE author_id IN (...) per page, list columns only."""
+    return selectinload(Author.books).options(load_columns(Book, BOOK_LIST_FIELDS))
+
+
+def author_from_dict(author_dict: dict) -> Author:
+    """Rebuild a cached author, with its books when the page was loaded with include_books."""
+    book_dicts = author_dict.pop("books", None)
+    author = Author(**author_dict)
+    if book_dicts is not None:
+        author.books = [Book(**book_dict) for book_dict in book_dicts]
+    return author
+
+
 class AuthorRepository:
     def __init__(self, db: Session):
         self.db = db
@@ -16,43 +75,161 @@ class AuthorRepository:
         self.db.refresh(db_author)
         
         # Cache the newly created author in Redis
-        redis_client.set(f"author:{db_author.id}", json.dumps(db_author.to_dict()))
+        record_cache.set(author_cache_key(db_author.id), AUTHOR_RECORD_CODEC.pack(db_author.to_dict()))
+        self._invalidate_authors_cache(count_delta=1)
         return db_author
 
+    def create_authors(self, authors: List[AuthorCreate]) -> List[Author]:
+        created = []
+        # Insert chunk by chunk, one transaction each, with no per-row commit/refresh/SET
+        for start in range(0, len(authors), BULK_CHUNK_SIZE):
+            chunk = bulk_insert(self.db, Author, [author.model_dump() for author in authors[start:start + BULK_CHUNK_SIZE]])
+            author_dicts = [author.to_dict() for author in chunk]
+            self.db.commit()
+
+            # Cache the whole chunk in one Redis pipeline
+            record_cache.set_many({author_cache_key(author_dict["id"]): AUTHOR_RECORD_CODEC.pack(author_dict) for author_dict in author_dicts}, publish=False)
+            self._invalidate_authors_cache(count_delta=len(author_dicts))
+            created.extend(Author(**author_dict) for author_dict in author_dicts)
+
+        return created
+
+    def import_authors(self, rows: Iterable[ParsedRow], chunk_size: int = IMPORT_CHUNK_SIZE) -> ImportResult:
+        result = import_rows(self.db, Author, AuthorCreate, rows, chunk_size)
+        # One generation bump for the whole import; record caches fill on read
+        if result.imported:
+            self._invalidate_authors_cache(count_delta=result.imported)
+        return result
+
     def get_author(self, author_id: int) -> Optional[Author]:
-        cache_key = f"author:{author_id}"
+        cache_key = author_cache_key(author_id)
         
         # Try to get the author from Redis cache
-        cached_author = redis_client.get(cache_key)
+        cached_author = record_cache.get(cache_key)
+        if cached_author is None:
+            # If not found in cache, let a single request load it from the database
+            cached_author = load_once(
+                cache_key,
+                load=lambda: self._load_author(author_id),
+                read=lambda: record_cache.get(cache_key),
+                write=lambda value: record_cache.set(cache_key, value, publish=False),
+            )
         if cached_author:
-            return Author(**json.loads(cached_author))
-        
-        # If not found in cache, get it from the database
-        author = self.db.query(Author).filter(Author.id == author_id).first()
-        if author:
-            # Cache the author data in Redis
-            redis_client.set(cache_key, json.dumps(author.to_dict()))
-        return author
+            return Author(**AUTHOR_RECORD_CODEC.unpack(cached_author))
+        return None
+
+    def _load_author(self, author_id: int) -> Optional[str]:
+        # Record caches have no TTL, so they are filled from the primary rather than a possibly lagging replica
+        with primary_session(self.db) as db:
+            author = db.query(Author).filter(Author.id == author_id).first()
+            return AUTHOR_RECORD_CODEC.pack(author.to_dict()) if author else None
+
+    def get_authors_by_ids(self, author_ids: List[int]) -> List[Author]:
+        cache_keys = {author_id: author_cache_key(author_id) for author_id in author_ids}
+
+        # Serve whatever is cached with a single MGET
+        cached = record_cache.get_many(list(cache_keys.values()))
+        missing = [author_id for author_id, cache_key in cache_keys.items() if cached[cache_key] is None]
+        if missing:
+            # Fetch the rest from the primary with one IN (...) query and cache them in one pipeline
+            with primary_session(self.db) as db:
+                loaded = {
+                    cache_keys[author.id]: AUTHOR_RECORD_CODEC.pack(author.to_dict())
+                    for author in db.query(Author).filter(Author.id.in_(missing)).all()
+                }
+            if loaded:
+                record_cache.set_many(loaded, publish=False)
+            cached.update(loaded)
 
-    def get_authors(self, skip: int = 0, limit: int = 10) -> List[Author]:
-        cache_key = f"authors:{skip}:{limit}"
+        # Keep the requested order, skipping ids that do not exist
+        return [Author(**AUTHOR_RECORD_CODEC.unpack(cached[cache_key])) for cache_key in cache_keys.values() if cached[cache_key]]
+
+    def get_authors(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        sort: str = "id",
+        cursor: Optional[str] = None,
+        include_books: bool = False,
+        fields: Sequence[str] = AUTHOR_LIST_FIELDS,
+    ) -> List[Author]:
+        validate_sort(sort, AUTHOR_SORT_FIELDS)
+        # Only the requested columns (plus the sort column, for next_cursor) are loaded and cached
+        columns = sort_columns(fields, AUTHOR_SORT_FIELDS[sort])
+        if cursor:
+            # Cursor mode: the page is located by its keyset position instead of an offset
+            suffix = f"cursor:{sort}:{cursor}:{limit}:{','.join(columns)}"
+        else:
+            suffix = f"{sort}:{skip}:{limit}:{','.join(columns)}"
+        if include_books:
+            # Pages with embedded books also go stale when any book changes
+            suffix += f":books:{get_generation(BOOKS_NAMESPACE)}"
+        # The key embeds the current generation, so pages cached before a write are never read again
+        cache_key, stale_key = list_cache_keys(AUTHORS_NAMESPACE, get_generation(AUTHORS_NAMESPACE), suffix)
         
         # Try to get the list of authors from Redis cache
-        cached_authors = redis_client.get(cache_key)
-        if cached_authors:
-            author_dicts = json.loads(cached_authors)
-            return [Author(**author_dict) for author_dict in author_dicts]
-        
-        # If not found in cache, get the data from the database
-        authors = self.db.query(Author).offset(skip).limit(limit).all()
-        
-        # Cache the list of authors in Redis
-        redis_client.set(cache_key, json.dumps([author.to_dict() for author in authors]))
+        cached_authors = get_list_page(cache_key)
+        if cached_authors is None:
+            # If not found in cache, get the data from the database
+            query = apply_sort(self.db.query(Author).options(load_columns(Author, columns)), sort, AUTHOR_SORT_FIELDS, Author.id)
+            if cursor:
+                after = decode_cursor(cursor, sort, AUTHOR_SORT_FIELDS, Author.id)
+                query = apply_keyset(query, sort, AUTHOR_SORT_FIELDS, Author.id, after)
+            else:
+                query = query.offset(skip)
+            if include_books:
+                # One extra SELECT ... WHERE author_id IN (...) for the whole page instead of one per author
+                query = query.options(books_option())
+
+            # Cache the list of authors in Redis, older generations age out by TTL
+            cached_authors = load_once(
+                cache_key,
+                load=lambda: json.dumps([author_to_dict(author, columns, include_books) for author in query.limit(limit).all()]),
+                read=lambda: redis_client.get(cache_key),
+                write=lambda value: set_list_page(cache_key, stale_key, value),
+                stale=stale_list_page(stale_key),
+            )
         
-        return authors
+        author_dicts = json.loads(cached_authors)
+        return [author_from_dict(author_dict) for author_dict in author_dicts]
+
+    def search_authors(
+        self, q: str, skip: int = 0, limit: int = 10, fields: Sequence[str] = AUTHOR_EXPORT_FIELDS
+    ) -> Tuple[List[Author], int]:
+        q = normalize_query(q)
+        suffix = f"search:{q}:{skip}:{limit}:{','.join(fields)}"
+        cache_key, stale_key = list_cache_keys(AUTHORS_NAMESPACE, get_generation(AUTHORS_NAMESPACE), suffix)
+
+        # Search results are cached with their total, under the authors list generation
+        cached_result = get_list_page(cache_key)
+        if cached_result is None:
+            def load() -> str:
+                authors, total = search(self.db, Author, AUTHOR_SEARCH_FIELDS, q, skip, limit, load=fields)
+                return json.dumps({"total": total, "authors": [columns_to_dict(author, fields) for author in authors]})
+
+            cached_result = load_once(
+                cache_key,
+                load=load,
+                read=lambda: redis_client.get(cache_key),
+                write=lambda value: set_list_page(cache_key, stale_key, value),
+                stale=stale_list_page(stale_key),
+            )
+
+        result = json.loads(cached_result)
+        return [Author(**author_dict) for author_dict in result["authors"]], result["total"]
+
+    def iter_authors(self, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[Mapping[str, Any]]]:
+        # yield_per streams from a server-side cursor, so only one batch is held in memory
+        result = self.db.execute(select(Author.__table__).order_by(Author.id).execution_options(yield_per=batch_size))
+        yield from result.mappings().partitions()
 
     def count_authors(self) -> int:
-        return self.db.query(Author).count()
+        # The Redis counter is adjusted on every write, COUNT(*) only runs to reconcile it
+        return get_count(AUTHORS_NAMESPACE, lambda: self.db.query(Author).count())
+
+    def estimate_authors(self) -> Optional[int]:
+        # Estimate from the table statistics, None if the database has none
+        return estimate_row_count(self.db, Author)
 
     def update_author(self, author_id: int, author_update: AuthorUpdate) -> Optional[Author]:
         author = self.db.query(Author).filter(Author.id == author_id).first()
@@ -62,29 +239,79 @@ class AuthorRepository:
             self.db.commit()
             
             # Update the cache with the new data
-            redis_client.set(f"author:{author.id}", json.dumps(author.to_dict()))
-            
+            record_cache.set(author_cache_key(author.id), AUTHOR_RECORD_CODEC.pack(author.to_dict()))
+            self._invalidate_authors_cache(authors=[author.id])
+
         return author
 
     def delete_author(self, author_id: int) -> Optional[Author]:
         author = self.db.query(Author).filter(Author.id == author_id).first()
         if author:
+            # Deleting the author clears author_id on its books, so their cached records go stale too
+            book_ids = [book.id for book in author.books]
             self.db.delete(author)
             self.db.commit()
             
-            # Remove the author from the Redis cache
-            redis_client.delete(f"author:{author_id}")
-            
+            # Remove the author (and its books) from the Redis cache
+            record_cache.delete(author_cache_key(author_id), *[f"book:{book_id}" for book_id in book_ids])
+            self._invalidate_authors_cache(BOOKS_NAMESPACE, count_delta=-1, authors=[author_id], books=book_ids)
+
         return author
     
-    def get_books_by_author(self, author_id: int) -> List[dict]:
-        author = self.db.query(Author).filter(Author.id == author_id).first()
-        if author:
-            # Convert the books to a list of dictionaries
-            return [book.to_dict() for book in author.books]
-        return []
-
-    def _invalidate_authors_cache(self):
-        # Invalidate cache by deleting all keys that match the authors pattern
-        for key in redis_client.scan_iter("authors:*"):
-            redis_client.delete(key)
+    def get_books_by_author(
+        self, author_id: int, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, fields: Sequence[str] = BOOK_LIST_FIELDS
+    ) -> Optional[Tuple[List[Book], int]]:
+        """
+        Return one page of an author's books (by ``AUTHOR_BOOKS_SORT``, with the
+        ``fields`` columns plus the sort column) and their total, or None if the
+        author does not exist. Both queries read the
+        ``ix_books_author_id_publish_date`` index, which returns the page in order.
+        """
+        columns = sort_columns(fields, BOOK_SORT_FIELDS[AUTHOR_BOOKS_SORT])
+        suffix = f"author:{author_id}:cursor:{cursor}:{limit}" if cursor else f"author:{author_id}:{skip}:{limit}"
+        suffix += f":{','.join(columns)}"
+        # Cached under the books generation: every book write and author delete bumps it
+        cache_key, stale_key = list_cache_keys(BOOKS_NAMESPACE, get_generation(BOOKS_NAMESPACE), suffix)
+
+        cached_result = get_list_page(cache_key)
+        if cached_result is None:
+            query = self.db.query(Book).options(load_columns(Book, columns)).filter(Book.author_id == author_id)
+            query = apply_sort(query, AUTHOR_BOOKS_SORT, BOOK_SORT_FIELDS, Book.id)
+            if cursor:
+                after = decode_cursor(cursor, AUTHOR_BOOKS_SORT, BOOK_SORT_FIELDS, Book.id)
+                query = apply_keyset(query, AUTHOR_BOOKS_SORT, BOOK_SORT_FIELDS, Book.id, after)
+            else:
+                query = query.offset(skip)
+
+            def load() -> Optional[str]:
+                total = self.db.query(func.count(Book.id)).filter(Book.author_id == author_id).scalar()
+                if not total and self.db.get(Author, author_id) is None:
+                    return None
+                books = query.limit(limit).all() if total else []
+                return json.dumps({"total": total, "books": [columns_to_dict(book, columns) for book in books]})
+
+            cached_result = load_once(
+                cache_key,
+                load=load,
+                read=lambda: redis_client.get(cache_key),
+                write=lambda value: set_list_page(cache_key, stale_key, value),
+                stale=stale_list_page(stale_key),
+            )
+            if cached_result is None:
+                return None
+
+        result = json.loads(cached_result)
+        return [Book(**book_dict) for book_dict in result["books"]], result["total"]
+
+    def _invalidate_authors_cache(
+        self, *namespaces: str, count_delta: int = 0, authors: Sequence[int] = (), books: Sequence[int] = ()
+    ):
+        # Bump the list generation: a single INCR instead of scanning the whole keyspace.
+        # Cached single-record responses only go stale for the records written
+        bump_generation(
+            AUTHORS_NAMESPACE,
+            *namespaces,
+            count_deltas={AUTHORS_NAMESPACE: count_delta} if count_delta else None,
+            records=[AUTHOR_RECORD.format(author_id=author_id) for author_id in authors]
+            + [BOOK_RECORD.format(book_id=book_id) for book_id in books],
+        )
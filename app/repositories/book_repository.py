@@ -1,9 +1,106 @@
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
-from app.models.book_model import Book
+from app.models.author_model import Author, author_cache_key
+from app.models.book_model import BOOK_EXPORT_FIELDS, BOOK_LIST_FIELDS, BOOK_RECORD_CODEC, BOOK_SEARCH_FIELDS, Book
 from app.schemas.book_schema import BookCreate, BookUpdate
+from app.core.cache import (
+    AUTHOR_RECORD,
+    AUTHORS_NAMESPACE,
+    BOOK_RECORD,
+    BOOKS_NAMESPACE,
+    bump_generation,
+    get_count,
+    get_generation,
+    get_list_page,
+    list_cache_keys,
+    record_cache,
+    set_list_page,
+    stale_list_page,
+)
+from app.core.database import primary_session
+from app.core.config import BULK_CHUNK_SIZE, EXPORT_BATCH_SIZE, IMPORT_CHUNK_SIZE
 from app.core.redis import redis_client
+from app.core.singleflight import load_once
+from app.schemas.response_schema import ImportResult
+from app.utils.importer import ParsedRow, import_rows
+from app.utils.query_helper import bulk_insert, columns_to_dict, estimate_row_count, load_columns
+from app.utils.search import normalize_query, search
+from app.utils.pagination import apply_keyset, apply_sort, decode_cursor, sort_columns, validate_indexed_sort
 import json
-from typing import Optional, List
+from collections import Counter
+from datetime import date
+from typing import Any, Iterable, Iterator, Mapping, NamedTuple, Optional, List, Sequence, Tuple
+
+# Kolom yang boleh dipakai untuk sort, semuanya memiliki index
+BOOK_SORT_FIELDS = {
+    "id": Book.id,
+    "-id": Book.id,
+    "title": Book.title,
+    "publish_date": Book.publish_date,
+    "-publish_date": Book.publish_date,
+}
+
+# Jumlah buku sebenarnya dari author pada baris luar, untuk rekonsiliasi authors.book_count
+ACTUAL_BOOK_COUNT = (
+    select(func.count(Book.id)).where(Book.author_id == Author.id).correlate(Author).scalar_subquery()
+)
+
+
+def book_count_updates(deltas: Mapping[Optional[int], int]) -> list:
+    """
+    UPDATE atomik ``book_count = book_count + delta`` per author, dijalankan dalam
+    transaksi yang sama dengan penulisan bukunya.
+
+    Diurutkan menurut id supaya transaksi yang bersamaan mengunci baris author
+    dengan urutan yang sama (tanpa deadlock). Buku tanpa author dan delta 0 dilewati.
+    """
+    return [
+        update(Author)
+        .where(Author.id == author_id)
+        .values(book_count=Author.book_count + delta)
+        .execution_options(synchronize_session=False)
+        for author_id, delta in sorted((key, value) for key, value in deltas.items() if key is not None and value)
+    ]
+
+
+class BookFilter(NamedTuple):
+    """Filter GET /books/: ?author_id= dan rentang ?published_from=/?published_to= (inklusif)."""
+
+    author_id: Optional[int] = None
+    published_from: Optional[date] = None
+    published_to: Optional[date] = None
+
+    def __bool__(self) -> bool:
+        return any(value is not None for value in self)
+
+    @property
+    def cache_key(self) -> str:
+        # Bentuk kanonis untuk cache key, sehingga filter yang sama selalu memakai entry yang sama
+        parts = [("author", self.author_id), ("from", self.published_from), ("to", self.published_to)]
+        return ":".join(f"{name}={value}" for name, value in parts if value is not None)
+
+    def conditions(self) -> list:
+        conditions = []
+        if self.author_id is not None:
+            conditions.append(Book.author_id == self.author_id)
+        if self.published_from is not None:
+            conditions.append(Book.publish_date >= self.published_from)
+        if self.published_to is not None:
+            conditions.append(Book.publish_date <= self.published_to)
+        return conditions
+
+    def default_sort(self) -> str:
+        # Buku yang difilter (author_id atau rentang tanggal) dibaca berurutan dari index hanya menurut publish_date
+        return "publish_date" if self else "id"
+
+    def validate(self, sort: str) -> None:
+        if self.published_from and self.published_to and self.published_from > self.published_to:
+            raise ValueError("published_from must not be after published_to")
+        # Hanya sort yang dilayani oleh index untuk kombinasi filter ini, lihat index pada app/models/book_model.py
+        equal = ["author_id"] if self.author_id is not None else []
+        ranged = ["publish_date"] if self.published_from is not None or self.published_to is not None else []
+        validate_indexed_sort(sort, BOOK_SORT_FIELDS, equal, ranged)
+
 
 class BookRepository:
     def __init__(self, db: Session):
@@ -11,74 +108,277 @@ class BookRepository:
 
     def create_book(self, book: BookCreate) -> Book:
         db_book = Book(**book.model_dump())  # Menggunakan model_dump() untuk mengkonversi Pydantic model ke dictionary
+        # book_count dinaikkan sebelum INSERT, sehingga baris author dikunci lebih dulu daripada pemeriksaan foreign key
+        deltas = {db_book.author_id: 1}
+        self._adjust_book_counts(deltas)
         self.db.add(db_book)
         self.db.commit()
         self.db.refresh(db_book)
         
         # Cache buku yang baru dibuat di Redis
-        redis_client.set(f"book:{db_book.id}", json.dumps(db_book.to_dict()))  # Menggunakan to_dict() untuk serialisasi model SQLAlchemy
+        record_cache.set(f"book:{db_book.id}", BOOK_RECORD_CODEC.pack(db_book.to_dict()))  # Menggunakan to_dict() lalu format biner ringkas
+        self._invalidate_books_cache(count_delta=1, book_counts=deltas)
         
         return db_book
 
+    def create_books(self, books: List[BookCreate]) -> List[Book]:
+        created = []
+        # Insert per chunk dalam satu transaksi, tanpa commit/refresh/SET per baris
+        for start in range(0, len(books), BULK_CHUNK_SIZE):
+            rows = [book.model_dump() for book in books[start:start + BULK_CHUNK_SIZE]]
+            # Satu UPDATE per author pada chunk ini, bukan satu per buku
+            deltas = Counter(row["author_id"] for row in rows)
+            self._adjust_book_counts(deltas)
+            chunk = bulk_insert(self.db, Book, rows)
+            book_dicts = [book.to_dict() for book in chunk]
+            self.db.commit()
+
+            # Cache seluruh chunk dalam satu pipeline Redis
+            record_cache.set_many({f"book:{book_dict['id']}": BOOK_RECORD_CODEC.pack(book_dict) for book_dict in book_dicts}, publish=False)
+            self._invalidate_books_cache(count_delta=len(book_dicts), book_counts=deltas)
+            created.extend(Book(**book_dict) for book_dict in book_dicts)
+
+        return created
+
+    def import_books(self, rows: Iterable[ParsedRow], chunk_size: int = IMPORT_CHUNK_SIZE) -> ImportResult:
+        last_id = self.db.scalar(select(func.max(Book.id))) or 0
+        result = import_rows(self.db, Book, BookCreate, rows, chunk_size)
+        # Satu kali bump generation untuk seluruh import; record cache diisi saat dibaca
+        if result.imported:
+            self._invalidate_books_cache(count_delta=result.imported)
+            # Baris import di-insert per chunk tanpa melewati repository: book_count dihitung ulang
+            # hanya untuk author dari buku yang baru (id di atas id terbesar sebelum import)
+            self.reconcile_book_counts(Author.id.in_(select(Book.author_id).where(Book.id > last_id)))
+        return result
+
     def get_book(self, book_id: int) -> Optional[Book]:
         cache_key = f"book:{book_id}"
         
         # Mencoba mendapatkan buku dari Redis cache
-        cached_book = redis_client.get(cache_key)
+        cached_book = record_cache.get(cache_key)
+        if cached_book is None:
+            # Jika tidak ditemukan di cache, hanya satu request yang memuat dari database
+            cached_book = load_once(
+                cache_key,
+                load=lambda: self._load_book(book_id),
+                read=lambda: record_cache.get(cache_key),
+                write=lambda value: record_cache.set(cache_key, value, publish=False),
+            )
         if cached_book:
-            return Book(**json.loads(cached_book))  # Deserialize kembali menjadi object Book
+            return Book(**BOOK_RECORD_CODEC.unpack(cached_book))  # Decode kembali menjadi object Book
+        return None
 
-        # Jika tidak ditemukan di cache, dapatkan dari database
-        book = self.db.query(Book).filter(Book.id == book_id).first()
-        if book:
-            # Cache buku di Redis
-            redis_client.set(cache_key, json.dumps(book.to_dict()))  # Menggunakan to_dict() untuk serialisasi model SQLAlchemy
-        return book
+    def _load_book(self, book_id: int) -> Optional[str]:
+        # Record cache tidak memiliki TTL, jadi selalu diisi dari primary, bukan dari replica yang mungkin tertinggal
+        with primary_session(self.db) as db:
+            book = db.query(Book).filter(Book.id == book_id).first()
+            return BOOK_RECORD_CODEC.pack(book.to_dict()) if book else None  # Menggunakan to_dict() untuk serialisasi model SQLAlchemy
+
+    def get_books_by_ids(self, book_ids: List[int]) -> List[Book]:
+        cache_keys = {book_id: f"book:{book_id}" for book_id in book_ids}
+
+        # Ambil semua yang ada di cache dengan satu MGET
+        cached = record_cache.get_many(list(cache_keys.values()))
+        missing = [book_id for book_id, cache_key in cache_keys.items() if cached[cache_key] is None]
+        if missing:
+            # Sisanya diambil dari primary dengan satu query IN (...) lalu disimpan ke cache dalam satu pipeline
+            with primary_session(self.db) as db:
+                loaded = {
+                    cache_keys[book.id]: BOOK_RECORD_CODEC.pack(book.to_dict())
+                    for book in db.query(Book).filter(Book.id.in_(missing)).all()
+                }
+            if loaded:
+                record_cache.set_many(loaded, publish=False)
+            cached.update(loaded)
 
-    def get_books(self, skip: int = 0, limit: int = 10) -> List[Book]:
-        cache_key = f"books:{skip}:{limit}"
+        # Urutan mengikuti permintaan, id yang tidak ada dilewati
+        return [Book(**BOOK_RECORD_CODEC.unpack(cached[cache_key])) for cache_key in cache_keys.values() if cached[cache_key]]
+
+    def get_books(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        sort: str = "id",
+        cursor: Optional[str] = None,
+        fields: Sequence[str] = BOOK_LIST_FIELDS,
+        filters: BookFilter = BookFilter(),
+    ) -> List[Book]:
+        filters.validate(sort)
+        # Hanya kolom yang diminta (ditambah kolom sort untuk next_cursor) yang dimuat dan di-cache
+        columns = sort_columns(fields, BOOK_SORT_FIELDS[sort])
+        if cursor:
+            # Mode cursor: halaman ditentukan oleh posisi keyset, bukan offset
+            suffix = f"cursor:{sort}:{cursor}:{limit}:{','.join(columns)}"
+        else:
+            suffix = f"{sort}:{skip}:{limit}:{','.join(columns)}"
+        if filters:
+            suffix = f"{filters.cache_key}:{suffix}"
+        # Key memuat generation saat ini sehingga halaman lama tidak terbaca lagi setelah ada perubahan
+        cache_key, stale_key = list_cache_keys(BOOKS_NAMESPACE, get_generation(BOOKS_NAMESPACE), suffix)
         
         # Mencoba mendapatkan daftar buku dari Redis cache
-        cached_books = redis_client.get(cache_key)
-        if cached_books:
-            book_dicts = json.loads(cached_books)
-            return [Book(**book_dict) for book_dict in book_dicts]
-        
-        # Jika tidak ditemukan di cache, dapatkan dari database
-        books = self.db.query(Book).offset(skip).limit(limit).all()
-        
-        # Cache daftar buku di Redis
-        redis_client.set(cache_key, json.dumps([book.to_dict() for book in books]))
+        cached_books = get_list_page(cache_key)
+        if cached_books is None:
+            # Jika tidak ditemukan di cache, dapatkan dari database
+            query = self.db.query(Book).options(load_columns(Book, columns)).filter(*filters.conditions())
+            query = apply_sort(query, sort, BOOK_SORT_FIELDS, Book.id)
+            if cursor:
+                after = decode_cursor(cursor, sort, BOOK_SORT_FIELDS, Book.id)
+                query = apply_keyset(query, sort, BOOK_SORT_FIELDS, Book.id, after)
+            else:
+                query = query.offset(skip)
+
+            # Cache daftar buku di Redis, generation lama akan kadaluwarsa sendiri
+            cached_books = load_once(
+                cache_key,
+                load=lambda: json.dumps([columns_to_dict(book, columns) for book in query.limit(limit).all()]),
+                read=lambda: redis_client.get(cache_key),
+                write=lambda value: set_list_page(cache_key, stale_key, value),
+                stale=stale_list_page(stale_key),
+            )
         
-        return books
+        book_dicts = json.loads(cached_books)
+        return [Book(**book_dict) for book_dict in book_dicts]
+
+    def search_books(self, q: str, skip: int = 0, limit: int = 10, fields: Sequence[str] = BOOK_EXPORT_FIELDS) -> Tuple[List[Book], int]:
+        q = normalize_query(q)
+        suffix = f"search:{q}:{skip}:{limit}:{','.join(fields)}"
+        cache_key, stale_key = list_cache_keys(BOOKS_NAMESPACE, get_generation(BOOKS_NAMESPACE), suffix)
+
+        # Hasil pencarian di-cache bersama total-nya, mengikuti generation daftar buku
+        cached_result = get_list_page(cache_key)
+        if cached_result is None:
+            def load() -> str:
+                books, total = search(self.db, Book, BOOK_SEARCH_FIELDS, q, skip, limit, load=fields)
+                return json.dumps({"total": total, "books": [columns_to_dict(book, fields) for book in books]})
+
+            cached_result = load_once(
+                cache_key,
+                load=load,
+                read=lambda: redis_client.get(cache_key),
+                write=lambda value: set_list_page(cache_key, stale_key, value),
+                stale=stale_list_page(stale_key),
+            )
 
-    def count_books(self) -> int:
-        return self.db.query(Book).count()
+        result = json.loads(cached_result)
+        return [Book(**book_dict) for book_dict in result["books"]], result["total"]
+
+    def iter_books(self, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[Mapping[str, Any]]]:
+        # yield_per memakai server-side cursor, sehingga hanya satu batch yang ada di memori
+        result = self.db.execute(select(Book.__table__).order_by(Book.id).execution_options(yield_per=batch_size))
+        yield from result.mappings().partitions()
+
+    def count_books(self, filters: BookFilter = BookFilter()) -> int:
+        if not filters:
+            # Counter di Redis diperbarui setiap penulisan, COUNT(*) hanya untuk rekonsiliasi berkala
+            return get_count(BOOKS_NAMESPACE, lambda: self.db.query(Book).count())
+
+        # Total per filter di-cache seperti halaman daftar, mengikuti generation daftar buku
+        cache_key, stale_key = list_cache_keys(BOOKS_NAMESPACE, get_generation(BOOKS_NAMESPACE), f"count:{filters.cache_key}")
+        cached_total = get_list_page(cache_key)
+        if cached_total is None:
+            cached_total = load_once(
+                cache_key,
+                load=lambda: str(self.db.query(func.count(Book.id)).filter(*filters.conditions()).scalar()),
+                read=lambda: redis_client.get(cache_key),
+                write=lambda value: set_list_page(cache_key, stale_key, value),
+                stale=stale_list_page(stale_key),
+            )
+        return int(cached_total)
+
+    def estimate_books(self) -> Optional[int]:
+        # Perkiraan dari statistik tabel, None jika database tidak menyediakannya
+        return estimate_row_count(self.db, Book)
 
     def update_book(self, book_id: int, book_update: BookUpdate) -> Optional[Book]:
         book = self.db.query(Book).filter(Book.id == book_id).first()
         if book:
-            for key, value in book_update.model_dump().items():  # Menggunakan model_dump() untuk mengkonversi Pydantic model ke dictionary
+            values = book_update.model_dump()  # Menggunakan model_dump() untuk mengkonversi Pydantic model ke dictionary
+            # Buku pindah author: satu buku berkurang dari author lama dan bertambah pada author baru
+            deltas = {}
+            if values["author_id"] != book.author_id:
+                deltas = {book.author_id: -1, values["author_id"]: 1}
+                self._adjust_book_counts(deltas)
+            for key, value in values.items():
                 setattr(book, key, value)
             self.db.commit()
             
             # Update cache dengan data baru
-            redis_client.set(f"book:{book.id}", json.dumps(book.to_dict()))  # Menggunakan to_dict() untuk serialisasi model SQLAlchemy
+            record_cache.set(f"book:{book.id}", BOOK_RECORD_CODEC.pack(book.to_dict()))  # Menggunakan to_dict() untuk serialisasi model SQLAlchemy
+            self._invalidate_books_cache(book_counts=deltas, books=[book.id])
 
         return book
 
     def delete_book(self, book_id: int) -> Optional[Book]:
         book = self.db.query(Book).filter(Book.id == book_id).first()
         if book:
+            deltas = {book.author_id: -1}
+            self._adjust_book_counts(deltas)
             self.db.delete(book)
             self.db.commit()
             
             # Hapus buku dari Redis cache
-            redis_client.delete(f"book:{book_id}")
+            record_cache.delete(f"book:{book_id}")
+            self._invalidate_books_cache(count_delta=-1, book_counts=deltas, books=[book_id])
           
         return book
 
-    def _invalidate_books_cache(self):
-        # Invalidate cache dengan menghapus semua kunci yang berkaitan dengan daftar buku
-        for key in redis_client.scan_iter("books:*"):
-            redis_client.delete(key)
+    def reconcile_book_counts(self, condition=None, batch_size: int = EXPORT_BATCH_SIZE) -> int:
+        """
+        Hitung ulang authors.book_count dari tabel books dan perbaiki yang menyimpang,
+        misalnya setelah import atau penulisan langsung ke database.
+
+        Author diproses per batch menurut id, masing-masing dalam transaksi sendiri,
+        sehingga tabel authors tidak terkunci selama rekonsiliasi berjalan.
+
+        :param condition: Batasi ke author yang memenuhi kondisi ini, default semua author
+        :param batch_size: Jumlah author yang diperiksa per transaksi
+        :return: Jumlah author yang book_count-nya diperbaiki
+        """
+        corrected, last_id = 0, 0
+        while True:
+            query = select(Author.id).where(Author.id > last_id).order_by(Author.id).limit(batch_size)
+            if condition is not None:
+                query = query.where(condition)
+            author_ids = self.db.scalars(query).all()
+            if not author_ids:
+                return corrected
+            last_id = author_ids[-1]
+
+            # Jumlahnya dihitung di dalam UPDATE, sehingga penulisan buku yang bersamaan tidak tertimpa
+            drifted = self.db.scalars(
+                select(Author.id).where(Author.id.in_(author_ids), Author.book_count != ACTUAL_BOOK_COUNT)
+            ).all()
+            if drifted:
+                self.db.execute(
+                    update(Author)
+                    .where(Author.id.in_(drifted))
+                    .values(book_count=ACTUAL_BOOK_COUNT)
+                    .execution_options(synchronize_session=False)
+                )
+            self.db.commit()
+            if drifted:
+                record_cache.delete(*[author_cache_key(author_id) for author_id in drifted])
+                bump_generation(AUTHORS_NAMESPACE, records=[AUTHOR_RECORD.format(author_id=author_id) for author_id in drifted])
+                corrected += len(drifted)
+
+    def _adjust_book_counts(self, deltas: Mapping[Optional[int], int]) -> None:
+        for statement in book_count_updates(deltas):
+            self.db.execute(statement)
+
+    def _invalidate_books_cache(
+        self, count_delta: int = 0, book_counts: Optional[Mapping[Optional[int], int]] = None, books: Sequence[int] = ()
+    ):
+        # Author yang book_count-nya berubah: record dan daftar author ikut kadaluwarsa
+        authors = [author_id for author_id, delta in (book_counts or {}).items() if author_id is not None and delta]
+        if authors:
+            record_cache.delete(*[author_cache_key(author_id) for author_id in authors])
+        # Naikkan generation daftar buku: satu INCR, tanpa memindai seluruh keyspace.
+        # Response GET /books/{id} dan /authors/{id} hanya kadaluwarsa untuk record yang ditulis
+        bump_generation(
+            BOOKS_NAMESPACE,
+            *([AUTHORS_NAMESPACE] if authors else []),
+            count_deltas={BOOKS_NAMESPACE: count_delta} if count_delta else None,
+            records=[BOOK_RECORD.format(book_id=book_id) for book_id in books]
+            + [AUTHOR_RECORD.format(author_id=author_id) for author_id in authors],
+        )
@@ -0,0 +1,140 @@
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.repositories.async_author_repository import AsyncAuthorRepository
+from app.models.author_model import AUTHOR_EXPORT_FIELDS, AUTHOR_LIST_FIELDS, Author
+from app.models.book_model import BOOK_LIST_FIELDS
+from app.schemas.author_schema import AuthorCreate, AuthorResponse, AuthorListResponse, AuthorUpdate, author_list
+from app.core.database import get_async_db
+from app.schemas.response_schema import APIResponse
+from app.core.config import MAX_BATCH_IDS
+from app.core.cache import AUTHOR_RECORD, AUTHORS_NAMESPACE, BOOKS_NAMESPACE
+from app.core.response_cache import cache_response
+from app.utils.export import EXPORT_FORMATS, async_iter_export, export_headers
+from app.utils.pagination import encode_cursor
+from app.utils.query_helper import parse_fields, parse_ids
+
+# Mounted ahead of author_route when ASYNC_MODE is on; other routes are still served by author_route
+router = APIRouter(
+    prefix="/authors",
+    tags=["Authors"],
+    responses={404: {"description": "Not Found"}},
+)
+
+
+@router.get("/", response_model=APIResponse[AuthorListResponse])
+# Depends on the books generation too, for include=books
+@cache_response((AUTHORS_NAMESPACE, BOOKS_NAMESPACE), APIResponse[AuthorListResponse])
+async def list_authors(
+    request: Request,
+    page: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous next_cursor; overrides page"),
+    sort: str = Query("id", description="Sort column: id, name, book_count or -book_count (most books first)"),
+    q: Optional[str] = Query(None, max_length=200, description="Full-text search on name and bio, most relevant first"),
+    include: Optional[Literal["books"]] = Query(None, description="Embed each author's books, loaded with one extra query per page"),
+    estimate: bool = Query(False, description="Return an approximate total from table statistics"),
+    ids: Optional[str] = Query(None, description="Comma-separated author ids to fetch in one call; other parameters but fields are ignored"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, id is always included. Defaults to all but bio, or all columns with q and ids"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    include_books = include == "books"
+    if include_books and (ids is not None or (q and q.strip())):
+        raise HTTPException(status_code=400, detail="include=books is only supported when paging through authors")
+
+    # Plain pages leave the heavy columns out by default; q and ids return whole records unless fields is given
+    paging = ids is None and not (q and q.strip())
+    try:
+        projection = parse_fields(fields, Author, AUTHOR_LIST_FIELDS if paging else AUTHOR_EXPORT_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    repo = AsyncAuthorRepository(db)
+    if ids is not None:
+        try:
+            author_ids = parse_ids(ids, MAX_BATCH_IDS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        authors = await repo.get_authors_by_ids(author_ids)
+        return APIResponse(success=True, data=author_list(projection, total=len(authors), authors=authors))
+
+    skip = page * limit
+    if q and q.strip():
+        if cursor:
+            raise HTTPException(status_code=400, detail="cursor cannot be combined with q, use page")
+        authors, total = await repo.search_authors(q, skip=skip, limit=limit, fields=projection)
+        return APIResponse(success=True, data=author_list(projection, total=total, authors=authors))
+
+    total = await repo.estimate_authors() if estimate else None
+    total_exact = total is None
+    if total_exact:
+        total = await repo.count_authors()
+    try:
+        authors = await repo.get_authors(
+            skip=skip, limit=limit, sort=sort, cursor=cursor, include_books=include_books, fields=projection
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    next_cursor = encode_cursor(sort, authors[-1]) if len(authors) == limit else None
+    response = author_list(
+        projection,
+        BOOK_LIST_FIELDS if include_books else None,
+        total=total,
+        total_exact=total_exact,
+        authors=authors,
+        next_cursor=next_cursor,
+    )
+    return APIResponse(success=True, data=response)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_authors(export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"), db: AsyncSession = Depends(get_async_db)):
+    # The stream opens its own session on the same engine: the get_async_db one is closed before the body is sent
+    bind = db.bind
+
+    async def batches():
+        async with AsyncSession(bind=bind) as stream_db:
+            async for rows in AsyncAuthorRepository(stream_db).stream_authors():
+                yield rows
+
+    return StreamingResponse(
+        async_iter_export(batches(), AUTHOR_EXPORT_FIELDS, export_format),
+        media_type=EXPORT_FORMATS[export_format],
+        headers=export_headers("authors", export_format),
+    )
+
+
+@router.get("/{author_id}", response_model=APIResponse[AuthorResponse])
+@cache_response(AUTHORS_NAMESPACE, APIResponse[AuthorResponse], record=AUTHOR_RECORD)
+async def get_author(author_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    repo = AsyncAuthorRepository(db)
+    author = await repo.get_author(author_id)
+    if author is None:
+        raise HTTPException(status_code=404, detail="Author not found")
+    return APIResponse(success=True, data=author)
+
+
+@router.post("/", response_model=APIResponse[AuthorResponse])
+async def create_author(author: AuthorCreate, db: AsyncSession = Depends(get_async_db)):
+    repo = AsyncAuthorRepository(db)
+    db_author = await repo.create_author(author)
+    return APIResponse(success=True, data=db_author)
+
+
+@router.put("/{author_id}", response_model=APIResponse[AuthorResponse])
+async def update_author(author_id: int, author_update: AuthorUpdate, db: AsyncSession = Depends(get_async_db)):
+    repo = AsyncAuthorRepository(db)
+    author = await repo.update_author(author_id, author_update)
+    if author is None:
+        raise HTTPException(status_code=404, detail="Author not found")
+    return APIResponse(success=True, data=author)
+
+
+@router.delete("/{author_id}", response_model=APIResponse)
+async def delete_author(author_id: int, db: AsyncSession = Depends(get_async_db)):
+    repo = AsyncAuthorRepository(db)
+    author = await repo.delete_author(author_id)
+    if author is None:
+        raise HTTPException(status_code=404, detail="Author not found")
+    return APIResponse(success=True, message="Author deleted successfully")
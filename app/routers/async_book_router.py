@@ -0,0 +1,128 @@
+from datetime import date
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.repositories.async_book_repository import AsyncBookRepository
+from app.repositories.book_repository import BookFilter
+from app.models.book_model import BOOK_EXPORT_FIELDS, BOOK_LIST_FIELDS, Book
+from app.schemas.book_schema import BookCreate, BookResponse, BookListResponse, BookUpdate, book_list
+from app.core.database import get_async_db
+from app.schemas.response_schema import APIResponse
+from app.core.config import MAX_BATCH_IDS
+from app.core.cache import BOOK_RECORD, BOOKS_NAMESPACE
+from app.core.response_cache import cache_response
+from app.utils.export import EXPORT_FORMATS, async_iter_export, export_headers
+from app.utils.pagination import encode_cursor
+from app.utils.query_helper import parse_fields, parse_ids
+
+# Dipasang di depan book_router saat ASYNC_MODE aktif; route lain tetap dilayani book_router
+router = APIRouter(
+    prefix="/books",
+    tags=["Books"],
+    responses={404: {"description": "Not Found"}},
+)
+
+@router.get("/", response_model=APIResponse[BookListResponse])
+@cache_response(BOOKS_NAMESPACE, APIResponse[BookListResponse])
+async def list_books(
+    request: Request,
+    page: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous next_cursor; overrides page"),
+    sort: Optional[str] = Query(None, description="id, -id, title, publish_date or -publish_date; with filters only the sorts an index covers. Defaults to publish_date when filtering on a publish date range, else id"),
+    author_id: Optional[int] = Query(None, ge=1, description="Only the books of this author"),
+    published_from: Optional[date] = Query(None, description="Only books published on or after this date"),
+    published_to: Optional[date] = Query(None, description="Only books published on or before this date"),
+    q: Optional[str] = Query(None, max_length=200, description="Full-text search on title and description, most relevant first"),
+    estimate: bool = Query(False, description="Return an approximate total from table statistics"),
+    ids: Optional[str] = Query(None, description="Comma-separated book ids to fetch in one call; other parameters but fields are ignored"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, id is always included. Defaults to all but description, or all columns with q and ids"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Daftar biasa tanpa kolom berat secara default; hasil q dan ids tetap lengkap kecuali fields diisi
+    paging = ids is None and not (q and q.strip())
+    try:
+        projection = parse_fields(fields, Book, BOOK_LIST_FIELDS if paging else BOOK_EXPORT_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    repo = AsyncBookRepository(db)
+    if ids is not None:
+        try:
+            book_ids = parse_ids(ids, MAX_BATCH_IDS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        books = await repo.get_books_by_ids(book_ids)
+        return APIResponse(success=True, data=book_list(projection, total=len(books), books=books))
+
+    skip = page * limit
+    filters = BookFilter(author_id, published_from, published_to)
+    if q and q.strip():
+        if cursor:
+            raise HTTPException(status_code=400, detail="cursor cannot be combined with q, use page")
+        if filters:
+            raise HTTPException(status_code=400, detail="author_id, published_from and published_to cannot be combined with q")
+        books, total = await repo.search_books(q, skip=skip, limit=limit, fields=projection)
+        return APIResponse(success=True, data=book_list(projection, total=total, books=books))
+
+    sort = sort or filters.default_sort()
+    try:
+        books = await repo.get_books(skip=skip, limit=limit, sort=sort, cursor=cursor, fields=projection, filters=filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Perkiraan dari statistik tabel hanya berlaku untuk seluruh tabel, bukan hasil filter
+    total = await repo.estimate_books() if estimate and not filters else None
+    total_exact = total is None
+    if total_exact:
+        total = await repo.count_books(filters)
+    next_cursor = encode_cursor(sort, books[-1]) if len(books) == limit else None
+    response = book_list(projection, total=total, total_exact=total_exact, books=books, next_cursor=next_cursor)
+    return APIResponse(success=True, data=response)
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_books(export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"), db: AsyncSession = Depends(get_async_db)):
+    # Stream memakai session sendiri pada engine yang sama: session dari get_async_db sudah ditutup sebelum body selesai dikirim
+    bind = db.bind
+
+    async def batches():
+        async with AsyncSession(bind=bind) as stream_db:
+            async for rows in AsyncBookRepository(stream_db).stream_books():
+                yield rows
+
+    return StreamingResponse(
+        async_iter_export(batches(), BOOK_EXPORT_FIELDS, export_format),
+        media_type=EXPORT_FORMATS[export_format],
+        headers=export_headers("books", export_format),
+    )
+
+@router.get("/{book_id}", response_model=APIResponse[BookResponse])
+@cache_response(BOOKS_NAMESPACE, APIResponse[BookResponse], record=BOOK_RECORD)
+async def get_book(book_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    repo = AsyncBookRepository(db)
+    book = await repo.get_book(book_id)
+    if book is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+    return APIResponse(success=True, data=book)
+
+@router.post("/", response_model=APIResponse[BookResponse])
+async def create_book(book: BookCreate, db: AsyncSession = Depends(get_async_db)):
+    repo = AsyncBookRepository(db)
+    db_book = await repo.create_book(book)
+    return APIResponse(success=True, data=db_book)
+
+@router.put("/{book_id}", response_model=APIResponse[BookResponse])
+async def update_book(book_id: int, book_update: BookUpdate, db: AsyncSession = Depends(get_async_db)):
+    repo = AsyncBookRepository(db)
+    book = await repo.update_book(book_id, book_update)
+    if book is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+    return APIResponse(success=True, data=book)
+
+@router.delete("/{book_id}", response_model=APIResponse)
+async def delete_book(book_id: int, db: AsyncSession = Depends(get_async_db)):
+    repo = AsyncBookRepository(db)
+    book = await repo.delete_book(book_id)
+    if book is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+    return APIResponse(success=True, message="Book deleted successfully")
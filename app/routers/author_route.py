@@ -1,11 +1,22 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.repositories.author_repository import AuthorRepository
-from app.schemas.author_schema import AuthorCreate, AuthorResponse, AuthorListResponse, AuthorUpdate
+from app.repositories.author_repository import AUTHOR_BOOKS_SORT, AuthorRepository
+from app.models.author_model import AUTHOR_EXPORT_FIELDS, AUTHOR_LIST_FIELDS, Author
+from app.models.book_model import BOOK_LIST_FIELDS, Book
+from app.schemas.author_schema import AuthorCreate, AuthorResponse, AuthorListResponse, AuthorUpdate, author_list
 from app.core.database import get_db
-from app.schemas.book_schema import BookResponse
-from app.schemas.response_schema import APIResponse
+from app.schemas.book_schema import BookListResponse, book_list
+from app.schemas.response_schema import APIResponse, ImportResult
+from app.core.config import BULK_MAX_ITEMS, IMPORT_CHUNK_SIZE, MAX_BATCH_IDS
+from app.core.cache import AUTHOR_RECORD, AUTHORS_NAMESPACE, BOOKS_NAMESPACE
+from app.core.response_cache import cache_response
+from app.utils.export import EXPORT_FORMATS, export_headers, iter_export
+from app.utils.importer import iter_text_lines, parse_rows, spool_body
+from app.utils.pagination import encode_cursor
+from app.utils.query_helper import parse_fields, parse_ids
 
 router = APIRouter(
     prefix="/authors",
@@ -15,21 +26,89 @@ router = APIRouter(
 
 
 @router.get("/", response_model=APIResponse[AuthorListResponse])
+# Depends on the books generation too, for include=books
+@cache_response((AUTHORS_NAMESPACE, BOOKS_NAMESPACE), APIResponse[AuthorListResponse])
 def list_authors(
+    request: Request,
     page: int = Query(0, ge=0),
-    limit: int = Query(10, le=100),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous next_cursor; overrides page"),
+    sort: str = Query("id", description="Sort column: id, name, book_count or -book_count (most books first)"),
+    q: Optional[str] = Query(None, max_length=200, description="Full-text search on name and bio, most relevant first"),
+    include: Optional[Literal["books"]] = Query(None, description="Embed each author's books, loaded with one extra query per page"),
+    estimate: bool = Query(False, description="Return an approximate total from table statistics"),
+    ids: Optional[str] = Query(None, description="Comma-separated author ids to fetch in one call; other parameters but fields are ignored"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, id is always included. Defaults to all but bio, or all columns with q and ids"),
     db: Session = Depends(get_db)
 ):
+    include_books = include == "books"
+    if include_books and (ids is not None or (q and q.strip())):
+        raise HTTPException(status_code=400, detail="include=books is only supported when paging through authors")
+
+    # Plain pages leave the heavy columns out by default; q and ids return whole records unless fields is given
+    paging = ids is None and not (q and q.strip())
+    try:
+        projection = parse_fields(fields, Author, AUTHOR_LIST_FIELDS if paging else AUTHOR_EXPORT_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     repo = AuthorRepository(db)
+    if ids is not None:
+        try:
+            author_ids = parse_ids(ids, MAX_BATCH_IDS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        authors = repo.get_authors_by_ids(author_ids)
+        return APIResponse(success=True, data=author_list(projection, total=len(authors), authors=authors))
+
     skip = page * limit
-    total = repo.count_authors()
-    authors = repo.get_authors(skip=skip, limit=limit)
-    response = AuthorListResponse(total=total, authors=authors)
+    if q and q.strip():
+        if cursor:
+            raise HTTPException(status_code=400, detail="cursor cannot be combined with q, use page")
+        authors, total = repo.search_authors(q, skip=skip, limit=limit, fields=projection)
+        return APIResponse(success=True, data=author_list(projection, total=total, authors=authors))
+
+    total = repo.estimate_authors() if estimate else None
+    total_exact = total is None
+    if total_exact:
+        total = repo.count_authors()
+    try:
+        authors = repo.get_authors(
+            skip=skip, limit=limit, sort=sort, cursor=cursor, include_books=include_books, fields=projection
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    next_cursor = encode_cursor(sort, authors[-1]) if len(authors) == limit else None
+    response = author_list(
+        projection,
+        BOOK_LIST_FIELDS if include_books else None,
+        total=total,
+        total_exact=total_exact,
+        authors=authors,
+        next_cursor=next_cursor,
+    )
     return APIResponse(success=True, data=response)
 
 
+@router.get("/export", response_class=StreamingResponse)
+def export_authors(export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"), db: Session = Depends(get_db)):
+    # The stream opens its own session on the same engine: the get_db one is closed before the body is sent
+    bind = db.get_bind()
+
+    def batches():
+        with Session(bind=bind) as stream_db:
+            yield from AuthorRepository(stream_db).iter_authors()
+
+    return StreamingResponse(
+        iter_export(batches(), AUTHOR_EXPORT_FIELDS, export_format),
+        media_type=EXPORT_FORMATS[export_format],
+        headers=export_headers("authors", export_format),
+    )
+
+
 @router.get("/{author_id}", response_model=APIResponse[AuthorResponse])
-def get_author(author_id: int, db: Session = Depends(get_db)):
+@cache_response(AUTHORS_NAMESPACE, APIResponse[AuthorResponse], record=AUTHOR_RECORD)
+def get_author(author_id: int, request: Request, db: Session = Depends(get_db)):
     repo = AuthorRepository(db)
     author = repo.get_author(author_id)
     if author is None:
@@ -44,6 +123,27 @@ def create_author(author: AuthorCreate, db: Session = Depends(get_db)):
     return APIResponse(success=True, data=db_author)
 
 
+@router.post("/bulk", response_model=APIResponse[List[AuthorResponse]])
+def create_authors_bulk(authors: List[AuthorCreate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS), db: Session = Depends(get_db)):
+    repo = AuthorRepository(db)
+    db_authors = repo.create_authors(authors)
+    return APIResponse(success=True, data=db_authors)
+
+
+@router.post("/import", response_model=APIResponse[ImportResult])
+async def import_authors(
+    request: Request,
+    import_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, ge=1, le=10000, description="Rows inserted per transaction"),
+    db: Session = Depends(get_db)
+):
+    # The body is spooled to a temporary file as it arrives, then parsed and inserted chunk by chunk in the threadpool
+    with await spool_body(request) as body:
+        rows = parse_rows(iter_text_lines(body), import_format)
+        result = await run_in_threadpool(AuthorRepository(db).import_authors, rows, chunk_size)
+    return APIResponse(success=True, data=result)
+
+
 @router.put("/{author_id}", response_model=APIResponse[AuthorResponse])
 def update_author(author_id: int, author_update: AuthorUpdate, db: Session = Depends(get_db)):
     repo = AuthorRepository(db)
@@ -62,15 +162,26 @@ def delete_author(author_id: int, db: Session = Depends(get_db)):
     return APIResponse(success=True, message="Author deleted successfully")
 
 
-@router.get("/{id}/books", response_model=APIResponse[List[BookResponse]])
-def get_books_by_author(id: int, db: Session = Depends(get_db)):
+@router.get("/{id}/books", response_model=APIResponse[BookListResponse])
+@cache_response(BOOKS_NAMESPACE, APIResponse[BookListResponse])
+def get_books_by_author(
+    id: int,
+    request: Request,
+    page: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous next_cursor; overrides page"),
+    fields: Optional[str] = Query(None, description="Comma-separated book columns to return, id is always included. Defaults to all but description"),
+    db: Session = Depends(get_db)
+):
+    repo = AuthorRepository(db)
     try:
-        repo = AuthorRepository(db)
-        books = repo.get_books_by_author(id)
-        if books:
-            return APIResponse(success=True, data=books)
-        else:
-            raise HTTPException(
-                status_code=404, detail="Books not found for this author")
-    except Exception as e:
-        return APIResponse(success=False, message=str(e))
+        projection = parse_fields(fields, Book, BOOK_LIST_FIELDS)
+        result = repo.get_books_by_author(id, skip=page * limit, limit=limit, cursor=cursor, fields=projection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Author not found")
+    books, total = result
+    # The author's books are always in AUTHOR_BOOKS_SORT order
+    next_cursor = encode_cursor(AUTHOR_BOOKS_SORT, books[-1]) if len(books) == limit else None
+    return APIResponse(success=True, data=book_list(projection, total=total, books=books, next_cursor=next_cursor))
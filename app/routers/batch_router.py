@@ -0,0 +1,160 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+from urllib.parse import unquote
+
+import orjson
+from fastapi import APIRouter, HTTPException, Request, Response
+from starlette.responses import StreamingResponse
+from starlette.routing import BaseRoute, Match
+
+from app.core.config import BATCH_MAX_RESPONSE_BYTES
+from app.core.database import SHARED_SESSIONS_SCOPE_KEY, close_shared_sessions
+from app.core.exception_handlers import general_exception_handler, http_exception_handler
+from app.core.response_cache import BATCH_CACHE_SCOPE_KEY, BatchCache
+from app.schemas.batch_schema import BatchRequest, BatchRequestItem, BatchResponseItem
+from app.schemas.response_schema import APIResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/batch",
+    tags=["Batch"],
+)
+
+
+class BatchResponseTooLarge(Exception):
+    """The sub-responses of a batch add up to more than ``BATCH_MAX_RESPONSE_BYTES``."""
+
+
+def _is_streaming(route: BaseRoute) -> bool:
+    # Exports are declared with response_class=StreamingResponse; their whole body would be buffered here
+    response_class = getattr(route, "response_class", None)
+    return isinstance(response_class, type) and issubclass(response_class, StreamingResponse)
+
+
+def _sub_scope(request: Request, item: BatchRequestItem, cache: BatchCache, sessions: dict) -> dict:
+    path, _, query = item.path.partition("?")
+    return {
+        **request.scope,
+        "method": item.method,
+        "path": unquote(path),
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        # No headers of their own: no conditional GET, and the batch response is compressed as a whole
+        "headers": [],
+        BATCH_CACHE_SCOPE_KEY: cache,
+        SHARED_SESSIONS_SCOPE_KEY: sessions,
+    }
+
+
+def _match(request: Request, scope: dict) -> Tuple[Optional[BaseRoute], dict]:
+    # Same lookup as the router: first full match wins, so the async routes shadow the sync ones in ASYNC_MODE
+    for route in request.app.router.routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            # The path pattern already refuses /export, this also covers percent-encoded paths
+            return (None, {}) if _is_streaming(route) else (route, child_scope)
+    return None, {}
+
+
+async def _call(route: BaseRoute, scope: dict, max_bytes: int) -> Tuple[int, bytes, bytes]:
+    status, content_type, chunks, size = 500, b"", [], 0
+    requested, finished = False, asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Streaming responses listen for a disconnect while they send
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, content_type, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            size += len(body)
+            if size > max_bytes:
+                raise BatchResponseTooLarge()
+            chunks.append(body)
+
+    try:
+        await route.handle(scope, receive, send)
+    finally:
+        finished.set()
+    return status, content_type, b"".join(chunks)
+
+
+async def _run(
+    request: Request, item: BatchRequestItem, cache: BatchCache, sessions: dict, max_bytes: int
+) -> Tuple[int, bytes]:
+    """Status and JSON body of one sub-request, whose body may take at most ``max_bytes``."""
+    scope = _sub_scope(request, item, cache, sessions)
+    route, child_scope = _match(request, scope)
+    if route is None:
+        response = await http_exception_handler(request, HTTPException(status_code=404))
+        return response.status_code, response.body
+    scope.update(child_scope)
+    try:
+        status, content_type, body = await _call(route, scope, max_bytes)
+    except BatchResponseTooLarge:
+        raise
+    except Exception as exc:
+        # HTTPException is answered by the route itself, this is an unexpected error
+        logger.exception("Batch sub-request %s %s failed", item.method, item.path)
+        # The shared session may be left in a failed transaction, the next sub-request opens new ones
+        await close_shared_sessions(sessions)
+        response = await general_exception_handler(request, exc)
+        return response.status_code, response.body
+    if not body:
+        return status, b"null"
+    if not content_type.startswith(b"application/json"):
+        return status, orjson.dumps(body.decode())
+    return status, body
+
+
+@router.post("", response_model=APIResponse[List[BatchResponseItem]])
+async def run_batch(batch: BatchRequest, request: Request):
+    """
+    Run several GET requests of the book and author routes in one round trip.
+
+    Sub-requests run one after another with one database session, and their
+    response cache reads are merged into two Redis round trips (see
+    :class:`app.core.response_cache.BatchCache`). Each result carries the
+    status and body the route would have returned on its own, in request
+    order; a failing sub-request does not fail the batch. The whole batch is
+    refused with a 413 once its sub-responses exceed ``BATCH_MAX_RESPONSE_BYTES``.
+    """
+    cache = BatchCache()
+    sessions = {}
+    try:
+        # First pass: the cached routes only validate their parameters and note their cache keys
+        for item in batch.requests:
+            scope = _sub_scope(request, item, cache, sessions)
+            route, child_scope = _match(request, scope)
+            if route is not None and getattr(getattr(route, "endpoint", None), "cache_namespaces", None):
+                scope.update(child_scope)
+                try:
+                    await _call(route, scope, BATCH_MAX_RESPONSE_BYTES)
+                except Exception:
+                    # Reported by the second pass, which runs the sub-request again
+                    continue
+        await cache.prefetch()
+        results, remaining = [], BATCH_MAX_RESPONSE_BYTES
+        for item in batch.requests:
+            status, body = await _run(request, item, cache, sessions, remaining)
+            remaining -= len(body)
+            results.append((status, body))
+    except BatchResponseTooLarge:
+        raise HTTPException(status_code=413, detail="Batch response too large, split the batch")
+    finally:
+        await close_shared_sessions(sessions)
+
+    # Sub-responses are already rendered, they are embedded as they are instead of parsed and dumped again
+    items = b",".join(b'{"status":%d,"body":%s}' % (status, body) for status, body in results)
+    return Response(content=b'{"success":true,"message":null,"data":[' + items + b"]}", media_type="application/json")
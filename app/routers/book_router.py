@@ -1,9 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import date
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.repositories.book_repository import BookRepository
-from app.schemas.book_schema import BookCreate, BookResponse, BookListResponse, BookUpdate
+from app.repositories.book_repository import BookFilter, BookRepository
+from app.models.book_model import BOOK_EXPORT_FIELDS, BOOK_LIST_FIELDS, Book
+from app.schemas.book_schema import BookCreate, BookResponse, BookListResponse, BookUpdate, book_list
 from app.core.database import get_db
-from app.schemas.response_schema import APIResponse
+from app.schemas.response_schema import APIResponse, ImportResult
+from app.core.config import BULK_MAX_ITEMS, IMPORT_CHUNK_SIZE, MAX_BATCH_IDS
+from app.core.cache import BOOK_RECORD, BOOKS_NAMESPACE
+from app.core.response_cache import cache_response
+from app.utils.export import EXPORT_FORMATS, export_headers, iter_export
+from app.utils.importer import iter_text_lines, parse_rows, spool_body
+from app.utils.pagination import encode_cursor
+from app.utils.query_helper import parse_fields, parse_ids
 
 router = APIRouter(
     prefix="/books",
@@ -12,20 +24,80 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=APIResponse[BookListResponse])
+@cache_response(BOOKS_NAMESPACE, APIResponse[BookListResponse])
 def list_books(
+    request: Request,
     page: int = Query(0, ge=0),
-    limit: int = Query(10, le=100),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous next_cursor; overrides page"),
+    sort: Optional[str] = Query(None, description="id, -id, title, publish_date or -publish_date; with filters only the sorts an index covers. Defaults to publish_date when filtering on a publish date range, else id"),
+    author_id: Optional[int] = Query(None, ge=1, description="Only the books of this author"),
+    published_from: Optional[date] = Query(None, description="Only books published on or after this date"),
+    published_to: Optional[date] = Query(None, description="Only books published on or before this date"),
+    q: Optional[str] = Query(None, max_length=200, description="Full-text search on title and description, most relevant first"),
+    estimate: bool = Query(False, description="Return an approximate total from table statistics"),
+    ids: Optional[str] = Query(None, description="Comma-separated book ids to fetch in one call; other parameters but fields are ignored"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, id is always included. Defaults to all but description, or all columns with q and ids"),
     db: Session = Depends(get_db)
 ):
+    # Daftar biasa tanpa kolom berat secara default; hasil q dan ids tetap lengkap kecuali fields diisi
+    paging = ids is None and not (q and q.strip())
+    try:
+        projection = parse_fields(fields, Book, BOOK_LIST_FIELDS if paging else BOOK_EXPORT_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     repo = BookRepository(db)
+    if ids is not None:
+        try:
+            book_ids = parse_ids(ids, MAX_BATCH_IDS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        books = repo.get_books_by_ids(book_ids)
+        return APIResponse(success=True, data=book_list(projection, total=len(books), books=books))
+
     skip = page * limit
-    total = repo.count_books()
-    books = repo.get_books(skip=skip, limit=limit)
-    response = BookListResponse(total=total, books=books)
+    filters = BookFilter(author_id, published_from, published_to)
+    if q and q.strip():
+        if cursor:
+            raise HTTPException(status_code=400, detail="cursor cannot be combined with q, use page")
+        if filters:
+            raise HTTPException(status_code=400, detail="author_id, published_from and published_to cannot be combined with q")
+        books, total = repo.search_books(q, skip=skip, limit=limit, fields=projection)
+        return APIResponse(success=True, data=book_list(projection, total=total, books=books))
+
+    sort = sort or filters.default_sort()
+    try:
+        books = repo.get_books(skip=skip, limit=limit, sort=sort, cursor=cursor, fields=projection, filters=filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Perkiraan dari statistik tabel hanya berlaku untuk seluruh tabel, bukan hasil filter
+    total = repo.estimate_books() if estimate and not filters else None
+    total_exact = total is None
+    if total_exact:
+        total = repo.count_books(filters)
+    next_cursor = encode_cursor(sort, books[-1]) if len(books) == limit else None
+    response = book_list(projection, total=total, total_exact=total_exact, books=books, next_cursor=next_cursor)
     return APIResponse(success=True, data=response)
 
+@router.get("/export", response_class=StreamingResponse)
+def export_books(export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"), db: Session = Depends(get_db)):
+    # Stream memakai session sendiri pada engine yang sama: session dari get_db sudah ditutup sebelum body selesai dikirim
+    bind = db.get_bind()
+
+    def batches():
+        with Session(bind=bind) as stream_db:
+            yield from BookRepository(stream_db).iter_books()
+
+    return StreamingResponse(
+        iter_export(batches(), BOOK_EXPORT_FIELDS, export_format),
+        media_type=EXPORT_FORMATS[export_format],
+        headers=export_headers("books", export_format),
+    )
+
 @router.get("/{book_id}", response_model=APIResponse[BookResponse])
-def get_book(book_id: int, db: Session = Depends(get_db)):
+@cache_response(BOOKS_NAMESPACE, APIResponse[BookResponse], record=BOOK_RECORD)
+def get_book(book_id: int, request: Request, db: Session = Depends(get_db)):
     repo = BookRepository(db)
     book = repo.get_book(book_id)
     if book is None:
@@ -38,6 +110,25 @@ def create_book(book: BookCreate, db: Session = Depends(get_db)):
     db_book = repo.create_book(book)
     return APIResponse(success=True, data=db_book)
 
+@router.post("/bulk", response_model=APIResponse[List[BookResponse]])
+def create_books_bulk(books: List[BookCreate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS), db: Session = Depends(get_db)):
+    repo = BookRepository(db)
+    db_books = repo.create_books(books)
+    return APIResponse(success=True, data=db_books)
+
+@router.post("/import", response_model=APIResponse[ImportResult])
+async def import_books(
+    request: Request,
+    import_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, ge=1, le=10000, description="Rows inserted per transaction"),
+    db: Session = Depends(get_db)
+):
+    # Body ditampung ke file sementara sambil diterima, lalu diparse dan di-insert per chunk di threadpool
+    with await spool_body(request) as body:
+        rows = parse_rows(iter_text_lines(body), import_format)
+        result = await run_in_threadpool(BookRepository(db).import_books, rows, chunk_size)
+    return APIResponse(success=True, data=result)
+
 @router.put("/{book_id}", response_model=APIResponse[BookResponse])
 def update_book(book_id: int, book_update: BookUpdate, db: Session = Depends(get_db)):
     repo = BookRepository(db)
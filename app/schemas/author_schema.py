@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, SerializeAsAny
 from datetime import date
-from typing import Optional, List
+from typing import Optional, List, Sequence
+from app.schemas.book_schema import BookResponse
+from app.schemas.response_schema import sparse_list_model, sparse_model
 
 class AuthorBase(BaseModel):
     name: str
@@ -15,13 +17,30 @@ class AuthorUpdate(AuthorBase):
 
 class AuthorResponse(AuthorBase):
     id: int
+    book_count: int = 0
 
     class Config:
         from_attributes = True
 
+class AuthorWithBooksResponse(AuthorResponse):
+    books: List[BookResponse]
+
 class AuthorListResponse(BaseModel):
     total: int
-    authors: List[AuthorResponse]
+    # False when total is an estimate from table statistics
+    total_exact: bool = True
+    # AuthorWithBooksResponse items (include=books) keep their books when serialized
+    authors: List[SerializeAsAny[AuthorResponse]]
+    next_cursor: Optional[str] = None
 
     class Config:
         from_attributes = True
+
+def author_list(fields: Sequence[str], book_fields: Optional[Sequence[str]] = None, **data) -> AuthorListResponse:
+    """
+    AuthorListResponse whose authors only carry ``fields`` (?fields=), with
+    their books projected to ``book_fields`` when they are embedded (include=books).
+    """
+    extra = {} if book_fields is None else {"books": (List[sparse_model(BookResponse, tuple(book_fields))], ...)}
+    item_model = sparse_model(AuthorResponse, tuple(fields), **extra)
+    return sparse_list_model(AuthorListResponse, "authors", item_model)(**data)
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Any, List, Literal
+from app.core.config import BATCH_MAX_REQUESTS
+
+class BatchRequestItem(BaseModel):
+    # The lookahead below needs Python's re, the default engine has none
+    model_config = ConfigDict(regex_engine="python-re")
+
+    method: Literal["GET"] = "GET"
+    # A book or author route with its query string, e.g. /authors/3/books?limit=5; exports stream and are never batched
+    path: str = Field(..., pattern=r"^/(books|authors)(?!/export(/|\?|$))(/|\?|$)")
+
+class BatchRequest(BaseModel):
+    requests: List[BatchRequestItem] = Field(..., min_length=1, max_length=BATCH_MAX_REQUESTS)
+
+class BatchResponseItem(BaseModel):
+    status: int
+    # JSON body of the sub-request as the route returns it; a string for other content types
+    body: Any = None
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from datetime import date
-from typing import Optional, List
+from typing import Optional, List, Sequence
+from app.schemas.response_schema import sparse_list
 
 class BookBase(BaseModel):
     title: str
@@ -22,7 +23,14 @@ class BookResponse(BookBase):
 
 class BookListResponse(BaseModel):
     total: int
+    # False when total is an estimate from table statistics
+    total_exact: bool = True
     books: List[BookResponse]
+    next_cursor: Optional[str] = None
 
     class Config:
         from_attributes = True
+
+def book_list(fields: Sequence[str], **data) -> BookListResponse:
+    """BookListResponse whose books only carry ``fields`` (?fields=)."""
+    return sparse_list(BookListResponse, "books", BookResponse, fields, **data)
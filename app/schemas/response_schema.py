@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Generic, List, Optional, TypeVar
+import functools
+from pydantic import BaseModel, ConfigDict, create_model
+from typing import Any, Generic, List, Optional, Sequence, Tuple, Type, TypeVar
 
 T = TypeVar('T')
 
@@ -10,3 +11,43 @@ class APIResponse(BaseModel, Generic[T]):
 
     class Config:
         from_attributes = True
+
+class ImportRowError(BaseModel):
+    # 1-based line number in the uploaded file
+    row: int
+    error: str
+
+class ImportResult(BaseModel):
+    imported: int = 0
+    failed: int = 0
+    # Only the first IMPORT_MAX_ERRORS errors are listed; failed counts all of them
+    errors: List[ImportRowError] = []
+
+@functools.lru_cache(maxsize=None)
+def sparse_model(model: Type[BaseModel], fields: Tuple[str, ...], **extra: Any) -> Type[BaseModel]:
+    """
+    Copy of ``model`` with only ``fields`` (plus ``extra`` fields given as
+    ``name=(annotation, default)``), for the ``?fields=`` projections of the
+    list routes. Items are read from attributes, so ORM objects whose other
+    columns were never loaded validate. Created once per field set.
+    """
+    kept = {name: (info.annotation, info) for name, info in model.model_fields.items() if name in fields}
+    return create_model(
+        f"{model.__name__}[{','.join((*fields, *extra))}]", __config__=ConfigDict(from_attributes=True), **kept, **extra
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def sparse_list_model(list_model: Type[BaseModel], items_field: str, item_model: Type[BaseModel]) -> Type[BaseModel]:
+    """Subclass of ``list_model`` whose ``items_field`` holds ``item_model`` items."""
+    return create_model(
+        f"{list_model.__name__}[{item_model.__name__}]", __base__=list_model, **{items_field: (List[item_model], ...)}
+    )
+
+
+def sparse_list(
+    list_model: Type[BaseModel], items_field: str, item_model: Type[BaseModel], fields: Sequence[str], **data: Any
+) -> BaseModel:
+    """``list_model(**data)`` whose items only carry ``fields`` of ``item_model``."""
+    model = sparse_list_model(list_model, items_field, sparse_model(item_model, tuple(fields)))
+    return model(**data)
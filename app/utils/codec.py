@@ -0,0 +1,76 @@
+import json
+import struct
+from datetime import date
+from typing import Any, Dict, Sequence, Tuple
+
+# Struct code of the fixed-size part of each field kind; strings store their byte length there
+_FIXED_CODES = {"int": "q", "date": "i", "str": "I"}
+
+
+class RecordCodec:
+    """
+    Compact binary encoding of flat records with a fixed schema, used for the
+    ``book:{id}`` and ``author:{id}`` record caches.
+
+    Layout: a version byte, a null bitmap, one fixed-size slot per field (ints
+    as int64, dates as day ordinals, strings as their UTF-8 length), then the
+    UTF-8 bytes of the string fields. Field names and quoting are not stored,
+    and decoding is one ``struct.unpack_from`` plus a slice per string.
+    """
+
+    VERSION = 1
+
+    def __init__(self, fields: Sequence[Tuple[str, str]]):
+        """
+        :param fields: ``(name, kind)`` pairs in storage order; kind is ``int``, ``str`` or ``date``
+        """
+        if len(fields) > 16:
+            raise ValueError("RecordCodec supports at most 16 fields")
+        self.fields = list(fields)
+        self._header = struct.Struct("<BH" + "".join(_FIXED_CODES[kind] for _, kind in self.fields))
+
+    def pack(self, record: Dict[str, Any]) -> bytes:
+        nulls = 0
+        slots = []
+        strings = []
+        for index, (name, kind) in enumerate(self.fields):
+            value = record.get(name)
+            if value is None:
+                nulls |= 1 << index
+                slots.append(0)
+            elif kind == "str":
+                encoded = value.encode()
+                strings.append(encoded)
+                slots.append(len(encoded))
+            elif kind == "date":
+                # Records carry dates as ISO strings, like to_dict()
+                slots.append((date.fromisoformat(value) if isinstance(value, str) else value).toordinal())
+            else:
+                slots.append(value)
+        return self._header.pack(self.VERSION, nulls, *slots) + b"".join(strings)
+
+    def unpack(self, data: bytes) -> Dict[str, Any]:
+        """
+        Decode a record produced by :meth:`pack`.
+
+        JSON values written before the binary format was introduced are still
+        accepted, so existing cache entries do not have to be flushed.
+        """
+        if data[:1] == b"{":
+            return json.loads(data)
+        version, nulls, *slots = self._header.unpack_from(data)
+        if version != self.VERSION:
+            raise ValueError(f"Unsupported record version {version}")
+        record = {}
+        offset = self._header.size
+        for index, ((name, kind), slot) in enumerate(zip(self.fields, slots)):
+            if nulls >> index & 1:
+                record[name] = None
+            elif kind == "str":
+                record[name] = data[offset:offset + slot].decode()
+                offset += slot
+            elif kind == "date":
+                record[name] = date.fromordinal(slot).isoformat()
+            else:
+                record[name] = slot
+        return record
@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Mapping, Sequence
+
+# Media type of each supported export format
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def export_headers(name: str, export_format: str) -> Dict[str, str]:
+    """Headers that make browsers save the export as ``{name}.{format}``."""
+    return {"Content-Disposition": f'attachment; filename="{name}.{export_format}"'}
+
+
+def serialize_rows(rows: List[Mapping[str, Any]], fields: Sequence[str], export_format: str) -> str:
+    """
+    Serialize one batch of rows to NDJSON lines or CSV records.
+
+    :param rows: Row mappings, as returned by ``Result.mappings()``
+    :param fields: Columns to write, in order
+    :param export_format: ``ndjson`` or ``csv``
+    """
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([[_to_json(row[field]) for field in fields] for row in rows])
+        return buffer.getvalue()
+    return "".join(
+        json.dumps({field: _to_json(row[field]) for field in fields}, separators=(",", ":")) + "\n"
+        for row in rows
+    )
+
+
+def _csv_header(fields: Sequence[str]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(fields)
+    return buffer.getvalue()
+
+
+def iter_export(batches: Iterable[List[Mapping[str, Any]]], fields: Sequence[str], export_format: str) -> Iterator[str]:
+    """
+    Turn batches of rows into response chunks, one chunk per batch.
+
+    Only the current batch is held in memory, so the cost of an export does
+    not grow with the size of the table.
+    """
+    if export_format == "csv":
+        yield _csv_header(fields)
+    for rows in batches:
+        yield serialize_rows(rows, fields, export_format)
+
+
+async def async_iter_export(batches: AsyncIterable[List[Mapping[str, Any]]], fields: Sequence[str], export_format: str) -> AsyncIterator[str]:
+    """Async counterpart of :func:`iter_export`."""
+    if export_format == "csv":
+        yield _csv_header(fields)
+    async for rows in batches:
+        yield serialize_rows(rows, fields, export_format)
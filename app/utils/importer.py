@@ -0,0 +1,141 @@
+import csv
+import json
+import tempfile
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.core.config import IMPORT_CHUNK_SIZE, IMPORT_MAX_ERRORS, IMPORT_SPOOL_SIZE
+from app.schemas.response_schema import ImportResult, ImportRowError
+
+# (line number, parsed values, parse error); exactly one of values/error is set
+ParsedRow = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+async def spool_body(request: Request) -> BinaryIO:
+    """
+    Copy the request body into a temporary file as it arrives.
+
+    Small bodies stay in memory; anything above ``IMPORT_SPOOL_SIZE`` bytes
+    goes to disk, so an upload never has to fit in memory at once.
+    """
+    body = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE)
+    async for chunk in request.stream():
+        body.write(chunk)
+    body.seek(0)
+    return body
+
+
+def iter_text_lines(body: Iterable[bytes]) -> Iterator[str]:
+    """Decode a binary line iterator as UTF-8, dropping a leading BOM."""
+    for number, raw in enumerate(body):
+        line = raw.decode("utf-8", errors="replace")
+        yield line.lstrip("\ufeff") if number == 0 else line
+
+
+def parse_rows(lines: Iterable[str], import_format: str) -> Iterator[ParsedRow]:
+    """
+    Parse NDJSON objects or CSV records (with a header line) one row at a time.
+
+    Empty CSV cells become ``None`` so optional fields can be left blank.
+    """
+    if import_format == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            if None in record:
+                yield reader.line_num, None, "Row has more values than the header"
+                continue
+            yield reader.line_num, {key: value if value != "" else None for key, value in record.items()}, None
+        return
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            values = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(values, dict):
+            yield number, None, "Expected a JSON object"
+            continue
+        yield number, values, None
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def _add_error(result: ImportResult, row: int, error: str) -> None:
+    result.failed += 1
+    if len(result.errors) < IMPORT_MAX_ERRORS:
+        result.errors.append(ImportRowError(row=row, error=error))
+
+
+def _insert_chunk(db: Session, model: Type, chunk: List[Tuple[int, Dict[str, Any]]], result: ImportResult) -> None:
+    try:
+        db.execute(insert(model), [values for _, values in chunk])
+        db.commit()
+        result.imported += len(chunk)
+        return
+    except (IntegrityError, DataError):
+        db.rollback()
+
+    # The chunk has a row the database rejects: retry row by row to pin it down
+    for row, values in chunk:
+        try:
+            db.execute(insert(model), [values])
+            db.commit()
+            result.imported += 1
+        except (IntegrityError, DataError) as e:
+            db.rollback()
+            _add_error(result, row, str(e.orig))
+
+
+def import_rows(
+    db: Session,
+    model: Type,
+    schema: Type[BaseModel],
+    rows: Iterable[ParsedRow],
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> ImportResult:
+    """
+    Validate parsed rows with ``schema`` and insert them in chunks.
+
+    Each chunk is one multi-row INSERT in its own transaction. Invalid rows
+    are reported in the result and skipped; they never abort the import.
+
+    :param db: SQLAlchemy session
+    :param model: SQLAlchemy model class to insert into
+    :param schema: Pydantic schema used to validate each row
+    :param rows: Rows from :func:`parse_rows`
+    :param chunk_size: Rows per INSERT and transaction
+    :return: Counts of imported and failed rows, with the first errors
+    """
+    result = ImportResult()
+    chunk: List[Tuple[int, Dict[str, Any]]] = []
+    for row, values, error in rows:
+        if error is None:
+            try:
+                values = schema.model_validate(values).model_dump()
+            except ValidationError as e:
+                error = _format_validation_error(e)
+        if error is not None:
+            _add_error(result, row, error)
+            continue
+
+        chunk.append((row, values))
+        if len(chunk) >= chunk_size:
+            _insert_chunk(db, model, chunk, result)
+            chunk = []
+
+    if chunk:
+        _insert_chunk(db, model, chunk, result)
+    return result
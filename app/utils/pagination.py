@@ -0,0 +1,173 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+
+def validate_sort(sort: str, sort_fields: Dict[str, Any]) -> None:
+    """
+    Validate a sort expression such as ``title`` or ``-id``.
+
+    :param sort: Sort expression, optionally prefixed with ``-`` for descending order
+    :param sort_fields: Mapping of allowed sort expressions to model columns
+    :raises ValueError: If the sort expression is not supported
+    """
+    if sort not in sort_fields:
+        raise ValueError(f"Unsupported sort '{sort}', expected one of: {', '.join(sort_fields)}")
+
+
+def _index_orders(table) -> List[List[str]]:
+    """
+    Column order of the primary key and of each B-tree index of ``table``.
+
+    Secondary index entries end with the primary key (as on InnoDB), so an
+    index on ``author_id`` also returns the rows of one author by id.
+    FULLTEXT and SPATIAL indexes cannot order rows and are skipped.
+    """
+    primary = [column.name for column in table.primary_key.columns]
+    orders = [primary]
+    for index in table.indexes:
+        if index.dialect_options["mysql"]["prefix"]:
+            continue
+        orders.append([column.name for column in index.columns] + primary)
+    return orders
+
+
+def _index_covers(sort_column, equal: Sequence[str], ranged: Sequence[str]) -> bool:
+    if any(name != sort_column.name for name in ranged):
+        return False
+    for order in _index_orders(sort_column.table):
+        if set(order[:len(equal)]) == set(equal) and order[len(equal):len(equal) + 1] == [sort_column.name]:
+            return True
+    return False
+
+
+def validate_indexed_sort(sort: str, sort_fields: Dict[str, Any], equal: Sequence[str] = (), ranged: Sequence[str] = ()) -> None:
+    """
+    Validate ``sort`` for a filtered list: an index must return the matching
+    rows already in that order, so the page is read from the index instead of
+    sorting every match.
+
+    That is an index starting with the columns of the equality filters, in
+    any order, followed by the sort column. A range filter only fits on the
+    sort column itself.
+
+    :param sort: Sort expression, optionally prefixed with ``-`` for descending order
+    :param sort_fields: Mapping of allowed sort expressions to model columns
+    :param equal: Names of the columns filtered with ``=``
+    :param ranged: Names of the columns filtered with a range
+    :raises ValueError: If the sort is unknown or no index covers it for these filters
+    """
+    validate_sort(sort, sort_fields)
+    if _index_covers(sort_fields[sort], equal, ranged):
+        return
+    covered = [name for name, column in sort_fields.items() if _index_covers(column, equal, ranged)]
+    filtered = ", ".join(dict.fromkeys([*equal, *ranged]))
+    raise ValueError(f"Sort '{sort}' is not supported when filtering on {filtered}, expected one of: {', '.join(covered)}")
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _from_json(column, value: Any) -> Any:
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is date and isinstance(value, str):
+        return date.fromisoformat(value)
+    if python_type is datetime and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return python_type(value)
+
+
+def sort_columns(fields: Sequence[str], sort_column) -> List[str]:
+    """
+    Columns to load for a page projected to ``fields``: the sort column is
+    added because :func:`encode_cursor` reads it from the last item.
+    """
+    return list(fields) if sort_column.key in fields else [*fields, sort_column.key]
+
+
+def encode_cursor(sort: str, item: Any) -> str:
+    """
+    Build an opaque cursor pointing just after ``item`` for the given sort.
+
+    :param sort: Sort expression the cursor belongs to
+    :param item: Last object of the current page
+    :return: URL-safe cursor string
+    """
+    field = sort.lstrip("-")
+    values = [_to_json(getattr(item, field))]
+    if field != "id":
+        values.append(item.id)
+    payload = json.dumps({"s": sort, "v": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, sort_fields: Dict[str, Any], id_column) -> List[Any]:
+    """
+    Decode a cursor produced by :func:`encode_cursor`.
+
+    :param cursor: Cursor string sent by the client
+    :param sort: Sort expression of the current request
+    :param sort_fields: Mapping of allowed sort expressions to model columns
+    :param id_column: Primary key column used as tie-breaker
+    :return: List of keyset values, converted to the column types
+    :raises ValueError: If the cursor is malformed or was issued for a different sort
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        cursor_sort, values = payload["s"], payload["v"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort:
+        raise ValueError("Cursor does not match the requested sort")
+
+    columns = [id_column] if sort.lstrip("-") == "id" else [sort_fields[sort], id_column]
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError("Invalid cursor")
+    try:
+        return [_from_json(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def apply_sort(query: Query, sort: str, sort_fields: Dict[str, Any], id_column) -> Query:
+    """
+    Order ``query`` by the sort column, using the primary key as tie-breaker.
+    """
+    column = sort_fields[sort]
+    descending = sort.startswith("-")
+    if sort.lstrip("-") == "id":
+        return query.order_by(id_column.desc() if descending else id_column.asc())
+    if descending:
+        return query.order_by(column.desc(), id_column.desc())
+    return query.order_by(column.asc(), id_column.asc())
+
+
+def apply_keyset(query: Query, sort: str, sort_fields: Dict[str, Any], id_column, after: List[Any]) -> Query:
+    """
+    Restrict ``query`` to the rows that come after the keyset values ``after``.
+
+    Unlike OFFSET, the database can seek directly to the position in the index,
+    so the cost of a page does not grow with its depth.
+    """
+    column = sort_fields[sort]
+    descending = sort.startswith("-")
+    if sort.lstrip("-") == "id":
+        return query.filter(id_column < after[0] if descending else id_column > after[0])
+    value, last_id = after
+    # The redundant range on the sort column keeps the predicate sargable
+    if descending:
+        return query.filter(and_(column <= value, or_(column < value, id_column < last_id)))
+    return query.filter(and_(column >= value, or_(column > value, id_column > last_id)))
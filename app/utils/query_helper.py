@@ -1,8 +1,12 @@
 import json
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, inspect, text
-from typing import Type, List, Tuple, Dict, Any
+from datetime import date
+from sqlalchemy.orm import Session, load_only
+# select is aliased: get_paginated_results takes a select parameter
+from sqlalchemy import or_, inspect, insert, select as sa_select, text
+from typing import Type, List, Tuple, Dict, Any, Optional, Sequence
+from app.core.cache import get_generation, get_list_page
 from app.core.redis import redis_client
+from app.core.singleflight import load_once
 
 def get_paginated_results(
     db: Session,
@@ -31,62 +35,225 @@ def get_paginated_results(
     :return: Tuple of results (as list of dictionaries) and total count
     """
 
-    # Create a unique cache key
-    cache_key = f"{model.__name__}:{search}:{skip}:{limit}:{json.dumps(select)}:{json.dumps(joins)}"
-    cached_data = redis_client.get(cache_key)
+    # Create a unique cache key, scoped to the current generation of the model's table
+    generation = get_generation(model.__tablename__)
+    cache_key = f"{model.__name__}:{generation}:{search}:{skip}:{limit}:{json.dumps(select)}:{json.dumps(joins)}"
+    cached_data = get_list_page(cache_key)
 
     if cached_data:
         # If cache exists, return cached data
         return json.loads(cached_data)
 
-    # Validate and prepare select fields from the main model
-    valid_fields = [column.name for column in inspect(model).c]
-    valid_select_fields = [field for field in select if field in valid_fields]
-    query = db.query(*[getattr(model, field) for field in valid_select_fields])
-
-    # Handle joins
-    for join in joins:
-        join_model = join['model']
-        join_field = join['join']
-        fk_field = join['fk']
-        join_select = join.get('select', [])
-        join_search_fields = join.get('search', [])
-
-        # Validate and prepare select fields from the joined model
-        valid_join_fields = [column.name for column in inspect(join_model).c]
-        valid_join_select_fields = [field for field in join_select if field in valid_join_fields]
-
-        # Join with the related model
-        query = query.join(join_model, getattr(model, fk_field) == getattr(join_model, join_field))
-
-        # Add selected fields from the joined model to the query
-        if valid_join_select_fields:
-            query = query.add_columns(*[getattr(join_model, field) for field in valid_join_select_fields])
-
-        # Apply search filter on the joined model
-        if search and join_search_fields:
-            join_filters = [getattr(join_model, field).ilike(f"%{search}%") for field in join_search_fields]
-            query = query.filter(or_(*join_filters))
-
-    # Apply search filter on the main model
-    if search and search_fields:
-        filters = [getattr(model, field).ilike(f"%{search}%") for field in search_fields]
-        query = query.filter(or_(*filters))
-
-    # Clone the query to count the total records
-    count_query = query.statement.with_only_columns([text('count(*)')]).order_by(None)
-    total = db.execute(count_query).scalar()
-
-    # Get paginated results
-    results = query.offset(skip).limit(limit).all()
-
-    # Convert results to list of dictionaries for better usability
-    result_dicts = [
-        {column.name: value for column, value in zip(query.column_descriptions, result)}
-        for result in results
-    ]
-
-    # Cache the results
-    redis_client.setex(cache_key, cache_expire, json.dumps((result_dicts, total)))
-
-    return result_dicts, total
+    def load() -> str:
+        # Validate and prepare select fields from the main model
+        valid_fields = [column.name for column in inspect(model).c]
+        valid_select_fields = [field for field in select if field in valid_fields]
+        query = db.query(*[getattr(model, field) for field in valid_select_fields])
+
+        # Handle joins
+        for join in joins:
+            join_model = join['model']
+            join_field = join['join']
+            fk_field = join['fk']
+            join_select = join.get('select', [])
+            join_search_fields = join.get('search', [])
+
+            # Validate and prepare select fields from the joined model
+            valid_join_fields = [column.name for column in inspect(join_model).c]
+            valid_join_select_fields = [field for field in join_select if field in valid_join_fields]
+
+            # Join with the related model
+            query = query.join(join_model, getattr(model, fk_field) == getattr(join_model, join_field))
+
+            # Add selected fields from the joined model to the query
+            if valid_join_select_fields:
+                query = query.add_columns(*[getattr(join_model, field) for field in valid_join_select_fields])
+
+            # Apply search filter on the joined model
+            if search and join_search_fields:
+                join_filters = [getattr(join_model, field).ilike(f"%{search}%") for field in join_search_fields]
+                query = query.filter(or_(*join_filters))
+
+        # Apply search filter on the main model
+        if search and search_fields:
+            filters = [getattr(model, field).ilike(f"%{search}%") for field in search_fields]
+            query = query.filter(or_(*filters))
+
+        # Clone the query to count the total records
+        count_query = query.statement.with_only_columns([text('count(*)')]).order_by(None)
+        total = db.execute(count_query).scalar()
+
+        # Get paginated results
+        results = query.offset(skip).limit(limit).all()
+
+        # Convert results to list of dictionaries for better usability
+        result_dicts = [
+            {column.name: value for column, value in zip(query.column_descriptions, result)}
+            for result in results
+        ]
+        return json.dumps((result_dicts, total))
+
+    # Cache the results; concurrent misses share a single database load
+    cached_data = load_once(
+        cache_key,
+        load=load,
+        read=lambda: redis_client.get(cache_key),
+        write=lambda value: redis_client.setex(cache_key, cache_expire, value),
+    )
+    return json.loads(cached_data)
+
+
+def estimate_row_count(db: Session, model: Type) -> Optional[int]:
+    """
+    Estimate the number of rows of a model's table from the table statistics.
+
+    This avoids the index scan of ``COUNT(*)`` on InnoDB, but the value is only
+    as fresh as the statistics and can be off by a large margin on small tables.
+
+    :param db: SQLAlchemy session
+    :param model: SQLAlchemy model class
+    :return: Estimated row count, or None if the database has no such statistics
+    """
+    if db.get_bind().dialect.name != "mysql":
+        return None
+    estimate = db.execute(
+        text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+        ),
+        {"table": model.__tablename__},
+    ).scalar()
+    return int(estimate) if estimate is not None else None
+
+
+def parse_ids(value: str, max_ids: int) -> List[int]:
+    """
+    Parse a comma-separated list of ids, dropping duplicates but keeping order.
+
+    :param value: Raw query parameter, e.g. ``"3,1,2"``
+    :param max_ids: Maximum number of distinct ids accepted
+    :return: List of ids
+    :raises ValueError: If an id is not a positive integer or there are too many ids
+    """
+    ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if not part.isdigit():
+            raise ValueError(f"Invalid id '{part}'")
+        ids.append(int(part))
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > max_ids:
+        raise ValueError(f"At most {max_ids} ids can be requested at once")
+    return ids
+
+
+def parse_fields(value: Optional[str], model: Type, default: Sequence[str]) -> List[str]:
+    """
+    Parse a comma-separated ``?fields=`` list into column names of a model.
+
+    Names are validated against the model's columns, like ``select`` in
+    :func:`get_paginated_results`. ``id`` is always included, and the result
+    follows the table's column order, so ``title,id`` and ``id,title`` share
+    their cache entries.
+
+    :param value: Raw query parameter, e.g. ``"id,title"``; None or empty for ``default``
+    :param model: SQLAlchemy model class
+    :param default: Columns returned when no field is requested
+    :return: List of column names
+    :raises ValueError: If a name is not a column of the model
+    """
+    columns = [column.name for column in inspect(model).c]
+    requested = {part.strip() for part in (value or "").split(",") if part.strip()} or set(default)
+    unknown = sorted(requested.difference(columns))
+    if unknown:
+        raise ValueError(f"Unknown field '{unknown[0]}', expected any of: {', '.join(columns)}")
+    requested.add("id")
+    return [column for column in columns if column in requested]
+
+
+def load_columns(model: Type, fields: Sequence[str]):
+    """Loader option selecting only ``fields`` of ``model``; the other columns stay unloaded."""
+    return load_only(*[getattr(model, field) for field in fields])
+
+
+def columns_to_dict(obj: Any, fields: Sequence[str]) -> Dict[str, Any]:
+    """
+    ``obj.to_dict()`` restricted to ``fields``, without touching the other
+    columns, which would each be lazy-loaded when deferred.
+    """
+    result = {}
+    for field in fields:
+        value = getattr(obj, field)
+        result[field] = value.isoformat() if isinstance(value, date) else value
+    return result
+
+
+# Per engine: whether the ids of one multi-row INSERT are consecutive, see consecutive_auto_increment()
+_consecutive_ids: Dict[Any, bool] = {}
+
+
+def consecutive_auto_increment(db: Session) -> bool:
+    """
+    Whether the MySQL server of ``db`` assigns the auto-increment ids of one
+    multi-row INSERT consecutively, read once per engine.
+
+    That holds with ``innodb_autoinc_lock_mode`` 0 (traditional) or 1
+    (consecutive) and an ``auto_increment_increment`` of 1. MySQL 8 defaults
+    to 2 (interleaved), where concurrent INSERTs may interleave their ids.
+    """
+    bind = db.get_bind()
+    if bind not in _consecutive_ids:
+        mode, increment = db.execute(text("SELECT @@innodb_autoinc_lock_mode, @@auto_increment_increment")).one()
+        _consecutive_ids[bind] = int(mode) in (0, 1) and int(increment) == 1
+    return _consecutive_ids[bind]
+
+
+def _insert_id_range(db: Session, model: Type, rows: List[Dict[str, Any]]) -> Optional[List[Any]]:
+    # LAST_INSERT_ID() is the id of the first row; the SAVEPOINT undoes the INSERT when the range is off
+    savepoint = db.begin_nested()
+    first_id = db.execute(insert(model).values(rows)).lastrowid
+    created = db.scalars(
+        sa_select(model).where(model.id.between(first_id, first_id + len(rows) - 1)).order_by(model.id)
+    ).all()
+    if len(created) == len(rows):
+        savepoint.commit()
+        return created
+    savepoint.rollback()
+    return None
+
+
+def bulk_insert(db: Session, model: Type, rows: List[Dict[str, Any]]) -> List[Any]:
+    """
+    Insert rows in as few statements as the database allows and return the
+    created objects with their primary keys.
+
+    Backends with multi-row ``INSERT ... RETURNING`` (SQLite, MariaDB) get a
+    single batched statement. MySQL has no RETURNING: when its ids are
+    consecutive (see :func:`consecutive_auto_increment`) it gets one multi-row
+    ``INSERT ... VALUES``, and the rows are read back with one ``SELECT`` over
+    ``LAST_INSERT_ID()`` plus the row count. If that range does not hold
+    exactly the inserted rows, the INSERT is rolled back to a SAVEPOINT.
+    Otherwise, and on other backends, the ORM issues one INSERT per row
+    within a single flush.
+
+    :param db: SQLAlchemy session
+    :param model: SQLAlchemy model class
+    :param rows: Column values of the rows to insert
+    :return: List of created model instances, sorted by id; with RETURNING the
+        database does not promise that ids follow the order of ``rows``
+    """
+    dialect = db.get_bind().dialect
+    if dialect.insert_executemany_returning:
+        # Without sort_by_parameter_order, which would fall back to one row per statement
+        created = db.scalars(insert(model).returning(model), rows).all()
+        return sorted(created, key=lambda obj: obj.id)
+    if dialect.name == "mysql" and consecutive_auto_increment(db):
+        created = _insert_id_range(db, model, rows)
+        if created is not None:
+            return created
+    objects = [model(**row) for row in rows]
+    db.add_all(objects)
+    db.flush()
+    return objects
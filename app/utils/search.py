@@ -0,0 +1,94 @@
+from typing import Any, List, Optional, Sequence, Tuple, Type
+
+from sqlalchemy import DDL, Float, Integer, Table, event, func, or_, text
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session, load_only
+
+
+def normalize_query(q: str) -> str:
+    """Collapse whitespace and case so equivalent searches share a cache entry."""
+    return " ".join(q.split()).lower()
+
+
+def fts_table_name(table: Table) -> str:
+    return f"{table.name}_fts"
+
+
+def register_sqlite_fts(table: Table, fields: Sequence[str]) -> None:
+    """
+    Keep an FTS5 index of ``fields`` next to ``table`` on SQLite.
+
+    MySQL uses the FULLTEXT index declared on the model instead; this gives
+    local SQLite databases the same ranked search. The FTS5 table uses the
+    model's table as external content and is kept in sync by triggers.
+    """
+    name = fts_table_name(table)
+    columns = ", ".join(fields)
+    new_values = ", ".join(f"new.{field}" for field in fields)
+    old_values = ", ".join(f"old.{field}" for field in fields)
+    statements = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5({columns}, content='{table.name}', content_rowid='id')",
+        f"INSERT INTO {name}({name}) VALUES ('rebuild')",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON {table.name} BEGIN "
+        f"INSERT INTO {name}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE ON {table.name} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE ON {table.name} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {name}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+    ]
+    for statement in statements:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    event.listen(table, "before_drop", DDL(f"DROP TABLE IF EXISTS {name}").execute_if(dialect="sqlite"))
+
+
+def _fts5_query(q: str) -> str:
+    # Quote every term so user input cannot use FTS5 operators; OR ranks partial matches like MySQL
+    return " OR ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def search(
+    db: Session, model: Type, fields: Sequence[str], q: str, skip: int, limit: int, load: Optional[Sequence[str]] = None
+) -> Tuple[List[Any], int]:
+    """
+    Full-text search over ``fields`` of ``model``, most relevant first.
+
+    Uses ``MATCH ... AGAINST`` and the FULLTEXT index on MySQL and the FTS5
+    table from :func:`register_sqlite_fts` on SQLite. Other databases fall back
+    to an unranked ``LIKE`` scan.
+
+    :param db: SQLAlchemy session
+    :param model: SQLAlchemy model class
+    :param fields: Columns covered by the full-text index, in index order
+    :param q: Normalized search query
+    :param skip: Number of results to skip
+    :param limit: Number of results to return
+    :param load: Columns to load, all of them when None
+    :return: Tuple of matching model instances and total number of matches
+    """
+    dialect = db.get_bind().dialect.name
+    columns = [getattr(model, field) for field in fields]
+
+    if dialect == "mysql":
+        score = match(*columns, against=q)
+        total = db.query(func.count(model.id)).filter(score).scalar()
+        query = db.query(model).filter(score).order_by(score.desc(), model.id)
+    elif dialect == "sqlite":
+        name = fts_table_name(model.__table__)
+        params = {"q": _fts5_query(q)}
+        total = db.execute(text(f"SELECT count(*) FROM {name} WHERE {name} MATCH :q"), params).scalar()
+        ranked = (
+            text(f"SELECT rowid AS id, bm25({name}) AS rank FROM {name} WHERE {name} MATCH :q")
+            .bindparams(**params)
+            .columns(id=Integer, rank=Float)
+            .subquery()
+        )
+        query = db.query(model).join(ranked, model.id == ranked.c.id).order_by(ranked.c.rank, model.id)
+    else:
+        condition = or_(*[column.ilike(f"%{term}%") for column in columns for term in q.split()])
+        total = db.query(func.count(model.id)).filter(condition).scalar()
+        query = db.query(model).filter(condition).order_by(model.id)
+
+    if load is not None:
+        query = query.options(load_only(*[getattr(model, field) for field in load]))
+    return query.offset(skip).limit(limit).all(), total
@@ -0,0 +1,113 @@
+"""
+Load test comparing the sync (threadpool) and async request paths.
+
+The script starts one uvicorn worker per mode, seeds a few rows through the API
+and then fires GET requests at fixed concurrency levels, reporting throughput
+and latency percentiles for each mode.
+
+Usage:
+    python -m benchmarks.bench_async --concurrency 10 50 200 --requests 2000
+
+DATABASE_URL and REDIS_URL are passed through to the server, so point them at
+the same MySQL/Redis you run in production for representative numbers.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def start_server(port: int, async_mode: bool) -> subprocess.Popen:
+    env = dict(os.environ, ASYNC_MODE="true" if async_mode else "false")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+
+
+def wait_until_ready(base_url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/docs", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+def seed(base_url: str) -> list:
+    author = httpx.post(f"{base_url}/authors/", json={"name": "Load Author", "bio": "", "birth_date": "1970-01-01"}).json()
+    book_ids = []
+    for i in range(20):
+        book = httpx.post(f"{base_url}/books/", json={
+            "title": f"Load Book {i}",
+            "description": "x" * 500,
+            "publish_date": "2020-01-01",
+            "author_id": author["data"]["id"],
+        }).json()
+        book_ids.append(book["data"]["id"])
+    return book_ids
+
+
+async def run_load(base_url: str, paths: list, concurrency: int, total: int) -> dict:
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            response = await client.get(paths[i % len(paths)])
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{'mode':>6} {'conc':>6} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>7}")
+    for async_mode in (False, True):
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = start_server(args.port, async_mode)
+        try:
+            wait_until_ready(base_url)
+            book_ids = seed(base_url)
+            paths = [f"/books/{book_id}" for book_id in book_ids] + ["/books/?limit=10", "/authors/?limit=10"]
+            for concurrency in args.concurrency:
+                result = asyncio.run(run_load(base_url, paths, concurrency, args.requests))
+                mode = "async" if async_mode else "sync"
+                print(f"{mode:>6} {concurrency:>6} {result['rps']:>10.1f} {result['p50_ms']:>10.2f} "
+                      f"{result['p99_ms']:>10.2f} {result['errors']:>7}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+CPU per request and bytes on the wire for a list page, comparing FastAPI's
+default JSONResponse with APIJSONResponse, uncompressed and compressed.
+
+Usage:
+    python -m benchmarks.bench_encoding --items 100 --description-length 1000
+"""
+import argparse
+import gzip
+import os
+import random
+import string
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_encoding.db')}")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.core.compression import brotli  # noqa: E402
+from app.core.config import COMPRESSION_BROTLI_QUALITY, COMPRESSION_GZIP_LEVEL  # noqa: E402
+from app.core.responses import APIJSONResponse  # noqa: E402
+from app.schemas.book_schema import BookListResponse  # noqa: E402
+from app.schemas.response_schema import APIResponse  # noqa: E402
+
+
+def per_call_us(fn, repeat: int) -> float:
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - start) / repeat * 1e6
+
+
+def make_page(items: int, description_length: int) -> dict:
+    rng = random.Random(42)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(2000)]
+
+    def text(length: int) -> str:
+        out = []
+        while sum(map(len, out)) + len(out) < length:
+            out.append(rng.choice(words))
+        return " ".join(out)[:length]
+
+    books = [
+        {"id": i, "title": text(40).title(), "description": text(description_length), "publish_date": "2001-01-01", "author_id": i % 50}
+        for i in range(1, items + 1)
+    ]
+    page = APIResponse[BookListResponse](success=True, data=BookListResponse(total=100000, books=books))
+    # What FastAPI passes to the response class after validating the return value
+    return page.model_dump(mode="json")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--description-length", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    content = make_page(args.items, args.description_length)
+    default_body = JSONResponse(content).body
+    fast_body = APIJSONResponse(content).body
+    assert default_body == fast_body
+
+    encodings = [("identity", lambda body: body), (f"gzip-{COMPRESSION_GZIP_LEVEL}", lambda body: gzip.compress(body, COMPRESSION_GZIP_LEVEL))]
+    if brotli is not None:
+        encodings.append((f"br-{COMPRESSION_BROTLI_QUALITY}", lambda body: brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)))
+
+    print(f"{'response':>16} {'encoding':>10} {'cpu us':>10} {'bytes':>10}")
+    for name, response_class in (("JSONResponse", JSONResponse), ("APIJSONResponse", APIJSONResponse)):
+        for encoding, compress in encodings:
+            cpu_us = per_call_us(lambda: compress(response_class(content).body), args.repeat)
+            print(f"{name:>16} {encoding:>10} {cpu_us:>10.0f} {len(compress(fast_body)):>10}")
+
+
+if __name__ == "__main__":
+    main()
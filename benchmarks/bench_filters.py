@@ -0,0 +1,159 @@
+"""
+Filtered and sorted pages of GET /books/ (?author_id=, ?published_from=,
+?published_to=, ?sort=) on a large seeded table, with and without the
+composite indexes of app/models/book_model.py.
+
+For each filter the first page and the filtered COUNT are timed as the
+repository runs them (without the Redis cache), then again after dropping
+the publish_date indexes. "client scan" is the previous way of getting the
+same page: walk every page by id and filter locally.
+
+Usage:
+    python -m benchmarks.bench_filters --rows 500000 --authors 2000 --explain
+
+Set DATABASE_URL to benchmark against MySQL; by default a temporary SQLite
+database is used so the script runs without any external service.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_filters.db')}")
+
+from sqlalchemy import func, text  # noqa: E402
+
+from app.core.database import Base, SessionLocal, init_database  # noqa: E402
+from app.models.author_model import Author  # noqa: E402
+from app.models.book_model import Book  # noqa: E402
+from app.repositories.book_repository import BOOK_SORT_FIELDS, BookFilter  # noqa: E402
+from app.utils.pagination import apply_sort  # noqa: E402
+
+engine = init_database()
+
+# Indexes added for the filters, dropped for the "without" run
+FILTER_INDEXES = [index for index in Book.__table__.indexes if "publish_date" in index.columns]
+
+
+def seed(db, rows: int, authors: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    if db.query(Book).count() == rows and db.query(Author).count() == authors:
+        return
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db.execute(Author.__table__.insert(), [
+        {"name": f"Author {i}", "bio": "", "birth_date": date(1950, 1, 1)} for i in range(authors)
+    ])
+    db.commit()
+    chunk = 10000
+    for start in range(0, rows, chunk):
+        db.execute(Book.__table__.insert(), [
+            {
+                "title": f"Book {i:08d}",
+                "description": "x" * 200,
+                # Spread like real data: an author's books are not contiguous by id
+                "publish_date": date(1990, 1, 1) + timedelta(days=(i * 7919) % 12000),
+                "author_id": (i * 104729) % authors + 1,
+            }
+            for i in range(start, min(start + chunk, rows))
+        ])
+        db.commit()
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def page_query(db, filters: BookFilter, sort: str, limit: int):
+    query = db.query(Book).filter(*filters.conditions())
+    return apply_sort(query, sort, BOOK_SORT_FIELDS, Book.id).limit(limit)
+
+
+def count_query(db, filters: BookFilter):
+    return db.query(func.count(Book.id)).filter(*filters.conditions())
+
+
+def client_scan(db, filters: BookFilter, limit: int, page_size: int = 100) -> list:
+    # Every page by id (keyset, the cheapest way to walk them), filtered in Python
+    matches, last_id = [], 0
+    while True:
+        page = db.query(Book).filter(Book.id > last_id).order_by(Book.id).limit(page_size).all()
+        if not page:
+            break
+        last_id = page[-1].id
+        matches.extend(
+            book for book in page
+            if (filters.author_id is None or book.author_id == filters.author_id)
+            and (filters.published_from is None or book.publish_date >= filters.published_from)
+            and (filters.published_to is None or book.publish_date <= filters.published_to)
+        )
+    return matches[:limit]
+
+
+def explain(query) -> str:
+    statement = query.statement.compile(engine, compile_kwargs={"literal_binds": True})
+    prefix = "EXPLAIN QUERY PLAN" if engine.dialect.name == "sqlite" else "EXPLAIN"
+    # New connection: a pooled SQLite connection may answer with the plan it cached before the DDL
+    with engine.connect() as connection:
+        rows = connection.execute(text(f"{prefix} {statement}")).all()
+    return "; ".join(" ".join(str(value) for value in row if value is not None) for row in rows)
+
+
+def run(db, scenarios, args, label: str) -> None:
+    print(f"\n{label}")
+    print(f"{'filter':>42} {'sort':>14} {'page ms':>10} {'count ms':>10}")
+    for name, filters, sort in scenarios:
+        page_ms = timed(lambda: page_query(db, filters, sort, args.limit).all(), args.repeat)
+        count_ms = timed(lambda: count_query(db, filters).scalar(), args.repeat)
+        print(f"{name:>42} {sort:>14} {page_ms:>10.2f} {count_ms:>10.2f}")
+        if args.explain:
+            print(f"{'':>42} {explain(page_query(db, filters, sort, args.limit))}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--authors", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--explain", action="store_true", help="Print the query plan of each page")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    seed(db, args.rows, args.authors)
+
+    author_id = args.authors // 2
+    year = BookFilter(published_from=date(2005, 1, 1), published_to=date(2005, 12, 31))
+    scenarios = [
+        (f"author_id={author_id}", BookFilter(author_id=author_id), "id"),
+        (f"author_id={author_id}", BookFilter(author_id=author_id), "-publish_date"),
+        ("published 2005", year, "publish_date"),
+        (f"author_id={author_id}, published 2005", year._replace(author_id=author_id), "publish_date"),
+    ]
+
+    run(db, scenarios, args, "with indexes")
+    scan_ms = timed(lambda: client_scan(db, scenarios[0][1], args.limit), 1)
+    print(f"{'client scan of ' + scenarios[0][0]:>42} {'id':>14} {scan_ms:>10.2f}")
+
+    # End the read transaction so the DDL is not blocked by it
+    db.commit()
+    for index in FILTER_INDEXES:
+        index.drop(bind=engine)
+    try:
+        run(db, scenarios, args, "without the publish_date indexes")
+    finally:
+        for index in FILTER_INDEXES:
+            index.create(bind=engine)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measure import throughput (rows/second) of the chunked importer against one
+INSERT, commit and refresh per row, which is what POST /books/ costs.
+
+Usage:
+    python -m benchmarks.bench_import --rows 100000 --chunk-sizes 100,1000,5000
+
+Set DATABASE_URL to benchmark against MySQL; by default a temporary SQLite
+database is used so the script runs without any external service.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import date
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_import.db')}")
+
+from app.core.database import Base, SessionLocal, init_database  # noqa: E402
+from app.models.author_model import Author  # noqa: E402
+from app.models.book_model import Book  # noqa: E402
+from app.schemas.book_schema import BookCreate  # noqa: E402
+from app.utils.importer import import_rows, parse_rows  # noqa: E402
+
+engine = init_database()
+
+
+def reset(db) -> int:
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    author = Author(name="Bench Author", bio="", birth_date=date(1970, 1, 1))
+    db.add(author)
+    db.commit()
+    return author.id
+
+
+def feed(rows: int, author_id: int):
+    for i in range(rows):
+        yield json.dumps({
+            "title": f"Book {i:08d}",
+            "description": "x" * 200,
+            "publish_date": "2001-01-01",
+            "author_id": author_id,
+        })
+
+
+def per_row(db, rows: int, author_id: int) -> None:
+    for _, values, _ in parse_rows(feed(rows, author_id), "ndjson"):
+        book = Book(**BookCreate.model_validate(values).model_dump())
+        db.add(book)
+        db.commit()
+        db.refresh(book)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--per-row-rows", type=int, default=5000, help="Rows for the per-row baseline, which is much slower")
+    parser.add_argument("--chunk-sizes", default="100,1000,5000")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    print(f"{'mode':>14} {'rows':>8} {'rows/s':>10}")
+
+    author_id = reset(db)
+    start = time.perf_counter()
+    per_row(db, args.per_row_rows, author_id)
+    elapsed = time.perf_counter() - start
+    print(f"{'per row':>14} {args.per_row_rows:>8} {args.per_row_rows / elapsed:>10.0f}")
+
+    for chunk_size in (int(size) for size in args.chunk_sizes.split(",")):
+        author_id = reset(db)
+        start = time.perf_counter()
+        result = import_rows(db, Book, BookCreate, parse_rows(feed(args.rows, author_id), "ndjson"), chunk_size)
+        elapsed = time.perf_counter() - start
+        print(f"{f'chunk {chunk_size}':>14} {result.imported:>8} {result.imported / elapsed:>10.0f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Compare OFFSET pagination against keyset (cursor) pagination as page depth grows.
+
+Usage:
+    python -m benchmarks.bench_pagination --rows 200000 --limit 10
+
+Set DATABASE_URL to benchmark against MySQL; by default a temporary SQLite
+database is used so the script runs without any external service.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_pagination.db')}")
+
+from app.core.database import Base, SessionLocal, init_database  # noqa: E402
+from app.models.author_model import Author  # noqa: E402
+from app.models.book_model import Book  # noqa: E402
+from app.repositories.book_repository import BOOK_SORT_FIELDS  # noqa: E402
+from app.utils.pagination import apply_keyset, apply_sort, decode_cursor, encode_cursor  # noqa: E402
+
+engine = init_database()
+
+
+def seed(db, rows: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    if db.query(Book).count() == rows:
+        return
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    author = Author(name="Bench Author", bio="", birth_date=date(1970, 1, 1))
+    db.add(author)
+    db.commit()
+    chunk = 10000
+    for start in range(0, rows, chunk):
+        db.execute(Book.__table__.insert(), [
+            {
+                "title": f"Book {i:08d}",
+                "description": "x" * 200,
+                "publish_date": date(2000, 1, 1) + timedelta(days=i % 8000),
+                "author_id": author.id,
+            }
+            for i in range(start, min(start + chunk, rows))
+        ])
+        db.commit()
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--sort", default="id", choices=sorted(BOOK_SORT_FIELDS))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    seed(db, args.rows)
+    base = apply_sort(db.query(Book), args.sort, BOOK_SORT_FIELDS, Book.id)
+
+    print(f"{'page':>8} {'offset ms':>10} {'keyset ms':>10}")
+    max_page = args.rows // args.limit - 1
+    pages = sorted({p for p in (0, 10, 100, 1000, 5000, 10000, max_page) if p <= max_page})
+    for page in pages:
+        skip = page * args.limit
+        offset_ms = timed(lambda: base.offset(skip).limit(args.limit).all(), args.repeat)
+
+        # Cursor yang akan dikirim client setelah membaca halaman sebelumnya
+        cursor = None
+        if skip:
+            previous = base.offset(skip - 1).limit(1).one()
+            cursor = encode_cursor(args.sort, previous)
+
+        def keyset():
+            query = base
+            if cursor:
+                after = decode_cursor(cursor, args.sort, BOOK_SORT_FIELDS, Book.id)
+                query = apply_keyset(query, args.sort, BOOK_SORT_FIELDS, Book.id, after)
+            return query.limit(args.limit).all()
+
+        keyset_ms = timed(keyset, args.repeat)
+        print(f"{page:>8} {offset_ms:>10.2f} {keyset_ms:>10.2f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Per-hit CPU cost of a cached GET, before and after caching rendered responses.
+
+Before: the cached record (JSON) is decoded, rebuilt into transient ORM
+objects, validated against APIResponse[...] and serialized again, the way
+FastAPI renders a route's return value. After: the stored response bytes are
+read from the in-process tier and wrapped in a Response. Also compares the
+size and decode time of the JSON and binary record formats.
+
+Usage:
+    python -m benchmarks.bench_response_cache --items 10
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_response_cache.db')}")
+
+from fastapi import Response  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app.core.cache import LocalCache  # noqa: E402
+from app.core.response_cache import render  # noqa: E402
+from app.models.author_model import Author  # noqa: E402, F401
+from app.models.book_model import BOOK_RECORD_CODEC, Book  # noqa: E402
+from app.schemas.book_schema import BookListResponse, BookResponse  # noqa: E402
+from app.schemas.response_schema import APIResponse  # noqa: E402
+
+
+def per_call_us(fn, repeat: int) -> float:
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - start) / repeat * 1e6
+
+
+def fastapi_render(response_model, content) -> bytes:
+    # What FastAPI does with a route's return value: validate, encode, dump
+    validated = response_model.model_validate(content, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=10, help="Books per list page")
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    record = {
+        "id": 12345,
+        "title": "The Remains of the Day",
+        "description": "A butler looks back on his years of service at Darlington Hall. " * 3,
+        "publish_date": "1989-05-01",
+        "author_id": 42,
+    }
+    record_json = json.dumps(record).encode()
+    record_binary = BOOK_RECORD_CODEC.pack(record)
+    page_json = json.dumps([dict(record, id=record["id"] + i) for i in range(args.items)]).encode()
+
+    def record_before():
+        book = Book(**json.loads(record_json))
+        return Response(content=fastapi_render(APIResponse[BookResponse], APIResponse(success=True, data=book)))
+
+    def page_before():
+        books = [Book(**book_dict) for book_dict in json.loads(page_json)]
+        data = BookListResponse(total=1000, books=books)
+        return Response(content=fastapi_render(APIResponse[BookListResponse], APIResponse(success=True, data=data)))
+
+    local = LocalCache(16, 60)
+    local.set("record", record_before().body)
+    local.set("page", page_before().body)
+    assert local.get("record") == render(APIResponse[BookResponse], APIResponse(success=True, data=Book(**record)))
+
+    def record_after():
+        return Response(content=local.get("record"), media_type="application/json")
+
+    def page_after():
+        return Response(content=local.get("page"), media_type="application/json")
+
+    print(f"{'hit':>16} {'before us':>10} {'after us':>10} {'saved us':>10}")
+    for name, before, after in (("GET /books/{id}", record_before, record_after), (f"GET /books/ x{args.items}", page_before, page_after)):
+        before_us = per_call_us(before, args.repeat)
+        after_us = per_call_us(after, args.repeat)
+        print(f"{name:>16} {before_us:>10.1f} {after_us:>10.1f} {before_us - after_us:>10.1f}")
+
+    print()
+    print(f"{'record format':>16} {'bytes':>10} {'decode us':>10}")
+    print(f"{'json':>16} {len(record_json):>10} {per_call_us(lambda: json.loads(record_json), args.repeat * 5):>10.2f}")
+    print(f"{'binary':>16} {len(record_binary):>10} {per_call_us(lambda: BOOK_RECORD_CODEC.unpack(record_binary), args.repeat * 5):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Compare full-text search against a LIKE scan on the books table.
+
+Usage:
+    python -m benchmarks.bench_search --rows 100000 --q "stranger term1234"
+
+Set DATABASE_URL to benchmark the MySQL FULLTEXT index; by default a temporary
+SQLite database is used and search runs on FTS5.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_search.db')}")
+
+from sqlalchemy import or_  # noqa: E402
+
+from app.core.database import Base, SessionLocal, init_database  # noqa: E402
+from app.models.author_model import Author  # noqa: E402
+from app.models.book_model import BOOK_SEARCH_FIELDS, Book  # noqa: E402
+from app.utils.search import search  # noqa: E402
+
+engine = init_database()
+
+WORDS = [
+    "war", "peace", "novel", "river", "garden", "empire", "winter", "journey", "letters", "house",
+    "silent", "storm", "mirror", "island", "stranger", "history", "night", "secret", "city", "light",
+]
+
+
+def seed(db, rows: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    if db.query(Book).count() == rows:
+        return
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    author = Author(name="Bench Author", bio="", birth_date=date(1970, 1, 1))
+    db.add(author)
+    db.commit()
+    rng = random.Random(42)
+    # Kosakata sintetis dengan distribusi Zipf, seperti teks sungguhan
+    vocabulary = WORDS + [f"term{i}" for i in range(5000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    chunk = 10000
+    for start in range(0, rows, chunk):
+        db.execute(Book.__table__.insert(), [
+            {
+                "title": " ".join(rng.choices(vocabulary, weights, k=3)).title(),
+                "description": " ".join(rng.choices(vocabulary, weights, k=30)),
+                "publish_date": date(2000, 1, 1),
+                "author_id": author.id,
+            }
+            for _ in range(start, min(start + chunk, rows))
+        ])
+        db.commit()
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--q", default="stranger term1234")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    seed(db, args.rows)
+
+    def like_scan():
+        terms = args.q.split()
+        conditions = [getattr(Book, field).ilike(f"%{term}%") for field in BOOK_SEARCH_FIELDS for term in terms]
+        query = db.query(Book).filter(or_(*conditions))
+        return query.count(), query.order_by(Book.id).limit(args.limit).all()
+
+    like_ms = timed(like_scan, args.repeat)
+    fulltext_ms = timed(lambda: search(db, Book, BOOK_SEARCH_FIELDS, args.q, 0, args.limit), args.repeat)
+    print(f"{'mode':>10} {'ms':>10}")
+    print(f"{'like':>10} {like_ms:>10.2f}")
+    print(f"{engine.dialect.name:>10} {fulltext_ms:>10.2f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+How long a new worker takes to serve, started from scratch or forked from a
+preloaded master (gunicorn.conf.py).
+
+    spawn: a fresh interpreter imports app.main and runs the lifespan startup
+           (what uvicorn --workers and a new container pay)
+    fork:  a process that already imported app.main forks and the child runs
+           the lifespan startup (what a gunicorn preload worker pays)
+
+Import and lifespan are also reported separately for the spawned workers, and
+--slowest lists the modules with the highest cumulative import time.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 10 --slowest 15
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_startup.db')}")
+os.environ.setdefault("REDIS_URL", "memory://")
+
+# Run in each spawned interpreter; prints the import and lifespan durations
+SPAWN_SNIPPET = """
+import asyncio, json, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def boot():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready = asyncio.run(boot())
+print(json.dumps({"import": imported - started, "lifespan": ready - imported}))
+"""
+
+
+async def boot(app) -> float:
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+
+def measure_spawn(runs: int) -> dict:
+    imports, lifespans, totals = [], [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", SPAWN_SNIPPET], capture_output=True, text=True, check=True).stdout
+        totals.append(time.perf_counter() - started)
+        result = json.loads(output.strip().splitlines()[-1])
+        imports.append(result["import"])
+        lifespans.append(result["lifespan"])
+    return {"import": imports, "lifespan": lifespans, "spawn": totals}
+
+
+def measure_fork(runs: int) -> list:
+    from app.main import app
+
+    durations = []
+    for _ in range(runs):
+        read_fd, write_fd = os.pipe()
+        started = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            # perf_counter is CLOCK_MONOTONIC on Linux, shared by parent and child
+            ready = asyncio.run(boot(app))
+            os.write(write_fd, str(ready - started).encode())
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            durations.append(float(pipe.read()))
+        os.waitpid(pid, 0)
+    return durations
+
+
+def slowest_imports(count: int) -> list:
+    """Modules of app.main by cumulative import time, from ``python -X importtime``."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                            capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative) / 1000, name.strip()))
+    return sorted(modules, reverse=True)[:count]
+
+
+def summary(label: str, values: list) -> None:
+    print(f"{label:>10} {statistics.median(values) * 1000:>10.1f} {max(values) * 1000:>10.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--slowest", type=int, default=0, help="Also list the N slowest imports")
+    args = parser.parse_args()
+
+    spawned = measure_spawn(args.runs)
+    forked = measure_fork(args.runs)
+    print(f"{'':>10} {'median ms':>10} {'max ms':>10}")
+    summary("import", spawned["import"])
+    summary("lifespan", spawned["lifespan"])
+    summary("spawn", spawned["spawn"])
+    summary("fork", forked)
+
+    if args.slowest:
+        print(f"\n{'cumul. ms':>10}  module")
+        for milliseconds, name in slowest_imports(args.slowest):
+            print(f"{milliseconds:>10.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Self-contained benchmark suite for the main API paths, written to a JSON
+report that can be compared across commits.
+
+Requests go through the ASGI app in-process (no server, no network), so the
+numbers cover routing, validation, caching, the ORM and serialization. By
+default the database is a temporary SQLite file and Redis is the in-process
+fake (REDIS_URL=memory://, needs fakeredis and lupa); set DATABASE_URL and
+REDIS_URL to run the same suite against MySQL and Redis.
+
+Scenarios: get (GET /books/{id}), list_shallow (first pages), list_deep (last
+pages, OFFSET near the end of the table), search (?q=), create (POST /books/)
+and bulk (POST /books/bulk). Reads are measured cold, where every request uses
+a key that is not cached yet, and warm, where the same requests are replayed
+once the caches hold them. Writes do not depend on the cache.
+
+Usage:
+    python -m benchmarks.bench_suite --books 20000 --concurrency 1 8 32 --requests 500 --output after.json
+    python -m benchmarks.bench_suite --compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_suite.db')}")
+os.environ.setdefault("REDIS_URL", "memory://")
+
+import httpx  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+
+from app.core.cache import clear_caches  # noqa: E402
+from app.core.config import ASYNC_MODE, DATABASE_URL, REDIS_URL  # noqa: E402
+from app.core.database import Base, SessionLocal, init_database  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.author_model import Author  # noqa: E402
+from app.models.book_model import Book  # noqa: E402
+
+engine = init_database()
+
+# Vocabulary of the seeded titles and descriptions, and the search terms
+WORDS = [
+    "river", "garden", "empire", "shadow", "winter", "ocean", "machine", "forest", "silver", "harbor",
+    "lantern", "orchard", "thunder", "meadow", "compass", "citadel", "falcon", "ember", "glacier", "canyon",
+]
+LIST_LIMIT = 20
+BULK_SIZE = 100
+READ_SCENARIOS = ("get", "list_shallow", "list_deep", "search")
+WRITE_SCENARIOS = ("create", "bulk")
+
+
+def seed(books: int, authors: int) -> dict:
+    """Fill the tables with a deterministic catalog, reusing it when the sizes match."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if db.query(Book).count() != books or db.query(Author).count() != authors:
+            db.close()
+            Base.metadata.drop_all(bind=engine)
+            Base.metadata.create_all(bind=engine)
+            rng = random.Random(42)
+            db.execute(Author.__table__.insert(), [
+                {"name": f"Author {i}", "bio": " ".join(rng.choices(WORDS, k=20)), "birth_date": date(1950, 1, 1) + timedelta(days=i)}
+                for i in range(authors)
+            ])
+            for start in range(0, books, 10000):
+                db.execute(Book.__table__.insert(), [
+                    {
+                        "title": " ".join(rng.choices(WORDS, k=3)).title(),
+                        "description": " ".join(rng.choices(WORDS, k=60)),
+                        "publish_date": date(1990, 1, 1) + timedelta(days=i % 10000),
+                        "author_id": 1 + i % authors,
+                    }
+                    for i in range(start, min(start + 10000, books))
+                ])
+            db.commit()
+        book_ids = [row.id for row in db.query(Book.id)]
+        author_ids = [row.id for row in db.query(Author.id)]
+    finally:
+        db.close()
+    # The tables may have been recreated, so nothing in Redis can be trusted
+    clear_caches()
+    return {"book_ids": book_ids, "author_ids": author_ids}
+
+
+def read_request(scenario: str, i: int, catalog: dict):
+    """The i-th request of a read scenario; distinct i give distinct cache keys."""
+    book_ids = catalog["book_ids"]
+    if scenario == "get":
+        return "GET", f"/books/{book_ids[i % len(book_ids)]}", None
+    if scenario == "list_shallow":
+        # Page and limit both vary so every request is a different list page
+        return "GET", f"/books/?page={i % 10}&limit={10 + (i // 10) % 91}", None
+    if scenario == "list_deep":
+        last_page = max(len(book_ids) // LIST_LIMIT - 1, 0)
+        return "GET", f"/books/?page={max(last_page - i, 0)}&limit={LIST_LIMIT}", None
+    if scenario == "search":
+        return "GET", f"/books/?q={WORDS[i % len(WORDS)]}&page={i // len(WORDS)}&limit={LIST_LIMIT}", None
+    raise ValueError(scenario)
+
+
+def write_request(scenario: str, i: int, catalog: dict):
+    author_id = catalog["author_ids"][i % len(catalog["author_ids"])]
+    book = {"title": f"Bench Book {i}", "description": " ".join(WORDS), "publish_date": "2024-01-01", "author_id": author_id}
+    if scenario == "create":
+        return "POST", "/books/", book
+    if scenario == "bulk":
+        return "POST", "/books/bulk", [dict(book, title=f"Bench Book {i}.{j}") for j in range(BULK_SIZE)]
+    raise ValueError(scenario)
+
+
+async def run_load(client: httpx.AsyncClient, requests: list, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    pending = iter(requests)
+
+    async def worker():
+        nonlocal errors
+        for method, path, body in pending:
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(requests),
+        "errors": errors,
+        "rps": round(len(requests) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        # Nearest-rank percentile, which stays meaningful for short runs
+        "p99_ms": round(latencies[math.ceil(len(latencies) * 0.99) - 1] * 1000, 3),
+    }
+
+
+async def run_suite(args, catalog: dict) -> list:
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                if scenario in READ_SCENARIOS:
+                    requests = [read_request(scenario, i, catalog) for i in range(args.requests)]
+                    clear_caches()
+                    runs = [("cold", requests), ("warm", requests)]
+                else:
+                    count = max(args.requests // BULK_SIZE, 1) if scenario == "bulk" else args.requests
+                    runs = [(None, [write_request(scenario, i, catalog) for i in range(count)])]
+                for cache, run in runs:
+                    result = await run_load(client, run, concurrency)
+                    result.update(scenario=scenario, cache=cache, concurrency=concurrency)
+                    results.append(result)
+                    print(format_row(result), flush=True)
+    return results
+
+
+def format_row(result: dict) -> str:
+    return (f"{result['scenario']:>13} {result['cache'] or '-':>5} {result['concurrency']:>5} "
+            f"{result['rps']:>10.1f} {result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['errors']:>6}")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(before_path: str, after_path: str) -> None:
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before['meta']['commit']} -> {after['meta']['commit']}")
+    print(f"{'scenario':>13} {'cache':>5} {'conc':>5} {'req/s':>20} {'p99 ms':>22}")
+    key = lambda r: (r["scenario"], r["cache"], r["concurrency"])  # noqa: E731
+    previous = {key(r): r for r in before["results"]}
+    for result in after["results"]:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        rps_change = (result["rps"] / old["rps"] - 1) * 100 if old["rps"] else 0
+        p99_change = (result["p99_ms"] / old["p99_ms"] - 1) * 100 if old["p99_ms"] else 0
+        print(f"{result['scenario']:>13} {result['cache'] or '-':>5} {result['concurrency']:>5} "
+              f"{old['rps']:>8.1f} -> {result['rps']:>8.1f} {rps_change:>+6.1f}% "
+              f"{old['p99_ms']:>7.2f} -> {result['p99_ms']:>7.2f} {p99_change:>+6.1f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=20000, help="Size of the seeded catalog")
+    parser.add_argument("--authors", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario, cache state and concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--scenarios", nargs="+", default=list(READ_SCENARIOS + WRITE_SCENARIOS),
+                        choices=READ_SCENARIOS + WRITE_SCENARIOS)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two reports instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    catalog = seed(args.books, args.authors)
+    print(f"{'scenario':>13} {'cache':>5} {'conc':>5} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>6}")
+    results = asyncio.run(run_suite(args, catalog))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "database": make_url(DATABASE_URL).get_backend_name(),
+            "redis": "memory" if REDIS_URL.startswith("memory://") else "redis",
+            "async_mode": ASYNC_MODE,
+            "books": args.books,
+            "authors": args.authors,
+            "requests": args.requests,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Pre-forking launch: the application is imported once in the gunicorn master
+and every worker is forked from it (preload_app), so adding a worker costs a
+fork and the lifespan startup instead of a fresh interpreter importing
+FastAPI, pydantic and SQLAlchemy.
+
+Nothing opens a connection at import: the engines are created in each
+worker's lifespan and the Redis pools connect on first use.
+
+Usage:
+    python -m app.cli bootstrap
+    WEB_CONCURRENCY=8 gunicorn app.main:app -c gunicorn.conf.py
+"""
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+# Time a worker gets to run its lifespan (cache warm-up included) before it is restarted
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+
+
+def child_exit(server, worker):
+    # Drop the live gauges of a dead worker from the shared metrics directory
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
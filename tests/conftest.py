@@ -1,21 +1,31 @@
+import os
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import ProgrammingError
 from sqlalchemy import text
+
+# Tanpa MySQL/Redis: TEST_DATABASE_URL=sqlite:///./test.db REDIS_URL=memory:// pytest
+if os.getenv("TEST_DATABASE_URL"):
+    os.environ.setdefault("DATABASE_URL", os.environ["TEST_DATABASE_URL"])
+
 from app.main import app
+from app.core.cache import clear_caches
 from app.core.database import Base, get_db
 
 # URL untuk MySQL (tanpa nama database untuk membuat database)
-SQLALCHEMY_DATABASE_URL_WITHOUT_DB = "mysql://root:@localhost"
+SQLALCHEMY_DATABASE_URL_WITHOUT_DB = os.getenv("TEST_DATABASE_SERVER_URL", "mysql://root:@localhost")
 DATABASE_NAME = "test_db"
 
+# TEST_DATABASE_URL dipakai apa adanya, tanpa CREATE/DROP DATABASE
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
 # URL dengan nama database untuk melakukan koneksi setelah database dibuat
-SQLALCHEMY_DATABASE_URL = f"{SQLALCHEMY_DATABASE_URL_WITHOUT_DB}/{DATABASE_NAME}"
+SQLALCHEMY_DATABASE_URL = TEST_DATABASE_URL or f"{SQLALCHEMY_DATABASE_URL_WITHOUT_DB}/{DATABASE_NAME}"
 
 # Engine untuk membuat database
-engine_without_db = create_engine(SQLALCHEMY_DATABASE_URL_WITHOUT_DB)
+engine_without_db = None if TEST_DATABASE_URL else create_engine(SQLALCHEMY_DATABASE_URL_WITHOUT_DB)
 
 # Engine setelah database dibuat
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
@@ -23,6 +33,8 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engin
 
 # Membuat database jika belum ada
 def create_test_database():
+    if engine_without_db is None:
+        return
     try:
         with engine_without_db.connect() as conn:
             conn.execute(text(f"CREATE DATABASE IF NOT EXISTS {DATABASE_NAME}"))
@@ -31,6 +43,8 @@ def create_test_database():
 
 # Hapus database setelah pengujian selesai
 def drop_test_database():
+    if engine_without_db is None:
+        return
     try:
         with engine_without_db.connect() as conn:
             conn.execute(text(f"DROP DATABASE IF EXISTS {DATABASE_NAME}"))
@@ -53,6 +67,8 @@ def setup_database():
     # Membuat database sebelum tes
     create_test_database()
     Base.metadata.create_all(bind=engine)
+    # Id dimulai lagi dari 1 pada tabel baru, record lama di Redis harus dibuang
+    clear_caches()
 
     yield  # Semua pengujian berjalan di sini
 
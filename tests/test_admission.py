@@ -0,0 +1,140 @@
+import asyncio
+import uuid
+import httpx
+import orjson
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from app.core.admission import INTERNAL_SCOPE_KEY, AdmissionControlMiddleware
+from app.core.metrics import ADMISSION_SHED
+from app.core.rate_limit import Budget, RateLimitMiddleware, take_tokens
+
+async def slow(request):
+    await asyncio.sleep(0.2)
+    return PlainTextResponse("ok")
+
+def test_admission_control_sheds_beyond_the_queue():
+    app = AdmissionControlMiddleware(Starlette(routes=[Route("/slow", slow)]), max_in_flight=1, max_queue=1, queue_timeout=5, retry_after=3)
+    shed_before = ADMISSION_SHED.labels("queue_full")._value.get()
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.get("/slow") for _ in range(3)))
+
+    responses = asyncio.run(run())
+    # One served, one queued and then served, one rejected without waiting
+    assert sorted(response.status_code for response in responses) == [200, 200, 503]
+    shed = next(response for response in responses if response.status_code == 503)
+    assert shed.headers["retry-after"] == "3"
+    assert ADMISSION_SHED.labels("queue_full")._value.get() == shed_before + 1
+
+def test_admission_control_sheds_after_queue_timeout():
+    app = AdmissionControlMiddleware(Starlette(routes=[Route("/slow", slow)]), max_in_flight=1, max_queue=10, queue_timeout=0.05, retry_after=1)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.get("/slow") for _ in range(2)))
+
+    assert sorted(response.status_code for response in asyncio.run(run())) == [200, 503]
+
+def test_token_bucket_allows_the_burst_then_waits():
+    key = f"ratelimit:test:{uuid.uuid4().hex}"
+    budget = Budget(rate=1, burst=2)
+
+    async def run():
+        return [await take_tokens([(key, budget, 1)]) for _ in range(3)]
+
+    first, second, third = asyncio.run(run())
+    assert first is None and second is None
+    # About one second until the next token
+    index, wait = third
+    assert index == 0 and 0 < wait <= 1000
+
+def test_token_buckets_are_charged_all_or_nothing():
+    read, expensive = (f"ratelimit:{budget}:{uuid.uuid4().hex}" for budget in ("read", "expensive"))
+    budget = Budget(rate=0.01, burst=3)
+
+    async def run():
+        refused = await take_tokens([(read, budget, 2), (expensive, budget, 4)])
+        # Nothing was taken from the read bucket by the refused charge
+        allowed = await take_tokens([(read, budget, 3), (expensive, budget, 1)])
+        return refused, allowed
+
+    refused, allowed = asyncio.run(run())
+    assert refused[0] == 1
+    assert allowed is None
+
+def test_rate_limit_separates_budgets_and_clients():
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    inner = Starlette(routes=[Route("/books/", ok, methods=["GET", "POST"])])
+    budgets = {"read": Budget(rate=0.01, burst=2), "expensive": Budget(rate=0.01, burst=1)}
+    app = RateLimitMiddleware(inner, budgets, key_header="X-API-Key")
+    api_key = uuid.uuid4().hex
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers={"X-API-Key": api_key}) as client:
+            reads = [(await client.get("/books/")).status_code for _ in range(3)]
+            writes = [(await client.post("/books/")).status_code for _ in range(2)]
+            limited = await client.get("/books/")
+            other = await client.get("/books/", headers={"X-API-Key": uuid.uuid4().hex})
+            return reads, writes, limited, other
+
+    reads, writes, limited, other = asyncio.run(run())
+    assert reads == [200, 200, 429]
+    # Writes have their own budget, untouched by the reads
+    assert writes == [200, 429]
+    assert int(limited.headers["retry-after"]) >= 1
+    # Another API key has its own buckets
+    assert other.status_code == 200
+
+def test_rate_limit_charges_batches_per_sub_request():
+    async def echo(request):
+        return PlainTextResponse(await request.body())
+
+    inner = Starlette(routes=[Route("/batch", echo, methods=["POST"]), Route("/books/", echo)])
+    budgets = {"read": Budget(rate=0.01, burst=5), "expensive": Budget(rate=0.01, burst=3)}
+    app = RateLimitMiddleware(inner, budgets, key_header="X-API-Key")
+
+    async def internal_app(scope, receive, send):
+        await app({**scope, INTERNAL_SCOPE_KEY: True}, receive, send)
+
+    capped = RateLimitMiddleware(inner, budgets, key_header="X-API-Key", max_batch_body=64)
+
+    async def stream(body: bytes):
+        # Chunked, without a Content-Length to check up front
+        for start in range(0, len(body), 16):
+            yield body[start:start + 16]
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", headers={"X-API-Key": uuid.uuid4().hex}) as client:
+            reads = {"requests": [{"path": "/books/1"}] * 4}
+            searches = {"requests": [{"path": "/books/?q=a"}] * 2}
+            batches = [await client.post("/batch", json=body) for body in (reads, searches, searches)]
+            # Four of the five read tokens are gone
+            after = [(await client.get("/books/")).status_code for _ in range(2)]
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=internal_app), base_url="http://test") as client:
+            internal = [(await client.get("/books/")).status_code for _ in range(10)]
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=capped), base_url="http://test") as client:
+            large = orjson.dumps({"requests": [{"path": "/books/1"}] * 10})
+            oversized = [
+                (await client.post("/batch", content=large)).status_code,
+                (await client.post("/batch", content=stream(large))).status_code,
+                (await client.post("/batch", content=stream(large[:60]))).status_code,
+            ]
+        return batches, after, internal, oversized
+
+    batches, after, internal, oversized = asyncio.run(run())
+    # The body is still read by the route
+    assert batches[0].status_code == 200 and b"/books/1" in batches[0].content
+    # Two searches cost two expensive tokens, the second batch finds only one left
+    assert [batch.status_code for batch in batches[1:]] == [200, 429]
+    assert after == [200, 429]
+    # Warm-up and refresh-ahead requests are never limited
+    assert internal == [200] * 10
+    # Bodies over the cap are refused, declared or streamed, instead of being buffered
+    assert oversized == [413, 413, 200]
@@ -1,5 +1,11 @@
+import csv
+import io
+import json
+from datetime import date
+from sqlalchemy import update
 from app.schemas.author_schema import AuthorCreate, AuthorResponse
 from app.models.author_model import Author
+from app.repositories.book_repository import BookRepository
 
 def test_create_author(client):
     response = client.post("/authors/", json={"name": "John Doe", "bio": "Author Bio", "birth_date": "1980-01-01"})
@@ -9,7 +15,7 @@ def test_create_author(client):
 
 def test_get_author(client, db_session):
     # Create an author in the database
-    author = Author(name="Jane Doe", bio="Another Bio", birth_date="1990-01-01")
+    author = Author(name="Jane Doe", bio="Another Bio", birth_date=date(1990, 1, 1))
     db_session.add(author)
     db_session.commit()
     db_session.refresh(author)
@@ -21,7 +27,7 @@ def test_get_author(client, db_session):
 
 def test_update_author(client, db_session):
     # Create an author
-    author = Author(name="Old Name", bio="Bio", birth_date="1980-01-01")
+    author = Author(name="Old Name", bio="Bio", birth_date=date(1980, 1, 1))
     db_session.add(author)
     db_session.commit()
     db_session.refresh(author)
@@ -33,7 +39,7 @@ def test_update_author(client, db_session):
 
 def test_delete_author(client, db_session):
     # Create an author
-    author = Author(name="Delete Me", bio="Bio", birth_date="1980-01-01")
+    author = Author(name="Delete Me", bio="Bio", birth_date=date(1980, 1, 1))
     db_session.add(author)
     db_session.commit()
     db_session.refresh(author)
@@ -45,3 +51,108 @@ def test_delete_author(client, db_session):
     # Check if author was really deleted
     response = client.get(f"/authors/{author.id}")
     assert response.status_code == 404
+
+def test_list_authors_cursor_pagination_by_name(client, db_session):
+    for name in ("Cursor C", "Cursor A", "Cursor B"):
+        db_session.add(Author(name=name, bio="Bio", birth_date=date(1980, 1, 1)))
+    db_session.commit()
+
+    names = []
+    response = client.get("/authors/?limit=2&sort=name")
+    while True:
+        assert response.status_code == 200
+        data = response.json()["data"]
+        names.extend(author["name"] for author in data["authors"])
+        if not data["next_cursor"]:
+            break
+        response = client.get(f"/authors/?limit=2&sort=name&cursor={data['next_cursor']}")
+
+    assert names == sorted(names)
+    assert len(names) == data["total"]
+
+def test_create_authors_bulk(client):
+    payload = [{"name": f"Bulk Author {i}", "bio": "Bio", "birth_date": "1980-01-01"} for i in range(3)]
+    response = client.post("/authors/bulk", json=payload)
+    assert response.status_code == 200
+    created = response.json()["data"]
+    assert [author["name"] for author in created] == [author["name"] for author in payload]
+
+    response = client.get(f"/authors/?ids={created[1]['id']}")
+    assert response.json()["data"]["authors"][0]["name"] == "Bulk Author 1"
+
+def test_export_authors_csv(client):
+    client.post("/authors/", json={"name": "Export, Author", "bio": "Bio", "birth_date": "1980-01-01"})
+
+    response = client.get("/authors/export?format=csv")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["id", "name", "bio", "birth_date", "book_count"]
+    assert ["Export, Author", "Bio", "1980-01-01", "0"] in [row[1:] for row in rows[1:]]
+
+def test_import_authors_csv(client):
+    body = "name,bio,birth_date\nCSV Author,,1980-01-01\nBad Author,Bio,not-a-date\n"
+    response = client.post("/authors/import?format=csv", content=body)
+    assert response.status_code == 200
+    result = response.json()["data"]
+    assert result["imported"] == 1
+    assert result["errors"][0]["row"] == 3
+
+    response = client.get("/authors/?q=CSV Author")
+    assert response.json()["data"]["authors"][0]["bio"] is None
+
+def test_list_authors_etag_not_modified(client):
+    response = client.get("/authors/")
+    etag = response.headers["etag"]
+
+    assert client.get("/authors/", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/authors/", json={"name": "New Author", "bio": "Bio", "birth_date": "1980-01-01"})
+    assert client.get("/authors/", headers={"If-None-Match": etag}).status_code == 200
+
+def test_author_books_paginated_and_included(client):
+    author_id = client.post("/authors/", json={"name": "Prolific Author", "bio": "Bio", "birth_date": "1980-01-01"}).json()["data"]["id"]
+    for i in range(3):
+        client.post("/books/", json={"title": f"Book {i}", "description": "Desc", "publish_date": "2020-01-01", "author_id": author_id})
+
+    response = client.get(f"/authors/{author_id}/books?limit=2")
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["total"] == 3
+    assert [book["title"] for book in data["books"]] == ["Book 0", "Book 1"]
+
+    response = client.get(f"/authors/{author_id}/books?limit=2&cursor={data['next_cursor']}")
+    assert [book["title"] for book in response.json()["data"]["books"]] == ["Book 2"]
+    assert client.get("/authors/999999/books").status_code == 404
+
+    response = client.get("/authors/?include=books&limit=100")
+    authors = {author["id"]: author for author in response.json()["data"]["authors"]}
+    assert len(authors[author_id]["books"]) == 3
+
+def test_author_book_count_maintained_and_sorted(client, db_session):
+    prolific = client.post("/authors/", json={"name": "Count Prolific", "birth_date": "1980-01-01"}).json()["data"]["id"]
+    other = client.post("/authors/", json={"name": "Count Other", "birth_date": "1980-01-01"}).json()["data"]["id"]
+    assert client.get(f"/authors/{prolific}").json()["data"]["book_count"] == 0
+
+    book = {"description": "Desc", "publish_date": "2020-01-01"}
+    moved = client.post("/books/", json={**book, "title": "Moved", "author_id": other}).json()["data"]["id"]
+    deleted = client.post("/books/", json={**book, "title": "Deleted", "author_id": prolific}).json()["data"]["id"]
+    client.post("/books/bulk", json=[{**book, "title": f"Bulk {i}", "author_id": prolific} for i in range(2)])
+    client.put(f"/books/{moved}", json={**book, "title": "Moved", "author_id": prolific})
+    client.delete(f"/books/{deleted}")
+    client.post("/books/import", content=json.dumps({**book, "title": "Imported", "author_id": other}))
+
+    assert client.get(f"/authors/{prolific}").json()["data"]["book_count"] == 3
+    assert client.get(f"/authors/{other}").json()["data"]["book_count"] == 1
+
+    response = client.get("/authors/?sort=-book_count&limit=100")
+    counts = [(author["id"], author["book_count"]) for author in response.json()["data"]["authors"]]
+    assert counts == sorted(counts, key=lambda item: (-item[1], -item[0]))
+    ids = [author_id for author_id, _ in counts]
+    assert ids.index(prolific) < ids.index(other)
+
+    # Drift from a write that bypassed the repository is corrected by the reconcile job
+    db_session.execute(update(Author).where(Author.id == prolific).values(book_count=42))
+    db_session.commit()
+    assert BookRepository(db_session).reconcile_book_counts() == 1
+    assert client.get(f"/authors/{prolific}").json()["data"]["book_count"] == 3
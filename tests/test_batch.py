@@ -0,0 +1,48 @@
+from datetime import date
+from app.core import response_cache
+from app.routers import batch_router
+from app.models.author_model import Author
+
+def test_batch_runs_sub_requests_in_order(client, db_session, monkeypatch):
+    # Create an author with one book
+    author = Author(name="Batch Author", bio="Author Bio", birth_date=date(1970, 1, 1))
+    db_session.add(author)
+    db_session.commit()
+    db_session.refresh(author)
+    book = client.post("/books/", json={"title": "Batch Book", "publish_date": "2022-01-01", "author_id": author.id}).json()["data"]
+
+    # Count the generation reads of the cached routes
+    calls = []
+    get_generations, async_get_generations = response_cache.get_generations, response_cache.async_get_generations
+
+    async def counted_async_get_generations(*namespaces):
+        calls.append(namespaces)
+        return await async_get_generations(*namespaces)
+
+    monkeypatch.setattr(response_cache, "get_generations", lambda *namespaces: calls.append(namespaces) or get_generations(*namespaces))
+    monkeypatch.setattr(response_cache, "async_get_generations", counted_async_get_generations)
+
+    paths = [f"/books/{book['id']}", f"/authors/{author.id}", f"/authors/{author.id}/books", "/books/999999", "/books/?sort=rating"]
+    response = client.post("/batch", json={"requests": [{"path": path} for path in paths]})
+    assert response.status_code == 200
+    results = response.json()["data"]
+    assert [result["status"] for result in results] == [200, 200, 200, 404, 400]
+    assert results[0]["body"]["data"]["title"] == "Batch Book"
+    assert results[1]["body"]["data"]["name"] == "Batch Author"
+    assert [b["id"] for b in results[2]["body"]["data"]["books"]] == [book["id"]]
+
+    # One MGET of the generations for the whole batch, not one per sub-request
+    assert len(calls) == 1
+
+    assert client.post("/batch", json={"requests": [{"path": "/metrics"}]}).status_code == 422
+    assert client.post("/batch", json={"requests": []}).status_code == 422
+
+def test_batch_refuses_exports_and_oversized_responses(client, monkeypatch):
+    assert client.post("/batch", json={"requests": [{"path": "/books/export?format=csv"}]}).status_code == 422
+    # A percent-encoded path gets past the pattern but not the route lookup
+    response = client.post("/batch", json={"requests": [{"path": "/books/%65xport"}]})
+    assert response.json()["data"][0]["status"] == 404
+
+    monkeypatch.setattr(batch_router, "BATCH_MAX_RESPONSE_BYTES", 100)
+    response = client.post("/batch", json={"requests": [{"path": "/books/"}, {"path": "/authors/"}]})
+    assert response.status_code == 413
@@ -1,10 +1,17 @@
+import asyncio
+import json
+from datetime import date
 from app.schemas.book_schema import BookCreate, BookResponse
 from app.models.book_model import Book
 from app.models.author_model import Author
+from app.core import warmup
+from app.core.cache import clear_caches, record_cache
+from app.core.redis import redis_client
+from app.main import app
 
 def test_create_book(client, db_session):
     # Create an author first
-    author = Author(name="Author Name", bio="Author Bio", birth_date="1970-01-01")
+    author = Author(name="Author Name", bio="Author Bio", birth_date=date(1970, 1, 1))
     db_session.add(author)
     db_session.commit()
     db_session.refresh(author)
@@ -16,13 +23,13 @@ def test_create_book(client, db_session):
 
 def test_get_book(client, db_session):
     # Create an author
-    author = Author(name="Author Name", bio="Author Bio", birth_date="1970-01-01")
+    author = Author(name="Author Name", bio="Author Bio", birth_date=date(1970, 1, 1))
     db_session.add(author)
     db_session.commit()
     db_session.refresh(author)
 
     # Create a book
-    book = Book(title="Test Book", description="Description", publish_date="2022-01-01", author_id=author.id)
+    book = Book(title="Test Book", description="Description", publish_date=date(2022, 1, 1), author_id=author.id)
     db_session.add(book)
     db_session.commit()
     db_session.refresh(book)
@@ -34,13 +41,13 @@ def test_get_book(client, db_session):
 
 def test_update_book(client, db_session):
     # Create an author
-    author = Author(name="Author Name", bio="Author Bio", birth_date="1970-01-01")
+    author = Author(name="Author Name", bio="Author Bio", birth_date=date(1970, 1, 1))
     db_session.add(author)
     db_session.commit()
     db_session.refresh(author)
 
     # Create a book
-    book = Book(title="Old Title", description="Description", publish_date="2022-01-01", author_id=author.id)
+    book = Book(title="Old Title", description="Description", publish_date=date(2022, 1, 1), author_id=author.id)
     db_session.add(book)
     db_session.commit()
     db_session.refresh(book)
@@ -52,13 +59,13 @@ def test_update_book(client, db_session):
 
 def test_delete_book(client, db_session):
     # Create an author
-    author = Author(name="Author Name", bio="Author Bio", birth_date="1970-01-01")
+    author = Author(name="Author Name", bio="Author Bio", birth_date=date(1970, 1, 1))
     db_session.add(author)
     db_session.commit()
     db_session.refresh(author)
 
     # Create a book
-    book = Book(title="Delete Me", description="Description", publish_date="2022-01-01", author_id=author.id)
+    book = Book(title="Delete Me", description="Description", publish_date=date(2022, 1, 1), author_id=author.id)
     db_session.add(book)
     db_session.commit()
     db_session.refresh(book)
@@ -70,3 +77,350 @@ def test_delete_book(client, db_session):
     # Check if book was really deleted
     response = client.get(f"/books/{book.id}")
     assert response.status_code == 404
+
+def test_list_books_cursor_pagination(client, db_session):
+    # Create an author
+    author = Author(name="Author Name", bio="Author Bio", birth_date=date(1970, 1, 1))
+    db_session.add(author)
+    db_session.commit()
+    db_session.refresh(author)
+
+    for i in range(5):
+        db_session.add(Book(title=f"Cursor Book {i}", description="Description", publish_date=date(2022, 1, 1), author_id=author.id))
+    db_session.commit()
+
+    # Walk every page using next_cursor
+    seen = []
+    response = client.get("/books/?limit=2")
+    while True:
+        assert response.status_code == 200
+        data = response.json()["data"]
+        seen.extend(book["id"] for book in data["books"])
+        if not data["next_cursor"]:
+            break
+        response = client.get(f"/books/?limit=2&cursor={data['next_cursor']}")
+
+    assert seen == sorted(seen)
+    assert len(seen) == len(set(seen)) == data["total"]
+
+def test_list_books_invalid_cursor(client):
+    response = client.get("/books/?cursor=not-a-cursor")
+    assert response.status_code == 400
+    assert response.json()["success"] is False
+
+def test_list_books_not_stale_after_create(client, db_session):
+    # Create an author
+    author = Author(name="Author Name", bio="Author Bio", birth_date=date(1970, 1, 1))
+    db_session.add(author)
+    db_session.commit()
+    db_session.refresh(author)
+
+    # Warm up the list cache, then create a book through the API
+    total = client.get("/books/?limit=100").json()["data"]["total"]
+    response = client.post("/books/", json={"title": "Fresh Book", "description": "Description", "publish_date": "2022-01-01", "author_id": author.id})
+    book_id = response.json()["data"]["id"]
+
+    data = client.get("/books/?limit=100").json()["data"]
+    assert data["total"] == total + 1
+    assert book_id in [book["id"] for book in data["books"]]
+
+def test_list_books_estimated_total(client, db_session):
+    response = client.get("/books/?estimate=true")
+    assert response.status_code == 200
+    data = response.json()["data"]
+    # Only MySQL provides table statistics; elsewhere the exact total is returned instead
+    assert data["total_exact"] is (db_session.get_bind().dialect.name != "mysql")
+    assert data["total"] >= 0
+
+def test_create_books_bulk_and_get_by_ids(client, db_session):
+    # Create an author
+    author = Author(name="Author Name", bio="Author Bio", birth_date=date(1970, 1, 1))
+    db_session.add(author)
+    db_session.commit()
+    db_session.refresh(author)
+
+    payload = [
+        {"title": f"Bulk Book {i}", "description": "Description", "publish_date": "2022-01-01", "author_id": author.id}
+        for i in range(3)
+    ]
+    response = client.post("/books/bulk", json=payload)
+    assert response.status_code == 200
+    created = response.json()["data"]
+    assert [book["title"] for book in created] == [book["title"] for book in payload]
+
+    # Ids come back in the requested order, unknown ids are skipped
+    ids = [created[2]["id"], created[0]["id"], 999999]
+    response = client.get(f"/books/?ids={','.join(map(str, ids))}")
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert [book["id"] for book in data["books"]] == ids[:2]
+    assert data["total"] == 2
+
+def test_search_books_ranks_by_relevance(client, db_session):
+    # Create an author
+    author = Author(name="Author Name", bio="Author Bio", birth_date=date(1970, 1, 1))
+    db_session.add(author)
+    db_session.commit()
+    db_session.refresh(author)
+
+    client.post("/books/bulk", json=[
+        {"title": "Harbour Lights", "description": "A story about a lighthouse keeper", "publish_date": "2022-01-01", "author_id": author.id},
+        {"title": "Lighthouse", "description": "The lighthouse keeper and the lighthouse", "publish_date": "2022-01-01", "author_id": author.id},
+    ])
+
+    response = client.get("/books/?q=lighthouse")
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["total"] >= 2
+    assert data["books"][0]["title"] == "Lighthouse"
+
+    # Search pages use page/limit, not cursors
+    response = client.get("/books/?q=lighthouse&cursor=abc")
+    assert response.status_code == 400
+
+def test_export_books_ndjson(client, db_session):
+    # Create an author
+    author = Author(name="Author Name", bio="Author Bio", birth_date=date(1970, 1, 1))
+    db_session.add(author)
+    db_session.commit()
+    db_session.refresh(author)
+
+    created = client.post("/books/bulk", json=[
+        {"title": f"Export Book {i}", "description": "Description", "publish_date": "2022-01-01", "author_id": author.id}
+        for i in range(3)
+    ]).json()["data"]
+
+    response = client.get("/books/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    exported = {row["id"]: row for row in rows}
+    for book in created:
+        assert exported[book["id"]]["title"] == book["title"]
+        assert exported[book["id"]]["publish_date"] == "2022-01-01"
+    # Rows are streamed in primary key order
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+
+def test_import_books_ndjson_reports_bad_rows(client, db_session):
+    # Create an author
+    author = Author(name="Author Name", bio="Author Bio", birth_date=date(1970, 1, 1))
+    db_session.add(author)
+    db_session.commit()
+    db_session.refresh(author)
+
+    total = client.get("/books/").json()["data"]["total"]
+    lines = [
+        json.dumps({"title": "Imported Book 1", "publish_date": "2022-01-01", "author_id": author.id}),
+        "not json",
+        json.dumps({"title": "Missing date", "author_id": author.id}),
+        json.dumps({"title": "Imported Book 2", "publish_date": "2022-01-01", "author_id": author.id}),
+    ]
+    response = client.post("/books/import?chunk_size=1", content="\n".join(lines))
+    assert response.status_code == 200
+    result = response.json()["data"]
+    assert result["imported"] == 2
+    assert result["failed"] == 2
+    assert [error["row"] for error in result["errors"]] == [2, 3]
+
+    # The list cache is invalidated once the import finishes
+    assert client.get("/books/").json()["data"]["total"] == total + 2
+
+def test_get_book_response_cache_follows_updates(client, db_session):
+    # Create an author
+    author = Author(name="Author Name", bio="Author Bio", birth_date=date(1970, 1, 1))
+    db_session.add(author)
+    db_session.commit()
+    db_session.refresh(author)
+
+    book = client.post("/books/", json={"title": "Cached Title", "description": "Description", "publish_date": "2022-01-01", "author_id": author.id}).json()["data"]
+
+    # The second read is served from the cached response bytes
+    first = client.get(f"/books/{book['id']}")
+    second = client.get(f"/books/{book['id']}")
+    assert second.content == first.content
+    assert second.headers["content-type"] == "application/json"
+
+    client.put(f"/books/{book['id']}", json={"title": "Updated Title", "description": "Description", "publish_date": "2022-01-01", "author_id": author.id})
+    assert client.get(f"/books/{book['id']}").json()["data"]["title"] == "Updated Title"
+
+def test_get_book_etag_not_modified(client, db_session):
+    # Create an author
+    author = Author(name="Author Name", bio="Author Bio", birth_date=date(1970, 1, 1))
+    db_session.add(author)
+    db_session.commit()
+    db_session.refresh(author)
+
+    book = client.post("/books/", json={"title": "ETag Title", "description": "Description", "publish_date": "2022-01-01", "author_id": author.id}).json()["data"]
+
+    response = client.get(f"/books/{book['id']}")
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"]
+
+    response = client.get(f"/books/{book['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # Changing the book changes its ETag
+    client.put(f"/books/{book['id']}", json={"title": "New ETag Title", "description": "Description", "publish_date": "2022-01-01", "author_id": author.id})
+    response = client.get(f"/books/{book['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+def test_get_book_response_cache_survives_other_writes(client, db_session):
+    # Create an author
+    author = Author(name="Author Name", bio="Author Bio", birth_date=date(1970, 1, 1))
+    db_session.add(author)
+    db_session.commit()
+    db_session.refresh(author)
+
+    kept = client.post("/books/", json={"title": "Kept Title", "description": "Description", "publish_date": "2022-01-01", "author_id": author.id}).json()["data"]
+    other = client.post("/books/", json={"title": "Other Title", "description": "Description", "publish_date": "2022-01-01", "author_id": author.id}).json()["data"]
+    etag = client.get(f"/books/{kept['id']}").headers["etag"]
+    assert client.get(f"/authors/{author.id}").json()["data"]["book_count"] == 2
+
+    # Change the row behind the cache, so only a cached response still shows the old title
+    db_session.get(Book, kept["id"]).title = "Changed Behind The Cache"
+    db_session.commit()
+    record_cache.delete(f"book:{kept['id']}")
+
+    # Writing another book leaves this book's response cached
+    client.put(f"/books/{other['id']}", json={"title": "Other New Title", "description": "Description", "publish_date": "2022-01-01", "author_id": author.id})
+    client.post("/books/", json={"title": "Third Title", "description": "Description", "publish_date": "2022-01-01", "author_id": author.id})
+    response = client.get(f"/books/{kept['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    # Writing the book itself does not
+    client.put(f"/books/{kept['id']}", json={"title": "Kept New Title", "description": "Description", "publish_date": "2022-01-01", "author_id": author.id})
+    assert client.get(f"/books/{kept['id']}").json()["data"]["title"] == "Kept New Title"
+
+    # The author's book_count moved with the writes above
+    assert client.get(f"/authors/{author.id}").json()["data"]["book_count"] == 3
+
+def test_list_books_compressed_when_accepted(client, db_session):
+    # Create an author
+    author = Author(name="Author Name", bio="Author Bio", birth_date=date(1970, 1, 1))
+    db_session.add(author)
+    db_session.commit()
+    db_session.refresh(author)
+
+    created = client.post("/books/bulk", json=[
+        {"title": f"Long Book {i}", "description": "word " * 200, "publish_date": "2022-01-01", "author_id": author.id}
+        for i in range(5)
+    ]).json()["data"]
+    path = "/books/?ids=" + ",".join(str(book["id"]) for book in created)
+
+    response = client.get(path, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert len(response.json()["data"]["books"]) == 5
+
+    response = client.get(path, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+
+    # Each representation has its own strong ETag, and either one revalidates
+    identity_etag = response.headers["etag"]
+    gzip_etag = client.get(path, headers={"Accept-Encoding": "gzip"}).headers["etag"]
+    assert gzip_etag != identity_etag
+    assert gzip_etag == identity_etag[:-1] + '-gzip"'
+    response = client.get(path, headers={"Accept-Encoding": "gzip", "If-None-Match": gzip_etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == gzip_etag
+    response = client.get(path, headers={"Accept-Encoding": "identity", "If-None-Match": gzip_etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == identity_etag
+
+def test_metrics_endpoint(client):
+    client.get("/books/?limit=3")
+    client.get("/books/?limit=3")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'http_requests_total{method="GET",route="/books/",status="200"}' in response.text
+    assert 'cache_requests_total{namespace="resp",result="hit"' in response.text
+
+def test_warm_up_replays_hot_paths(client, db_session, monkeypatch):
+    # Create an author
+    author = Author(name="Author Name", bio="Author Bio", birth_date=date(1970, 1, 1))
+    db_session.add(author)
+    db_session.commit()
+    db_session.refresh(author)
+
+    book = client.post("/books/", json={"title": "Hot Title", "description": "Description", "publish_date": "2022-01-01", "author_id": author.id}).json()["data"]
+
+    # Record every request instead of a sample
+    monkeypatch.setattr(warmup, "WARMUP_SAMPLE_RATE", 1)
+    redis_client.delete(warmup.HOT_PATHS_KEY)
+    client.get(f"/books/{book['id']}")
+    client.get(f"/books/{book['id']}")
+    client.get("/books/?limit=2")
+    assert redis_client.zrevrange(warmup.HOT_PATHS_KEY, 0, 0) == [f"/books/{book['id']}?"]
+
+    clear_caches()
+    result = asyncio.run(warmup.warm_up(app, max_paths=10, time_budget=5))
+    assert result["paths"] == 2
+    assert result["loaded"] == 2
+
+    # A refresh header without the process token is an ordinary request
+    response = client.get(f"/books/{book['id']}", headers={warmup.REFRESH_HEADER: "guess"})
+    assert response.status_code == 200
+
+def test_list_books_sparse_fields(client, db_session):
+    # Create an author
+    author = Author(name="Author Name", bio="Author Bio", birth_date=date(1970, 1, 1))
+    db_session.add(author)
+    db_session.commit()
+    db_session.refresh(author)
+
+    client.post("/books/", json={"title": "Sparse Title", "description": "Long description", "publish_date": "2022-01-01", "author_id": author.id})
+
+    # Plain pages leave description out by default
+    books = client.get("/books/?limit=100").json()["data"]["books"]
+    assert "description" not in books[0]
+    assert {"id", "title", "publish_date", "author_id"} <= set(books[0])
+
+    books = client.get("/books/?limit=100&fields=title,description").json()["data"]["books"]
+    assert set(books[-1]) == {"id", "title", "description"}
+    assert books[-1]["description"] == "Long description"
+
+    books = client.get("/books/?limit=100&fields=title").json()["data"]["books"]
+    assert set(books[-1]) == {"id", "title"}
+
+    response = client.get("/books/?fields=title,rating")
+    assert response.status_code == 400
+
+def test_list_books_filtered_and_sorted(client, db_session):
+    # Create two authors
+    author = Author(name="Author Name", bio="Author Bio", birth_date=date(1970, 1, 1))
+    other = Author(name="Other Author", bio="Other Bio", birth_date=date(1980, 1, 1))
+    db_session.add_all([author, other])
+    db_session.commit()
+
+    books = [("Filter C", "2021-03-01", author.id), ("Filter A", "2019-05-01", author.id), ("Filter B", "2020-07-01", other.id)]
+    client.post("/books/bulk", json=[{"title": title, "publish_date": published, "author_id": author_id} for title, published, author_id in books])
+
+    data = client.get(f"/books/?author_id={author.id}&sort=publish_date").json()["data"]
+    assert data["total"] == 2
+    assert [book["title"] for book in data["books"]] == ["Filter A", "Filter C"]
+
+    # Filters default to sort=publish_date, the order their indexes return
+    data = client.get(f"/books/?author_id={author.id}").json()["data"]
+    assert [book["title"] for book in data["books"]] == ["Filter A", "Filter C"]
+
+    data = client.get("/books/?published_from=2020-01-01&published_to=2021-12-31").json()["data"]
+    assert data["total"] == 2
+    assert [book["title"] for book in data["books"]] == ["Filter B", "Filter C"]
+
+    data = client.get(f"/books/?author_id={author.id}&published_from=2020-01-01&sort=-publish_date").json()["data"]
+    assert [book["title"] for book in data["books"]] == ["Filter C"]
+
+    # Equivalent queries share one cached response
+    client.get(f"/books/?author_id={author.id}&limit=10&page=0")
+    cached = set(redis_client.scan_iter("resp:*"))
+    client.get(f"/books/?page=0&author_id=0{author.id}")
+    assert set(redis_client.scan_iter("resp:*")) == cached
+
+    # No index returns one author's books by title or id, nor a date range by id
+    assert client.get(f"/books/?author_id={author.id}&sort=title").status_code == 400
+    assert client.get(f"/books/?author_id={author.id}&sort=id").status_code == 400
+    assert client.get("/books/?published_from=2020-01-01&sort=id").status_code == 400
+    assert client.get("/books/?published_from=2021-01-01&published_to=2020-01-01").status_code == 400
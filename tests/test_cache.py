@@ -0,0 +1,187 @@
+import asyncio
+import json
+import threading
+import time
+import fakeredis
+import fakeredis.aioredis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from app.core.cache import LocalCache, TieredCache
+from app.core.circuit_breaker import AsyncGuardedRedis, CircuitBreaker, GuardedRedis
+from app.core.redis import async_redis_client, redis_client
+from app.core.singleflight import SingleFlight, load_once, lock_key
+from app.models.author_model import Author  # noqa: F401
+from app.models.book_model import BOOK_RECORD_CODEC
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(maxsize=2, ttl=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    assert cache.get("c") == "3"
+
+def test_local_cache_expires_entries():
+    cache = LocalCache(maxsize=10, ttl=0.05)
+    cache.set("a", "1")
+    assert cache.get("a") == "1"
+
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+def test_tiered_cache_invalidates_other_workers():
+    # Two caches sharing one Redis behave like two workers
+    worker_a = TieredCache(redis_client, async_redis_client, LocalCache(10, 60), "test:cache:invalidate")
+    worker_b = TieredCache(redis_client, async_redis_client, LocalCache(10, 60), "test:cache:invalidate")
+    worker_a.start_listener()
+    worker_b.start_listener()
+    time.sleep(0.2)
+    try:
+        worker_a.set("test:tiered", "v1")
+        assert worker_b.get("test:tiered") == "v1"
+        assert worker_b.get("test:tiered") == "v1"
+        assert worker_b.stats()["local"] == {"hits": 1, "misses": 1}
+
+        worker_a.set("test:tiered", "v2")
+        deadline = time.monotonic() + 5
+        while worker_b.local.get("test:tiered") is not None and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert worker_b.get("test:tiered") == "v2"
+    finally:
+        worker_a.stop_listener()
+        worker_b.stop_listener()
+        redis_client.delete("test:tiered")
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+
+    def slow_load():
+        calls.append(1)
+        time.sleep(0.1)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", slow_load))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 10
+    assert len(calls) == 1
+
+def test_load_once_serves_stale_while_another_worker_rebuilds():
+    # Simulate another worker holding the rebuild lock
+    redis_client.set(lock_key("test:stampede"), "other-worker", px=5000)
+    try:
+        value = load_once(
+            "test:stampede",
+            load=lambda: "fresh",
+            read=lambda: redis_client.get("test:stampede"),
+            write=lambda value: redis_client.set("test:stampede", value),
+            stale=lambda: "stale",
+        )
+        assert value == "stale"
+    finally:
+        redis_client.delete(lock_key("test:stampede"), "test:stampede")
+
+def test_record_codec_round_trip():
+    record = {"id": 7, "title": "Tïtle", "description": None, "publish_date": "2001-02-03", "author_id": 3}
+    packed = BOOK_RECORD_CODEC.pack(record)
+
+    assert BOOK_RECORD_CODEC.unpack(packed) == record
+    assert len(packed) < len(json.dumps(record))
+    # Entries written as JSON before the binary format are still readable
+    assert BOOK_RECORD_CODEC.unpack(json.dumps(record).encode()) == record
+
+class FlakyRedis:
+    """Client whose commands fail with a connection error while ``down`` is set."""
+
+    def __init__(self, client):
+        self.client = client
+        self.down = False
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+
+        def call(*args, **kwargs):
+            if self.down:
+                raise RedisConnectionError("Connection refused")
+            return attr(*args, **kwargs)
+
+        return call
+
+def test_circuit_breaker_bypasses_redis_and_invalidates_on_recovery():
+    raw = fakeredis.FakeStrictRedis(decode_responses=True)
+    flaky = FlakyRedis(raw)
+    breaker = CircuitBreaker(flaky, failure_threshold=2, probe_interval=0.01, max_pending=100)
+    client = GuardedRedis(flaky, breaker)
+    raw.set("book:1", "old")
+    raw.set("gen:book:1", "100")
+
+    flaky.down = True
+    assert client.get("book:1") is None
+    assert client.mget(["book:1", "book:2"]) == [None, None]
+    assert breaker.is_open
+
+    # Written to the database while Redis is down: the old copy must not survive the outage
+    client.set("book:1", "new")
+    client.incr("gen:books")
+    client.set("gen:book:1", "200", ex=60)
+
+    flaky.down = False
+    deadline = time.monotonic() + 2
+    while breaker.is_open and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not breaker.is_open
+    assert raw.get("book:1") is None
+    assert raw.get("gen:books") == "1"
+    # A record version moves on instead of going back to 0
+    assert raw.get("gen:book:1") == "101"
+    assert client.get("book:1") is None
+
+class ResetMidScan:
+    """Client whose SCAN loses the connection after returning its first key."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def scan_iter(self, *args, **kwargs):
+        for key in self.client.scan_iter(*args, **kwargs):
+            yield key
+            raise RedisConnectionError("Connection reset by peer")
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+class AsyncResetMidScan(ResetMidScan):
+    async def scan_iter(self, *args, **kwargs):
+        async for key in self.client.scan_iter(*args, **kwargs):
+            yield key
+            raise RedisConnectionError("Connection reset by peer")
+
+def test_circuit_breaker_guards_scans_that_fail_midway():
+    raw = fakeredis.FakeStrictRedis(decode_responses=True)
+    raw.mset({"book:1": "a", "book:2": "b"})
+    healthy = GuardedRedis(raw, CircuitBreaker(raw, failure_threshold=1, probe_interval=60, max_pending=100))
+    assert sorted(healthy.scan_iter("book:*")) == ["book:1", "book:2"]
+
+    # The error is raised while iterating, and still counts as a failure instead of escaping
+    breaker = CircuitBreaker(raw, failure_threshold=1, probe_interval=60, max_pending=100)
+    assert list(GuardedRedis(ResetMidScan(raw), breaker).scan_iter("book:*")) == []
+    assert breaker.is_open
+
+    async def scan_async() -> list:
+        async_raw = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        await async_raw.mset({"book:1": "a", "book:2": "b"})
+        healthy = AsyncGuardedRedis(async_raw, CircuitBreaker(raw, failure_threshold=1, probe_interval=60, max_pending=100))
+        assert sorted([key async for key in healthy.scan_iter("book:*")]) == ["book:1", "book:2"]
+        client = AsyncGuardedRedis(AsyncResetMidScan(async_raw), async_breaker)
+        return [key async for key in client.scan_iter("book:*")]
+
+    async_breaker = CircuitBreaker(raw, failure_threshold=1, probe_interval=60, max_pending=100)
+    assert asyncio.run(scan_async()) == []
+    assert async_breaker.is_open
@@ -0,0 +1,88 @@
+from fastapi import Request
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.database import (
+    READ_METHODS,
+    REPLICA_INFO_KEY,
+    AsyncSessionLocal,
+    Base,
+    ReplicaSet,
+    SessionLocal,
+    get_async_db,
+    get_db,
+    init_database,
+    primary_session,
+    to_async_url,
+)
+from app.main import app
+
+def test_replica_set_skips_unhealthy_replicas(tmp_path):
+    healthy = [sessionmaker(bind=create_engine(f"sqlite:///{tmp_path}/replica{i}.db")) for i in range(2)]
+    # The directory does not exist, so connecting fails
+    broken = sessionmaker(bind=create_engine(f"sqlite:///{tmp_path}/missing/replica.db"))
+    replicas = ReplicaSet([healthy[0], broken, healthy[1]], check_interval=60)
+
+    databases = set()
+    for _ in range(6):
+        db = replicas.session()
+        databases.add(db.get_bind().url.database)
+        db.close()
+    assert databases == {f"{tmp_path}/replica0.db", f"{tmp_path}/replica1.db"}
+
+def test_replica_set_falls_back_when_no_replica_is_healthy(tmp_path):
+    broken = sessionmaker(bind=create_engine(f"sqlite:///{tmp_path}/missing/replica.db"))
+
+    assert ReplicaSet([broken], check_interval=60).session() is None
+    assert ReplicaSet([]).session() is None
+
+def test_primary_session_replaces_replica_sessions(tmp_path):
+    primary_engine = init_database()
+    replica = sessionmaker(bind=create_engine(f"sqlite:///{tmp_path}/replica.db"), info={REPLICA_INFO_KEY: True})()
+    with primary_session(replica) as db:
+        assert db is not replica
+        assert db.get_bind() is primary_engine
+
+    primary = SessionLocal()
+    with primary_session(primary) as db:
+        assert db is primary
+    primary.close()
+    replica.close()
+
+def test_cached_reads_stay_fresh_behind_a_lagging_replica(client, tmp_path):
+    # A replica that has not applied any write yet: same tables, no rows
+    replica_url = f"sqlite:///{tmp_path}/replica.db"
+    Base.metadata.create_all(bind=create_engine(replica_url))
+    replica = sessionmaker(autoflush=False, bind=create_engine(replica_url), info={REPLICA_INFO_KEY: True})
+    async_replica = async_sessionmaker(
+        create_async_engine(to_async_url(replica_url)), autoflush=False, expire_on_commit=False, info={REPLICA_INFO_KEY: True}
+    )
+
+    def lagging_get_db(request: Request):
+        db = replica() if request.method in READ_METHODS else SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def lagging_get_async_db(request: Request):
+        async with (async_replica() if request.method in READ_METHODS else AsyncSessionLocal()) as db:
+            yield db
+
+    overrides = dict(app.dependency_overrides)
+    app.dependency_overrides.update({get_db: lagging_get_db, get_async_db: lagging_get_async_db})
+    try:
+        author = client.post("/authors/", json={"name": "Lagging Author", "bio": "Bio", "birth_date": "1970-01-01"}).json()["data"]
+        book = client.post("/books/", json={"title": "Lagging Title", "description": "Description", "publish_date": "2022-01-01", "author_id": author["id"]}).json()["data"]
+
+        # Every cached read is filled from the primary, so the write is visible at once and stays so
+        for _ in range(2):
+            page = client.get("/books/", params={"author_id": author["id"]}).json()["data"]
+            assert page["total"] == 1
+            assert [item["id"] for item in page["books"]] == [book["id"]]
+            assert client.get("/books/").json()["data"]["total"] >= 1
+            assert client.get(f"/books/{book['id']}").json()["data"]["title"] == "Lagging Title"
+            assert client.get(f"/authors/{author['id']}").json()["data"]["book_count"] == 1
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(overrides)